@@ -0,0 +1,401 @@
+# api.py
+"""
+Headless HTTP/JSON API for the support agent (stdlib asyncio, no web framework needed).
+
+Endpoints:
+    POST /chat                 {"message": "...", "session_id"?, "stream"?, "model"?, "threshold"?,
+                               "use_mock"?, "concurrent"?, "fused"?} → final state as JSON, or an
+                               SSE stream ("token" events, then one "done" event) when
+                               "stream" is true or the client sends Accept: text/event-stream;
+                               a failure mid-stream ends it with an "error" event
+    POST /feedback/{log_id}    {"feedback": "up" | "down"}
+    GET  /health               endpoint health, Ollama queue, log pipeline, intent registry and
+                               tool circuit breaker state
+    GET  /metrics              Prometheus text format
+
+Connections are handled on one event loop; each workflow run occupies a thread of a bounded
+pool (API_MAX_WORKERS) while the process-wide Ollama clients, admission scheduler, session
+store and log pipeline are shared by all requests. Turns of the same session are serialized
+so conversation memory stays consistent. The process is stateless apart from the session
+store, so with SESSION_STORE = "sqlite" on shared storage it can be scaled horizontally.
+
+    python -m api --host 0.0.0.0 --port 8000
+"""
+import argparse
+import asyncio
+import json
+import threading
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from core import intents
+from core.nodes import logger as logger_node
+from core.session import get_store
+from core.workflow import support_agent_workflow, support_agent_workflow_stream
+from services import metrics, ollama_client, router, tools
+from services.db_logger import close_writers, init_db
+
+RESULT_METADATA = ("intent_source", "entities", "carried_entities", "escalation_payload", "response_mode", "stream", "timings")
+FEEDBACK_VALUES = ("up", "down")
+
+REQUESTS = metrics.REGISTRY.counter("agent_api_requests_total", "API requests by route and status", ("route", "status"))
+REQUEST_DURATION = metrics.REGISTRY.histogram("agent_api_request_seconds", "API request handling time", ("route",))
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamAborted(Exception):
+    """
+    A streamed response failed after its headers were sent; the error went out as an SSE
+    "error" event and the connection must be closed.
+    """
+
+
+class Request:
+    __slots__ = ("method", "path", "headers", "body")
+
+    def __init__(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return data
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+def _result(state: Dict[str, Any], session_id: str, log_id: Optional[int]) -> Dict[str, Any]:
+    meta = state.get("metadata", {})
+    return {
+        "session_id": session_id,
+        "log_id": log_id,
+        "response_text": state.get("response_text"),
+        "intents": state.get("intents"),
+        "sentiment": state.get("sentiment"),
+        "urgency": state.get("urgency"),
+        "escalation_flag": bool(state.get("escalation_flag")),
+        "confidence_score": state.get("confidence_score"),
+        "action_results": state.get("action_results"),
+        "metadata": {k: meta[k] for k in RESULT_METADATA if k in meta},
+    }
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
+
+
+def _threshold(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0.0 <= value <= 1.0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, '"threshold" must be a number between 0 and 1')
+    return float(value)
+
+
+def _flag(data: Dict[str, Any], name: str, default: Optional[bool] = None) -> Optional[bool]:
+    value = data.get(name, default)
+    if value is not None and not isinstance(value, bool):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'"{name}" must be true or false')
+    return value
+
+
+class AgentAPI:
+    """
+    Routes requests to the workflow; blocking work runs on `executor`, never on the loop.
+    """
+
+    def __init__(self, max_workers: int = settings.API_MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def _run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
+
+    # ---------------- Routing ----------------
+    @staticmethod
+    def route(request: Request) -> Tuple[str, str, str]:
+        """
+        (route label, allowed method, path argument) for a request path.
+        """
+        path = request.path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/chat":
+            return "chat", "POST", ""
+        if path.startswith("/feedback/"):
+            return "feedback", "POST", path[len("/feedback/"):]
+        if path in ("/health", "/metrics"):
+            return path[1:], "GET", ""
+        return "other", "", ""
+
+    async def dispatch(self, request: Request, writer: asyncio.StreamWriter) -> Optional[Tuple[HTTPStatus, Any]]:
+        """
+        Returns (status, JSON body), or None when the handler has already written a
+        streamed response.
+        """
+        route, method, arg = self.route(request)
+        if route == "other":
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {request.path}")
+        if request.method != method:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {method}")
+        if route == "chat":
+            return await self.chat(request, writer)
+        if route == "feedback":
+            return await self.feedback(request, arg)
+        if route == "health":
+            return HTTPStatus.OK, await self._run(self.health)
+        return HTTPStatus.OK, metrics.render_prometheus()
+
+    # ---------------- Handlers ----------------
+    async def chat(self, request: Request, writer: asyncio.StreamWriter) -> Optional[Tuple[HTTPStatus, Any]]:
+        data = request.json()
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, '"message" must be a non-empty string')
+        session_id = str(data.get("session_id") or uuid.uuid4().hex)
+        kwargs = dict(
+            model=data.get("model") or None,
+            threshold=_threshold(data.get("threshold")),
+            use_mock=_flag(data, "use_mock", True),
+            concurrent=_flag(data, "concurrent"),
+            fused=_flag(data, "fused"),
+        )
+        stream = _flag(data, "stream")
+        if stream is None:
+            stream = "text/event-stream" in request.headers.get("accept", "")
+
+        async with self._session_lock(session_id):
+            conversation = await self._run(get_store().get, session_id)
+            kwargs["conversation"] = conversation
+            if stream:
+                try:
+                    state = await self._stream(message, kwargs, writer)
+                    await self._run(get_store().save, conversation)
+                except Exception as exc:
+                    # The 200 and SSE headers are already out, so report the error in-stream
+                    try:
+                        writer.write(_sse("error", {"error": f"{type(exc).__name__}: {exc}"}))
+                        await writer.drain()
+                    except ConnectionError:
+                        pass
+                    raise StreamAborted(str(exc)) from exc
+            else:
+                state = await self._run(lambda: support_agent_workflow(message, **kwargs))
+                await self._run(get_store().save, conversation)
+
+        log_id = await self._log(state)
+        result = _result(state, session_id, log_id)
+        if not stream:
+            return HTTPStatus.OK, result
+        try:
+            writer.write(_sse("done", result))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        return None
+
+    async def _stream(self, message: str, kwargs: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        """
+        Run the streaming workflow on a worker thread and forward its chunks as SSE events.
+        The run always completes (and is logged) even if the client goes away mid-stream.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        def produce() -> Dict[str, Any]:
+            try:
+                run = support_agent_workflow_stream(message, **kwargs)
+                for chunk in run:
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+                return run.result()
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        future = loop.run_in_executor(self.executor, produce)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        connected = True
+        while (chunk := await chunks.get()) is not None:
+            if not connected:
+                continue
+            try:
+                writer.write(_sse("token", {"text": chunk}))
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+        return await future
+
+    async def _log(self, state: Dict[str, Any]) -> Optional[int]:
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(logger_node.log_interaction_async(state)), 5)
+        except Exception:
+            return None
+
+    async def feedback(self, request: Request, log_id: str) -> Tuple[HTTPStatus, Any]:
+        if not log_id.isdigit():
+            raise HTTPError(HTTPStatus.NOT_FOUND, "log_id must be an integer")
+        value = request.json().get("feedback")
+        if value not in FEEDBACK_VALUES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f'"feedback" must be one of {", ".join(FEEDBACK_VALUES)}')
+        await self._run(logger_node.log_feedback, int(log_id), value)
+        return HTTPStatus.OK, {"log_id": int(log_id), "feedback": value}
+
+    def health(self) -> Dict[str, Any]:
+        scheduler = ollama_client.get_scheduler()
+        return {
+            "status": "ok",
+            "endpoints": {
+                name: [e.to_dict() for e in pool.endpoints] for name, pool in router.get_router().pools.items()
+            },
+            "ollama_queue": scheduler.stats() if scheduler is not None else {},
+            "log_pipeline": logger_node.pipeline_stats(),
+            "intents": intents.reload_status(),
+            "tool_circuits": tools.breaker_states(),
+            "tool_cache": tools.cache_stats(),
+        }
+
+    # ---------------- Connection handling ----------------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), settings.API_KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as exc:
+                    await _respond(writer, exc.status, {"error": str(exc)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                started = asyncio.get_running_loop().time()
+                route = self.route(request)[0]
+                streamed_status = "200"
+                try:
+                    response = await self.dispatch(request, writer)
+                except HTTPError as exc:
+                    response = exc.status, {"error": str(exc)}
+                except StreamAborted:
+                    response, streamed_status = None, "500"
+                except Exception as exc:
+                    response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+                REQUEST_DURATION.observe(asyncio.get_running_loop().time() - started, route=route)
+                if response is None:  # streamed (or aborted mid-stream), connection is closed after it
+                    REQUESTS.inc(route=route, status=streamed_status)
+                    break
+                status, body = response
+                REQUESTS.inc(route=route, status=str(status.value))
+                await _respond(writer, status, body, keep_alive=request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > settings.API_MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, body: Any, keep_alive: bool = True) -> None:
+    if isinstance(body, str):
+        payload, content_type = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        payload, content_type = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8"), "application/json"
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + payload)
+    await writer.drain()
+
+
+async def serve(host: str = settings.API_HOST, port: int = settings.API_PORT, max_workers: int = settings.API_MAX_WORKERS) -> None:
+    """
+    Serve until cancelled (Ctrl+C), then flush queued logs.
+    """
+    init_db()
+    if settings.OLLAMA_WARMUP:
+        threading.Thread(target=router.get_router().warm_up, name="ollama-warm-up", daemon=True).start()
+    router.start_health_checks()
+
+    api = AgentAPI(max_workers)
+    server = await asyncio.start_server(api.handle, host, port, backlog=settings.API_BACKLOG)
+    print(f"Support agent API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+        logger_node.shutdown_pipeline()
+        close_writers()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Headless HTTP/JSON API for the support agent")
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=settings.API_MAX_WORKERS, help="concurrent workflow runs")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 # app.py
 from __future__ import annotations
 
+import threading
+import uuid
+
 import streamlit as st
-from core.workflow import support_agent_workflow
+from core.workflow import support_agent_workflow, support_agent_workflow_stream
 from services.db_logger import init_db
 from config import settings
 from core.nodes import logger as logger_node
+from core.session import get_store
+from services import metrics
+from services import router
 
 
 # ---------------- Page Setup ----------------
@@ -15,12 +21,38 @@ st.set_page_config(
     layout="wide",
 )
 
-# Init DB
-init_db()
+
+@st.cache_resource(show_spinner=False)
+def _init_process() -> bool:
+    """
+    Per-process setup. Streamlit reruns this script on every interaction, so everything
+    here runs once: DB schema / migrations, the metrics endpoint, endpoint health checks
+    and (in the background, so the first render is not blocked on it) model warm-up.
+    """
+    init_db()
+    # Metrics endpoint; the port may already be taken, e.g. by another app process
+    if settings.METRICS_PORT:
+        try:
+            metrics.start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+        except OSError:
+            pass
+    router.start_health_checks()
+    if settings.OLLAMA_WARMUP:
+        threading.Thread(target=router.get_router().warm_up, name="ollama-warm-up", daemon=True).start()
+    return True
+
+
+_init_process()
+
 
 # ---------------- Session State ----------------
+# The conversation id lives in the URL so a reload (or, with SESSION_STORE = "sqlite",
+# a restart) resumes the same conversation memory.
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state["session_id"]
 if "history" not in st.session_state:
-    st.session_state["history"] = []  # [(role, payload)]
+    st.session_state["history"] = []  # [(role, payload)], capped at settings.UI_HISTORY_MAX_MESSAGES
 if "onboarded" not in st.session_state:
     st.session_state["onboarded"] = False
 if "prefill" not in st.session_state:
@@ -78,7 +110,9 @@ st.markdown(
 
 # ---------------- Sidebar Controls ----------------
 st.sidebar.header("⚙️ Settings")
-ollama_model = st.sidebar.text_input("Ollama model", value=settings.OLLAMA_MODEL)
+ollama_model = st.sidebar.text_input(
+    "Ollama model", value="", placeholder="per-task routing", help="Overrides the model of every LLM call when set."
+)
 confidence_threshold = st.sidebar.slider(
     "Confidence Threshold",
     0.0,
@@ -87,6 +121,9 @@ confidence_threshold = st.sidebar.slider(
     0.05,
 )
 use_mock = st.sidebar.checkbox("Use Mock APIs", value=True)
+run_concurrent = st.sidebar.checkbox("Concurrent pipeline", value=settings.WORKFLOW_CONCURRENT)
+run_fused = st.sidebar.checkbox("Fused analysis (single LLM call)", value=settings.FUSED_ANALYSIS)
+stream_replies = st.sidebar.checkbox("Stream replies", value=settings.STREAM_RESPONSES)
 show_debug = st.sidebar.checkbox("Show Debug Info", value=True)
 
 
@@ -141,6 +178,8 @@ if prefill_value and not user_input:
 
 
 # ---------------- Run Workflow ----------------
+DEBUG_METADATA = ("intent_source", "entities", "carried_entities", "escalation_payload", "session", "trace", "timings")
+
 if user_input:
     st.session_state["history"].append(("user", user_input))
 
@@ -152,22 +191,57 @@ if user_input:
             "</div>",
             unsafe_allow_html=True,
         )
-        state = support_agent_workflow(
-            user_input,
+        conversation = get_store().get(st.session_state["session_id"])
+        workflow_kwargs = dict(
             model=ollama_model,
             threshold=confidence_threshold,
             use_mock=use_mock,
+            concurrent=run_concurrent,
+            fused=run_fused,
+            conversation=conversation,
         )
+        if stream_replies:
+            # Tokens replace the typing indicator as soon as the first one arrives
+            run = support_agent_workflow_stream(user_input, **workflow_kwargs)
+            typing_placeholder.write_stream(run)
+            state = run.result()
+        else:
+            state = support_agent_workflow(user_input, **workflow_kwargs)
         typing_placeholder.empty()
+    get_store().save(conversation)
+
+    # Save to DB in the background → log_id is attached once the writer commits
+    state["log_future"] = logger_node.log_interaction_async(state)
+
+    # Only what the transcript renders is kept per turn; conversation memory lives in the session store
+    meta = state.get("metadata", {})
+    st.session_state["history"].append(("assistant", {
+        "response_text": state.get("response_text"),
+        "sentiment": state.get("sentiment"),
+        "urgency": state.get("urgency"),
+        "escalation_flag": state.get("escalation_flag"),
+        "confidence_score": state.get("confidence_score"),
+        "intents": state.get("intents"),
+        "action_results": state.get("action_results"),
+        "log_future": state["log_future"],
+        "metadata": {k: meta[k] for k in DEBUG_METADATA if k in meta},
+    }))
+    del st.session_state["history"][:-settings.UI_HISTORY_MAX_MESSAGES]
 
-    # Save to DB → attach log_id
-    log_id = logger_node.log_interaction(state)
-    state["log_id"] = log_id
 
-    st.session_state["history"].append(("assistant", state))
+# ---------------- Conversation Rendering ----------------
+@st.fragment(run_every=0.5)
+def _await_log_id(item):
+    """
+    Poll a turn's pending log write without blocking the page; once the writer has
+    committed it, rerun the app so the feedback buttons render.
+    """
+    future = item.get("log_future")
+    if future is None or future.done():
+        st.rerun()
+    st.caption("Saving…")
 
 
-# ---------------- Conversation Rendering ----------------
 for role, item in st.session_state["history"]:
     if role == "user":
         st.chat_message("user").write(item)
@@ -189,9 +263,19 @@ for role, item in st.session_state["history"]:
         """
         agent_block.markdown(badges_html, unsafe_allow_html=True)
 
-        # Feedback buttons
+        # Feedback buttons, once the background log write has its row id (never wait for it here)
+        log_future = item.get("log_future")
+        if "log_id" not in item and log_future is not None and log_future.done():
+            del item["log_future"]
+            try:
+                item["log_id"] = log_future.result()
+            except Exception:
+                item["log_id"] = None
         log_id = item.get("log_id")
-        if log_id:
+        if "log_id" not in item and log_future is not None:
+            with agent_block:
+                _await_log_id(item)
+        elif log_id:
             fb_col1, fb_col2 = agent_block.columns(2)
             with fb_col1:
                 if st.button("👍", key=f"up_{log_id}"):
@@ -216,5 +300,12 @@ for role, item in st.session_state["history"]:
             with agent_block.expander("🧾 Debug Info"):
                 st.write("Confidence:", item.get("confidence_score"))
                 st.write("Intents:", item.get("intents"))
+                st.write("Intent source:", item.get("metadata", {}).get("intent_source"))
                 st.write("Entities:", item.get("metadata", {}).get("entities"))
+                if item.get("metadata", {}).get("carried_entities"):
+                    st.write("Carried from earlier turns:", item["metadata"]["carried_entities"])
                 st.write("Escalation payload:", item.get("metadata", {}).get("escalation_payload"))
+                if item.get("metadata", {}).get("trace"):
+                    st.write("Trace:", item["metadata"]["trace"])
+                if item.get("metadata", {}).get("timings"):
+                    st.write("Timings:", item["metadata"]["timings"])
@@ -0,0 +1,213 @@
+# benchmarks/fake_ollama.py
+"""
+Local stand-in for the Ollama HTTP API, for benchmarks and offline runs.
+
+Speaks /api/generate (streaming NDJSON or a single JSON object when "stream": false)
+and /api/tags. Replies are canned, picked by the first marker found in the prompt, and
+are emitted token by token after a fixed latency at a configurable tokens/second rate.
+The final "done" chunk carries Ollama-style token counts and durations.
+
+Run standalone:
+    python -m benchmarks.fake_ollama --port 11434 --latency-ms 50 --tokens-per-sec 100
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+# (prompt marker, reply) — first match wins; the last entry is the catch-all.
+DEFAULT_REPLIES: List[Tuple[str, str]] = [
+    ("intent classification model", '{"intents": ["order_status"], "confidence": 0.92}'),
+    ("intent extraction model", '{"intents": ["order_status"], "confidence": 0.8}'),
+    ("message analyzer", '{"intents": ["order_status"], "confidence": 0.92, "sentiment": "neutral", "urgency": "low"}'),
+    ("sentiment and urgency", '{"sentiment": "neutral", "urgency": "low"}'),
+    ("", "Thanks for reaching out! I've checked your request and everything looks on track. "
+         "Let me know if there is anything else I can help you with."),
+]
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled keep-alive connections is expected, not an error
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text) or [text]
+
+
+class FakeOllamaServer:
+    """
+    Threaded fake Ollama server. Use as a context manager or call start()/stop().
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 20.0,
+        tokens_per_sec: float = 200.0,
+        replies: Optional[List[Tuple[str, str]]] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.replies = replies or DEFAULT_REPLIES
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = _QuietHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reply_for(self, prompt: str) -> str:
+        for marker, reply in self.replies:
+            if marker in prompt:
+                return reply
+        return self.replies[-1][1]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/api/tags":
+                    self._send(200, json.dumps({"models": [{"name": "fake"}]}).encode("utf-8"))
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send(400, b'{"error": "invalid json"}')
+                    return
+                if self.path.rstrip("/") != "/api/generate":
+                    self._send(404, b'{"error": "not found"}')
+                    return
+                with server._lock:
+                    server.requests += 1
+
+                prompt = body.get("prompt", "")
+                model = body.get("model", "fake")
+                if not prompt:
+                    # Empty prompt = load the model (warm-up), like Ollama
+                    self._send(200, json.dumps(
+                        {"model": model, "response": "", "done": True, "done_reason": "load"}
+                    ).encode("utf-8"))
+                    return
+                tokens = _tokenize(server.reply_for(prompt))
+                num_predict = (body.get("options") or {}).get("num_predict")
+                if num_predict and num_predict > 0:
+                    tokens = tokens[:num_predict]
+                started = time.perf_counter()
+                time.sleep(server.latency_ms / 1000.0)
+                delay = 1.0 / server.tokens_per_sec if server.tokens_per_sec > 0 else 0.0
+
+                def final_chunk() -> dict:
+                    total_ns = int((time.perf_counter() - started) * 1e9)
+                    return {
+                        "model": model,
+                        "response": "",
+                        "done": True,
+                        "total_duration": total_ns,
+                        "load_duration": 0,
+                        "prompt_eval_count": len(prompt.split()),
+                        "prompt_eval_duration": int(server.latency_ms * 1e6),
+                        "eval_count": len(tokens),
+                        "eval_duration": int(len(tokens) * delay * 1e9),
+                    }
+
+                if body.get("stream") is False:
+                    time.sleep(delay * len(tokens))
+                    payload = final_chunk()
+                    payload["response"] = "".join(tokens)
+                    self._send(200, json.dumps(payload).encode("utf-8"))
+                    return
+
+                # Chunked NDJSON stream, one token per line
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def write(obj: dict):
+                    data = (json.dumps(obj) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+
+                try:
+                    for tok in tokens:
+                        if delay:
+                            time.sleep(delay)
+                        write({"model": model, "response": tok, "done": False})
+                    write(final_chunk())
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="0 = as fast as possible")
+    parser.add_argument("--replies", type=str, default=None, help='JSON file: [["marker", "reply"], ...]')
+    args = parser.parse_args()
+
+    replies = None
+    if args.replies:
+        with open(args.replies, "r", encoding="utf-8") as f:
+            replies = [tuple(r) for r in json.load(f)]
+
+    server = FakeOllamaServer(args.host, args.port, args.latency_ms, args.tokens_per_sec, replies)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
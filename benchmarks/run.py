@@ -0,0 +1,357 @@
+# benchmarks/run.py
+"""
+Benchmark suite for the agent pipeline, run against a local fake Ollama server so it
+measures our own overhead rather than model speed.
+
+Covers ollama_generate, each node in core/nodes, support_agent_workflow end to end,
+db_logger.save_log under concurrency, entity extraction against the per-regex code it
+replaced, concurrent tool dispatch against mock backends with simulated latency and cold
+import time. Results are emitted as JSON (with the git commit)
+so runs can be compared between commits.
+
+Examples:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --compare bench.json --fail-on-regression 20
+"""
+import argparse
+import itertools
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from config import settings
+from services import ollama_client
+from services.ollama_client import OllamaClient
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pct(sorted_ms: List[float], pct: float) -> float:
+    k = min(len(sorted_ms) - 1, max(0, int(round(pct / 100.0 * (len(sorted_ms) - 1)))))
+    return round(sorted_ms[k], 3)
+
+
+def measure(name: str, fn: Callable[[], Any], iterations: int, concurrency: int = 1, warmup: int = 2) -> Dict[str, Any]:
+    """
+    Call fn `iterations` times with `concurrency` threads; report throughput and latency percentiles.
+    """
+    for _ in range(warmup):
+        fn()
+
+    def timed(_: int) -> float:
+        start = time.perf_counter()
+        fn()
+        return (time.perf_counter() - start) * 1000.0
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_ops_s": round(iterations / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": _pct(latencies, 50),
+        "p95_ms": _pct(latencies, 95),
+        "p99_ms": _pct(latencies, 99),
+    }
+
+
+# ---------------- Suites ----------------
+SAMPLE = "Hi, where is my order ORD1234? It is late and I need it asap, email me at jane@example.com"
+
+
+def bench_client(n: int) -> List[Dict[str, Any]]:
+    from services.ollama_client import ollama_generate
+
+    seq = itertools.count()
+    return [
+        measure("ollama_generate", lambda: ollama_generate(SAMPLE, max_tokens=64), n),
+        # Identical concurrent prompts are coalesced into shared upstream requests
+        measure("ollama_generate[c=8]", lambda: ollama_generate(SAMPLE, max_tokens=64), n * 4, concurrency=8),
+        measure("ollama_generate[c=8,distinct]",
+                lambda: ollama_generate(f"{SAMPLE} #{next(seq)}", max_tokens=64), n * 4, concurrency=8),
+    ]
+
+
+def bench_nodes(n: int) -> List[Dict[str, Any]]:
+    from core.nodes import (
+        analysis, classifier, fallback, fast_intent, preprocessing, response, sentiment, tools, verification,
+    )
+    from core.intents import get_registry
+
+    entities = preprocessing.extract_entities(SAMPLE)
+    actions = tools.call_tools_for_intents(["order_status", "refund"], SAMPLE, entities=entities)
+    state = {"user_input": SAMPLE, "intents": ["order_status"], "sentiment": "negative",
+             "urgency": "high", "action_results": actions}
+    model = fast_intent.FastIntentModel.train(*fast_intent.collect_training_data())
+
+    cpu_n = n * 50
+    return [
+        measure("node.preprocessing.normalize", lambda: preprocessing.normalize(SAMPLE), cpu_n),
+        measure("node.preprocessing.extract_entities", lambda: preprocessing.extract_entities(SAMPLE), cpu_n),
+        measure("node.fast_intent.predict", lambda: model.predict("thanks a lot"), n * 5),
+        measure("node.classifier.classify_intent_with_ollama",
+                lambda: classifier.classify_intent_with_ollama(SAMPLE, get_registry().labels), n),
+        measure("node.analysis.analyze_with_ollama", lambda: analysis.analyze_with_ollama(SAMPLE, get_registry().labels), n),
+        measure("node.sentiment.analyze_sentiment_with_ollama", lambda: sentiment.analyze_sentiment_with_ollama(SAMPLE), n),
+        measure("node.tools.call_tools_for_intents",
+                lambda: tools.call_tools_for_intents(["order_status", "refund", "technical_issue"], SAMPLE, entities=entities),
+                cpu_n),
+        measure("node.response.ollama_generate_response",
+                lambda: response.ollama_generate_response(SAMPLE, ["billing"], actions, "negative", "high"), n),
+        measure("node.verification.verify",
+                lambda: verification.verify(0.5, [], "Some generated reply text", threshold=0.6), cpu_n),
+        measure("node.fallback.create_escalation_payload", lambda: fallback.create_escalation_payload(state), cpu_n),
+    ]
+
+
+def bench_workflow(n: int) -> List[Dict[str, Any]]:
+    from core.workflow import support_agent_workflow
+
+    return [
+        measure("workflow.sequential", lambda: support_agent_workflow(SAMPLE, concurrent=False), n),
+        measure("workflow.concurrent", lambda: support_agent_workflow(SAMPLE, concurrent=True), n),
+        measure("workflow.fused", lambda: support_agent_workflow(SAMPLE, fused=True), n),
+        measure("workflow.sequential[c=8]", lambda: support_agent_workflow(SAMPLE, concurrent=False), n * 4, concurrency=8),
+    ]
+
+
+def bench_db(n: int) -> List[Dict[str, Any]]:
+    from services import db_logger
+
+    payload = {
+        "input": SAMPLE, "intents": ["order_status"], "sentiment": "neutral", "urgency": "low",
+        "actions": [{"tool": "check_order_status", "status": "ok", "order_id": "ORD1234"}],
+        "response": "Order ORD1234 is shipped.", "escalation": False, "meta": {"entities": {"order_id": "ORD1234"}},
+    }
+    original = db_logger.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        db_logger.DB_PATH = Path(tmp) / "bench_logs.db"
+        try:
+            db_logger.init_db()
+            return [
+                measure("db.save_log", lambda: db_logger.save_log(payload), n * 5),
+                measure("db.save_log[c=8]", lambda: db_logger.save_log(payload), n * 20, concurrency=8),
+            ]
+        finally:
+            db_logger.DB_PATH = original
+
+
+# Entity extraction as it was before services/entities.py: one uncompiled re.search per
+# entity in preprocessing, plus mock_api re-parsing the order id on an uppercased copy.
+def _legacy_extract_entities(text: str) -> Dict[str, Any]:
+    entities = {}
+    m = re.search(r"\bORD[\d-]*\b", text, re.IGNORECASE)
+    if m:
+        entities["order_id"] = m.group(0).upper()
+    m2 = re.search(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", text)
+    if m2:
+        entities["email"] = m2.group(0).lower()
+    return entities
+
+
+def _legacy_extract_order_id(text: str) -> Optional[str]:
+    match = re.search(r"\bORD\d{3,}\b", text.upper())
+    return match.group(0) if match else None
+
+
+def bench_entities(n: int) -> List[Dict[str, Any]]:
+    from services import entities
+
+    long_text = " ".join([SAMPLE, "Refund RFD55512 was for $25.50 on 2025-09-01, ticket TKT123456,",
+                          "call me at +1 555 123 4567."] * 20)
+    # Most messages carry no entities at all; the prefilters skip every pattern here
+    plain_text = "My package is late and I need it asap, can you help me please?"
+
+    def legacy_pipeline(text: str) -> None:
+        # extract_entities once, then order_status + refund tools each re-parse the order id
+        _legacy_extract_entities(text)
+        _legacy_extract_order_id(text)
+        _legacy_extract_order_id(text)
+
+    def per_type(text: str) -> None:
+        # Same registry, one finditer per entity type instead of the combined pattern
+        for t in entities.entity_types():
+            list(re.finditer(t.pattern, text, re.IGNORECASE if t.ignore_case else 0))
+
+    cpu_n = n * 250
+    return [
+        measure("entities.legacy.extract_entities", lambda: _legacy_extract_entities(SAMPLE), cpu_n),
+        measure("entities.scan", lambda: entities.scan(SAMPLE), cpu_n),
+        measure("entities.extract_entities", lambda: entities.extract_entities(SAMPLE), cpu_n),
+        measure("entities.legacy.pipeline", lambda: legacy_pipeline(SAMPLE), cpu_n),
+        measure("entities.per_type", lambda: per_type(SAMPLE), cpu_n),
+        measure("entities.legacy.extract_entities[plain]", lambda: _legacy_extract_entities(plain_text), cpu_n),
+        measure("entities.extract_entities[plain]", lambda: entities.extract_entities(plain_text), cpu_n),
+        measure("entities.legacy.pipeline[long]", lambda: legacy_pipeline(long_text), n * 25),
+        measure("entities.per_type[long]", lambda: per_type(long_text), n * 25),
+        measure("entities.extract_entities[long]", lambda: entities.extract_entities(long_text), n * 25),
+    ]
+
+
+def bench_tools(n: int, latency_ms: float = 50.0) -> List[Dict[str, Any]]:
+    """
+    A three-tool message ("refund, order status and a broken login") against mock backends
+    with `latency_ms` each: concurrent dispatch vs calling the tools one after another.
+    Order status is read-only, so repeated lookups of the same order come from the tool cache.
+    """
+    from core.nodes import tools
+    from services import mock_api
+    from services.entities import extract_entities
+
+    text = "Refund ORD1234, where is ORD5678, and my login is broken"
+    intents = ["refund", "order_status", "technical_issue"]
+    entities = extract_entities(text)
+    original = dict(settings.MOCK_API_LATENCY_MS)
+    settings.MOCK_API_LATENCY_MS.update({name: latency_ms for name in original})
+
+    def sequential() -> None:
+        for fn in (mock_api.initiate_refund_tool, mock_api.check_order_status_tool, mock_api.open_ticket_tool):
+            fn(text, entities)
+
+    try:
+        return [
+            measure(f"tools.legacy.sequential[3x{latency_ms:g}ms]", sequential, n),
+            measure(f"tools.call_tools_for_intents[3x{latency_ms:g}ms]",
+                    lambda: tools.call_tools_for_intents(intents, text, entities=entities), n),
+            measure(f"tools.legacy.check_order_status[{latency_ms:g}ms]",
+                    lambda: mock_api.check_order_status_tool(text, entities), n),
+            measure("tools.call_tools_for_intents[order_status, cached]",
+                    lambda: tools.call_tools_for_intents(["order_status"], text, entities=entities), n),
+        ]
+    finally:
+        settings.MOCK_API_LATENCY_MS.update(original)
+
+
+def bench_startup(n: int) -> List[Dict[str, Any]]:
+    """
+    Cold import time in a fresh interpreter (what every process start, and the first
+    Streamlit run, pays). "python" is the interpreter floor; langchain.prompts is what the
+    workflow imported for its prompt templates before they became plain format strings.
+    """
+    import importlib.util
+
+    def cold(code: str) -> Callable[[], None]:
+        cmd = [sys.executable, "-c", code]
+        return lambda: subprocess.run(cmd, cwd=settings.BASE_DIR, check=True)
+
+    results = [
+        measure("startup.python", cold("pass"), n),
+        measure("startup.import.core.workflow", cold("import core.workflow"), n),
+        measure("startup.import.api", cold("import api"), n),
+    ]
+    if importlib.util.find_spec("langchain") is not None:
+        results.append(measure("startup.legacy.import.langchain.prompts", cold("import langchain.prompts"), n))
+    return results
+
+
+SUITES = {
+    "client": bench_client,
+    "nodes": bench_nodes,
+    "workflow": bench_workflow,
+    "db": bench_db,
+    "entities": bench_entities,
+    "tools": bench_tools,
+    "startup": bench_startup,
+}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance_pct: float) -> List[str]:
+    """
+    Print throughput / p95 deltas against a previous run; return the names that regressed
+    by more than tolerance_pct.
+    """
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"{'benchmark':52} {'ops/s':>10} {'Δ%':>8} {'p95 ms':>10} {'Δ%':>8}", file=sys.stderr)
+    for r in current["results"]:
+        b = base.get(r["name"])
+        if not b:
+            continue
+        d_tp = (r["throughput_ops_s"] - b["throughput_ops_s"]) / b["throughput_ops_s"] * 100 if b["throughput_ops_s"] else 0.0
+        d_p95 = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0.0
+        print(f"{r['name']:52} {r['throughput_ops_s']:>10} {d_tp:>8.1f} {r['p95_ms']:>10} {d_p95:>8.1f}", file=sys.stderr)
+        if d_tp < -tolerance_pct or d_p95 > tolerance_pct:
+            regressions.append(r["name"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks against a fake Ollama server")
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="run only these suites")
+    parser.add_argument("--iterations", type=int, default=20, help="base iteration count per benchmark")
+    parser.add_argument("--quick", action="store_true", help="iterations=5")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake server latency before first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=500.0, help="fake server token rate (0 = unlimited)")
+    parser.add_argument("--output", type=Path, default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", type=Path, default=None, help="previous results JSON to diff against")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="PCT",
+                        help="with --compare: exit 1 if throughput or p95 regresses by more than PCT%%")
+    args = parser.parse_args()
+
+    n = 5 if args.quick else args.iterations
+    suites = args.suite or list(SUITES)
+
+    # Measure the pipeline itself: no result cache, no local fast path short-circuiting LLM calls
+    settings.FAST_INTENT_ENABLED = False
+    with FakeOllamaServer(latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec) as server:
+        ollama_client.set_client(OllamaClient(base_url=server.url, cache=None))
+        results: List[Dict[str, Any]] = []
+        for name in suites:
+            results.extend(SUITES[name](n))
+        upstream_requests = server.requests
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fake_ollama": {"latency_ms": args.latency_ms, "tokens_per_sec": args.tokens_per_sec},
+            "iterations": n,
+            "upstream_requests": upstream_requests,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")),
+                              args.fail_on_regression or 0.0)
+        if args.fail_on_regression is not None and regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
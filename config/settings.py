@@ -13,4 +13,160 @@ CONFIDENCE_THRESHOLD = 0.6
 
 # Database path for logs
 DB_PATH = BASE_DIR / "data" / "agent_logs.db"
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# Intent registry (core/intents.py): config file and how often running processes check it
+# for changes (seconds; None = load once)
+INTENTS_PATH = BASE_DIR / "config" / "intents.yaml"
+INTENTS_RELOAD_INTERVAL = 2.0
+
+# Tool execution (services/tools.py): the tool calls of a message run concurrently on
+# TOOL_MAX_WORKERS threads. A call is abandoned after TOOL_TIMEOUTS[tool] (default
+# TOOL_DEFAULT_TIMEOUT) seconds; after TOOL_BREAKER_FAILURES failures in a row a tool is
+# skipped for TOOL_BREAKER_RESET seconds, then probed with a single call.
+TOOL_MAX_WORKERS = 16
+TOOL_DEFAULT_TIMEOUT = 5.0
+TOOL_TIMEOUTS = {"check_order_status": 3.0}
+TOOL_BREAKER_FAILURES = 5
+TOOL_BREAKER_RESET = 30.0
+
+# Tool result reuse (services/tools.py). Read-only tools cache successful results by their
+# key entities for TOOL_CACHE_TTL[tool] (default TOOL_CACHE_DEFAULT_TTL; 0 = off) seconds.
+# Mutating tools (refunds, tickets) store their result under a session + intent + key
+# entities idempotency key (the message instead when no key entity is present) for a
+# TOOL_IDEMPOTENCY_TTL-second retry window, so retrying the same request returns the
+# original id; TOOL_IDEMPOTENCY_PERSIST keeps those records in SQLite across restarts.
+TOOL_CACHE_TTL = {"check_order_status": 60}
+TOOL_CACHE_DEFAULT_TTL = 30
+TOOL_CACHE_MAX_ENTRIES = 10000
+TOOL_IDEMPOTENCY_TTL = 300
+TOOL_IDEMPOTENCY_MAX_ENTRIES = 10000
+TOOL_IDEMPOTENCY_PERSIST = False
+TOOL_IDEMPOTENCY_DB_PATH = DB_PATH.parent / "tool_idempotency.db"
+
+# Simulated backend latency of the mock tools (services/mock_api.py) in milliseconds, so
+# tool execution can be benchmarked offline
+MOCK_API_LATENCY_MS = {"check_order_status": 0, "initiate_refund": 0, "open_ticket": 0}
+
+# Workflow execution: run independent nodes (classification, sentiment, entities) in parallel
+WORKFLOW_CONCURRENT = False
+WORKFLOW_MAX_WORKERS = 4
+
+# Ollama HTTP client: keep-alive pool, timeouts (seconds) and retries with exponential backoff
+OLLAMA_POOL_SIZE = 10
+OLLAMA_CONNECT_TIMEOUT = 5
+OLLAMA_TOTAL_TIMEOUT = 120
+OLLAMA_MAX_RETRIES = 2
+OLLAMA_RETRY_BACKOFF = 0.5
+
+# Ollama generation defaults: how long the model stays loaded after a call (keeps its
+# prompt KV cache warm between messages), one context size for every call (a different
+# num_ctx forces a reload) and whether app startup preloads the configured models
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_NUM_CTX = 2048
+OLLAMA_WARMUP = True
+
+# Single-flight: identical concurrent LLM calls (same model, prompt and options) share one
+# upstream request instead of each hitting Ollama
+OLLAMA_COALESCE = True
+
+# Admission control in front of Ollama: at most OLLAMA_MAX_IN_FLIGHT generations at once
+# (match the server's OLLAMA_NUM_PARALLEL), the rest queue by priority for at most
+# OLLAMA_QUEUE_DEADLINE seconds before the workflow falls back to its degraded path
+# (heuristic sentiment, local intent guess, canned reply). 0 disables the limiter.
+OLLAMA_MAX_IN_FLIGHT = 4
+OLLAMA_MAX_QUEUE = 64
+OLLAMA_QUEUE_DEADLINE = 8.0
+
+# Model routing (services/router.py): model and endpoint pool per task. Pools list Ollama
+# base URLs; calls are balanced across a pool's healthy endpoints, and an endpoint that
+# cannot be reached is retried / re-probed every OLLAMA_HEALTH_INTERVAL seconds. Example split:
+#   OLLAMA_POOLS = {"default": [OLLAMA_URL], "gpu": ["http://gpu-1:11434", "http://gpu-2:11434"]}
+#   MODEL_ROUTES["response"] = {"model": "llama3.1:8b", "pool": "gpu"}
+OLLAMA_POOLS = {"default": [OLLAMA_URL]}
+MODEL_ROUTES = {
+    "classify": {"model": OLLAMA_MODEL, "pool": "default"},
+    "sentiment": {"model": OLLAMA_MODEL, "pool": "default"},
+    "analysis": {"model": OLLAMA_MODEL, "pool": "default"},
+    "response": {"model": OLLAMA_MODEL, "pool": "default"},
+}
+OLLAMA_HEALTH_INTERVAL = 15
+
+# LLM result cache: in-memory LRU (+ optional SQLite tier next to DB_PATH).
+# Deterministic calls (temperature == 0) are cached; other calls only when they opt in.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_MAX_ENTRIES = 1024
+LLM_CACHE_TTL = 3600
+LLM_CACHE_PERSIST = False
+LLM_CACHE_DB_PATH = DB_PATH.parent / "llm_cache.db"
+# Rows kept in the SQLite tier; expired and surplus rows are purged on open and every 1000 writes
+LLM_CACHE_PERSIST_MAX_ROWS = 100000
+LLM_CACHE_RESPONSES = False
+
+# Local fast-path intent classifier (train with `python -m core.nodes.fast_intent train`)
+FAST_INTENT_ENABLED = True
+FAST_INTENT_THRESHOLD = 0.85
+# Under load (LLM queue saturated) the local guess is used down to this confidence
+FAST_INTENT_DEGRADED_THRESHOLD = 0.5
+FAST_INTENT_MAX_WORDS = 6
+FAST_INTENT_MODEL_PATH = DB_PATH.parent / "fast_intent.npz"
+# Training reads at most this many of the most recent log rows
+FAST_INTENT_TRAIN_MAX_ROWS = 10000
+
+# Fused analysis: one structured LLM call for intents, confidence, sentiment and urgency
+FUSED_ANALYSIS = False
+
+# Stream LLM replies token by token to the UI
+STREAM_RESPONSES = True
+
+# SQLite logging: WAL mode + a writer thread that group-commits up to DB_BATCH_SIZE queued rows.
+# DB_BATCH_WAIT_MS > 0 makes the writer linger for more writes to join a batch.
+DB_BATCH_SIZE = 64
+DB_BATCH_WAIT_MS = 0
+DB_BUSY_TIMEOUT_MS = 5000
+
+# Background interaction logging: bounded queue drained in batches by a worker thread.
+# LOG_BACKPRESSURE when the queue is full: "block", "drop_oldest" or "spill" (append to LOG_SPILL_PATH)
+LOG_PIPELINE_ENABLED = True
+LOG_QUEUE_MAXSIZE = 1000
+LOG_BATCH_SIZE = 100
+LOG_BACKPRESSURE = "block"
+LOG_SPILL_PATH = DB_PATH.parent / "log_spill.jsonl"
+
+# Prometheus-format metrics endpoint (GET /metrics); set METRICS_PORT = None to disable
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+
+# Headless API server (python -m api): API_MAX_WORKERS workflow runs at once (each holds a
+# thread while it waits on Ollama; admission control still bounds the LLM calls themselves)
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_MAX_WORKERS = 32
+API_BACKLOG = 256
+API_MAX_BODY_BYTES = 64 * 1024
+API_KEEP_ALIVE_TIMEOUT = 30
+
+# Multi-turn conversations: the last SESSION_WINDOW_TURNS turns are kept verbatim (compacted),
+# older ones are folded into a rolling summary capped at SESSION_SUMMARY_MAX_CHARS.
+# SESSION_STORE: "memory" (LRU of SESSION_MAX_IN_MEMORY sessions) or "sqlite" (SESSION_DB_PATH)
+SESSION_WINDOW_TURNS = 6
+SESSION_RECENT_INTENTS = 5
+SESSION_SUMMARY_MAX_CHARS = 600
+SESSION_FOLLOWUP_MAX_WORDS = 6
+SESSION_STORE = "memory"
+SESSION_MAX_IN_MEMORY = 1000
+SESSION_DB_PATH = DB_PATH.parent / "sessions.db"
+
+# Chat transcript messages kept per Streamlit session (older ones scroll off the page)
+UI_HISTORY_MAX_MESSAGES = 100
+
+# Prompt token budgets (estimated tokens, see services/token_budget.py) per prompt and field.
+# Oversized fields are trimmed deterministically before the LLM call; None disables a budget.
+TOKEN_ESTIMATE_CHARS_PER_TOKEN = 4
+PROMPT_BUDGETS = {
+    "intent": {"text": 256, "intents_list": 128},
+    "dynamic_intent": {"text": 256},
+    "sentiment": {"text": 192},
+    "fused_analysis": {"text": 256, "intents_list": 128},
+    "response": {"user": 384, "action_results": 256, "context": 256},
+}
@@ -0,0 +1,209 @@
+# core/batch.py
+"""
+Batch / replay runner for offline evaluation.
+
+Pushes messages from data/examples.json, a JSONL file or the `logs` table through
+support_agent_workflow with bounded concurrency, streams one JSON result per message
+and prints aggregate throughput, latency percentiles and escalation rate.
+
+Examples:
+    python -m core.batch --examples data/examples.json
+    python -m core.batch --jsonl messages.jsonl --concurrency 8 --output results.jsonl
+    python -m core.batch --logs --since 2025-09-01 --limit 100000 --output replay.jsonl
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+from config import settings
+from core.workflow import support_agent_workflow
+
+
+# ---------------- Sources ----------------
+def iter_examples(path: Path) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for item in data:
+        if isinstance(item, str) and item.strip():
+            yield item
+
+
+def iter_jsonl(path: Path) -> Iterator[str]:
+    """
+    One message per line, either a JSON string or an object with "input", "message" or "text".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(item, dict):
+                item = item.get("input") or item.get("message") or item.get("text")
+            if isinstance(item, str) and item.strip():
+                yield item
+
+
+def iter_logs(db_path: Path = settings.DB_PATH, since: Optional[str] = None) -> Iterator[str]:
+    """
+    Replay user inputs from the logs table in id order, reading rows lazily.
+    """
+    query = "SELECT input FROM logs WHERE input IS NOT NULL"
+    params: tuple = ()
+    if since:
+        query += " AND ts >= ?"
+        params = (since,)
+    query += " ORDER BY id"
+    conn = sqlite3.connect(db_path)
+    try:
+        for (text,) in conn.execute(query, params):
+            if text and text.strip():
+                yield text
+    finally:
+        conn.close()
+
+
+# ---------------- Runner ----------------
+def _percentile(sorted_values: array, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def _run_one(index: int, text: str, workflow_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        state = support_agent_workflow(text, **workflow_kwargs)
+        error = None
+    except Exception as e:  # keep the batch going; record the failure
+        state, error = {}, f"{type(e).__name__}: {e}"
+    latency_ms = (time.perf_counter() - start) * 1000.0
+    return {
+        "index": index,
+        "input": text,
+        "intents": state.get("intents"),
+        "confidence": state.get("confidence_score"),
+        "sentiment": state.get("sentiment"),
+        "urgency": state.get("urgency"),
+        "escalation": bool(state.get("escalation_flag")),
+        "response": state.get("response_text"),
+        "latency_ms": round(latency_ms, 2),
+        "error": error,
+    }
+
+
+def run_batch(
+    messages: Iterable[str],
+    out: TextIO,
+    concurrency: int = 4,
+    limit: Optional[int] = None,
+    **workflow_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Run messages through the workflow with at most `concurrency` in flight, writing each
+    result to `out` as a JSON line as soon as it completes. Only latencies are retained
+    (as a compact float array) so arbitrarily long replays stay bounded in memory.
+    Returns the aggregate summary.
+    """
+    latencies = array("d")
+    escalations = 0
+    errors = 0
+    count = 0
+    started = time.perf_counter()
+
+    def drain(done) -> None:
+        nonlocal escalations, errors, count
+        for fut in done:
+            result = fut.result()
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            latencies.append(result["latency_ms"])
+            escalations += int(result["escalation"])
+            errors += int(result["error"] is not None)
+            count += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        in_flight: set = set()
+        for index, text in enumerate(messages):
+            if limit is not None and index >= limit:
+                break
+            if len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            in_flight.add(pool.submit(_run_one, index, text, workflow_kwargs))
+        done, _ = wait(in_flight)
+        drain(done)
+    out.flush()
+
+    elapsed = time.perf_counter() - started
+    ordered = array("d", sorted(latencies))
+    return {
+        "messages": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msg_s": round(count / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+            "p99": _percentile(ordered, 99),
+            "max": ordered[-1] if ordered else 0.0,
+        },
+        "escalation_rate": round(escalations / count, 4) if count else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch / replay runner for support_agent_workflow")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--examples", type=Path, help="JSON list of messages (e.g. data/examples.json)")
+    src.add_argument("--jsonl", type=Path, help="JSONL file of messages")
+    src.add_argument("--logs", action="store_true", help="replay inputs from the logs table")
+    parser.add_argument("--since", help="with --logs: only rows with ts >= this value")
+    parser.add_argument("--limit", type=int, default=None, help="stop after N messages")
+    parser.add_argument("--concurrency", type=int, default=4, help="messages in flight")
+    parser.add_argument("--output", type=Path, default=None, help="per-message JSONL results (default: stdout)")
+    parser.add_argument("--summary", type=Path, default=None, help="write the aggregate summary JSON here")
+    parser.add_argument("--no-mock", action="store_true", help="do not call the mock APIs")
+    parser.add_argument("--fused", action="store_true", help="use fused analysis")
+    parser.add_argument("--concurrent-nodes", action="store_true", help="run independent nodes in parallel")
+    args = parser.parse_args()
+
+    if args.examples:
+        messages = iter_examples(args.examples)
+    elif args.jsonl:
+        messages = iter_jsonl(args.jsonl)
+    else:
+        messages = iter_logs(since=args.since)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_batch(
+            messages,
+            out,
+            concurrency=args.concurrency,
+            limit=args.limit,
+            use_mock=not args.no_mock,
+            fused=args.fused,
+            concurrent=args.concurrent_nodes,
+        )
+    finally:
+        if args.output:
+            out.close()
+
+    text = json.dumps(summary, indent=2)
+    if args.summary:
+        args.summary.write_text(text + "\n", encoding="utf-8")
+    print(text, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
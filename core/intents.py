@@ -0,0 +1,220 @@
+# core/intents.py
+"""
+Intent registry: every intent's tool, canned reply, synonyms and escalation policy, loaded
+from config/intents.yaml and compiled into dict / set lookups so per-message checks
+(normalizing a label, finding its reply or tool, recognizing a canned reply) are O(1).
+
+The registry is immutable; get_registry() re-stats the file at most every
+INTENTS_RELOAD_INTERVAL seconds and swaps in a freshly compiled registry when it changed,
+so intents can be added while the app / API keeps serving. A message that started with
+the old registry finishes with it. A file that fails to load is reported in
+reload_status() and the agent_intents_reload_total metric, and the previous registry stays.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from services import metrics
+
+ESCALATION_POLICIES = ("auto", "always", "never")
+INTENT_FIELDS = ("tool", "reply", "synonyms", "escalation", "classify")
+
+RELOADS = metrics.REGISTRY.counter("agent_intents_reload_total", "Intent registry (re)loads", ("result",))
+
+
+class Intent(NamedTuple):
+    name: str
+    tool: Optional[str] = None
+    reply: Optional[str] = None
+    synonyms: Tuple[str, ...] = ()
+    escalation: str = "auto"
+    classify: bool = True
+
+
+def _parse_intent(name: str, spec: Any) -> Intent:
+    if spec is None:
+        return Intent(name)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Intent {name!r}: expected a mapping, got {type(spec).__name__}")
+    unknown = set(spec) - set(INTENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Intent {name!r}: unknown field(s) {', '.join(sorted(unknown))}")
+    escalation = spec.get("escalation") or "auto"
+    if escalation not in ESCALATION_POLICIES:
+        raise ValueError(f"Intent {name!r}: escalation must be one of {', '.join(ESCALATION_POLICIES)}")
+    synonyms = spec.get("synonyms") or ()
+    if isinstance(synonyms, str):
+        synonyms = (synonyms,)
+    return Intent(
+        name=name,
+        tool=spec.get("tool") or None,
+        reply=spec.get("reply") or None,
+        synonyms=tuple(str(s) for s in synonyms),
+        escalation=escalation,
+        classify=bool(spec.get("classify", True)),
+    )
+
+
+class IntentRegistry:
+    """
+    Compiled, read-only view of the intents config.
+    """
+
+    def __init__(self, intents: List[Intent]):
+        self.intents: Dict[str, Intent] = {}
+        self._canonical: Dict[str, str] = {}
+        for intent in intents:
+            if intent.name in self.intents:
+                raise ValueError(f"Intent {intent.name!r} is defined twice")
+            self.intents[intent.name] = intent
+        for intent in intents:
+            for synonym in intent.synonyms:
+                owner = self._canonical.get(synonym)
+                if synonym in self.intents or (owner and owner != intent.name):
+                    raise ValueError(f"Synonym {synonym!r} of {intent.name!r} is already an intent or synonym")
+                self._canonical[synonym] = intent.name
+
+        # Labels offered to the classifiers, in config order
+        self.labels: List[str] = [i.name for i in intents if i.classify]
+        self.synonyms: Dict[str, str] = dict(self._canonical)
+        self._replies: Dict[str, str] = {i.name: i.reply for i in intents if i.reply}
+        self._tools: Dict[str, str] = {i.name: i.tool for i in intents if i.tool}
+        self._escalation: Dict[str, str] = {i.name: i.escalation for i in intents if i.escalation != "auto"}
+        self.canned_replies: FrozenSet[str] = frozenset(self._replies.values())
+
+    @classmethod
+    def from_config(cls, cfg: Any) -> "IntentRegistry":
+        """
+        Build from the parsed YAML: {"intents": {name: spec | None}} or the older
+        {"intents": [name, ...]}.
+        """
+        entries = cfg.get("intents") if isinstance(cfg, dict) else None
+        if isinstance(entries, list):
+            return cls([Intent(str(name)) for name in entries])
+        if isinstance(entries, dict):
+            return cls([_parse_intent(str(name), spec) for name, spec in entries.items()])
+        raise ValueError("intents config must have an 'intents' list or mapping")
+
+    @classmethod
+    def from_file(cls, path: Path) -> "IntentRegistry":
+        import yaml  # only needed on (re)load, keeps it out of the import path
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_config(yaml.safe_load(f))
+
+    # ---------------- Lookups ----------------
+    def normalize(self, label: str) -> str:
+        """
+        Canonical intent for a variant / dynamic label; unknown labels pass through.
+        """
+        if not label:
+            return label
+        return self._canonical.get(label, label)
+
+    def reply(self, intent: str) -> Optional[str]:
+        return self._replies.get(self.normalize(intent))
+
+    def tool(self, intent: str) -> Optional[str]:
+        return self._tools.get(intent)
+
+    def escalation(self, intent: str) -> str:
+        return self._escalation.get(intent, "auto")
+
+    def combine_replies(self, intents: List[str]) -> Optional[str]:
+        """
+        Canned replies of all (normalized) intents that have one, deduplicated in order,
+        joined into one message; None if none has a reply.
+        """
+        parts = dict.fromkeys(r for r in map(self.reply, intents) if r)
+        return " ".join(parts) if parts else None
+
+    def is_canned(self, text: Optional[str]) -> bool:
+        return text in self.canned_replies
+
+
+class _RegistryHolder:
+    """
+    Current registry plus the file state it was built from; reloads when the file changes.
+    """
+
+    def __init__(self, path: Path, interval: Optional[float]):
+        self.path = Path(path)
+        self.interval = interval
+        self.registry: Optional[IntentRegistry] = None
+        self.version = 0
+        self.loaded_at = 0.0
+        self.error: Optional[str] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _fresh(self, now: float) -> bool:
+        return self.registry is not None and (self.interval is None or now - self._checked < self.interval)
+
+    def get(self, force: bool = False) -> IntentRegistry:
+        registry = self.registry
+        if not force and self._fresh(time.monotonic()):
+            return registry
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._fresh(now):
+                return self.registry
+            self._checked = now
+            stamp = self._file_stamp()
+            if force or self.registry is None or stamp != self._stamp:
+                self._load(stamp, strict=force)
+            return self.registry
+
+    def _load(self, stamp: Optional[Tuple[int, int]], strict: bool) -> None:
+        try:
+            registry = IntentRegistry.from_file(self.path)
+        except Exception as exc:
+            RELOADS.inc(result="error")
+            self.error = f"{type(exc).__name__}: {exc}"
+            self._stamp = stamp  # do not re-parse the same broken file on every check
+            if strict or self.registry is None:
+                raise
+            return
+        RELOADS.inc(result="ok")
+        self.registry = registry
+        self._stamp = stamp
+        self.version += 1
+        self.loaded_at = time.time()
+        self.error = None
+
+
+_holder = _RegistryHolder(settings.INTENTS_PATH, settings.INTENTS_RELOAD_INTERVAL)
+
+
+def get_registry() -> IntentRegistry:
+    """
+    Current intent registry, reloaded when config/intents.yaml changes.
+    """
+    return _holder.get()
+
+
+def reload() -> IntentRegistry:
+    """
+    Re-read the config now (e.g. from an admin hook); raises if it is invalid.
+    """
+    return _holder.get(force=True)
+
+
+def reload_status() -> Dict[str, Any]:
+    return {
+        "path": str(_holder.path),
+        "version": _holder.version,
+        "loaded_at": _holder.loaded_at,
+        "intents": len(_holder.registry.intents) if _holder.registry else 0,
+        "error": _holder.error,
+    }
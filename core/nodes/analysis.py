@@ -0,0 +1,89 @@
+# core/nodes/analysis.py
+import json
+import re
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from services import router
+from services.scheduler import PRIORITY_HIGH
+from services.token_budget import fit_items, fit_text
+from core.nodes import responses as responses_module
+
+# One prompt for intents + confidence + sentiment + urgency ("fused analysis"); the user
+# message goes last so the instruction prefix stays identical between calls
+FUSED_ANALYSIS_PROMPT = (
+    "You are a customer support message analyzer.\n\n"
+    "Available intents (user may express more than one):\n{intents_list}, unknown\n\n"
+    "Rules:\n"
+    "- Choose one or more intents from the list; use 'unknown' if none match.\n"
+    "- Include every intent that is present.\n"
+    "- sentiment is one of positive, neutral, negative.\n"
+    "- urgency is one of low, medium, high.\n\n"
+    "Return JSON strictly in this format:\n"
+    "{{\"intents\": [\"<intent1>\", \"<intent2>\"], \"confidence\": 0.92, "
+    "\"sentiment\": \"neutral\", \"urgency\": \"low\"}}\n\n"
+    "User message:\n{text}\n"
+)
+
+
+class FusedAnalysis(BaseModel):
+    intents: List[str] = Field(min_length=1)
+    confidence: float = Field(ge=0.0, le=1.0)
+    sentiment: Literal["positive", "neutral", "negative"]
+    urgency: Literal["low", "medium", "high"]
+
+    @field_validator("intents", mode="before")
+    @classmethod
+    def _coerce_intents(cls, v):
+        if isinstance(v, str):
+            v = [v]
+        return [i for i in v if i] if isinstance(v, list) else v
+
+    @field_validator("sentiment", "urgency", mode="before")
+    @classmethod
+    def _lower(cls, v):
+        return v.strip().lower() if isinstance(v, str) else v
+
+
+def _extract_json(out: str) -> str:
+    # Small models sometimes wrap JSON in ``` fences or add chatter around it
+    m = re.search(r"\{.*\}", out, re.DOTALL)
+    return m.group(0) if m else out
+
+
+def parse_fused_output(out: str, intents_list: List[str]) -> Optional[FusedAnalysis]:
+    """
+    Validate the model output against FusedAnalysis. Intents are normalized, restricted to
+    the known list (+ unknown) and deduplicated. Returns None if the output is unusable.
+    """
+    try:
+        result = FusedAnalysis.model_validate(json.loads(_extract_json(out)))
+    except (json.JSONDecodeError, ValidationError, TypeError):
+        return None
+
+    allowed = set(intents_list) | {"unknown"}
+    normalized = [responses_module.normalize_intent(i) for i in result.intents]
+    seen = set()
+    intents = [x for x in normalized if x in allowed and not (x in seen or seen.add(x))]
+    if not intents:
+        return None
+    result.intents = intents
+    return result
+
+
+def analyze_with_ollama(text: str, intents_list: List[str], model: Optional[str] = None) -> Optional[FusedAnalysis]:
+    """
+    Single LLM call returning intents, confidence, sentiment and urgency together.
+    Returns None on client errors or invalid output so the caller can fall back
+    to the per-node classifier + sentiment path.
+    """
+    prompt = FUSED_ANALYSIS_PROMPT.format(
+        text=fit_text("fused_analysis", "text", text),
+        intents_list=fit_items("fused_analysis", "intents_list", [i for i in intents_list if i != "unknown"]),
+    )
+    out = router.generate(
+        "analysis", prompt, model=model, max_tokens=160, temperature=0.0, format="json", priority=PRIORITY_HIGH
+    )
+
+    if isinstance(out, str) and out.startswith("[Ollama Error:"):
+        return None
+    return parse_fused_output(out, intents_list)
@@ -1,40 +1,41 @@
 # core/nodes/classifier.py
-from typing import Tuple, List
-from langchain.prompts import PromptTemplate
-from services.ollama_client import ollama_generate
-from config.settings import OLLAMA_MODEL
+from typing import Tuple, List, Optional
+from services import router
+from services.scheduler import PRIORITY_HIGH
+from services.token_budget import fit_items, fit_text
 import json
 from core.nodes import responses as responses_module
 
+# Below this static-classification confidence the dynamic fallback is tried
+STATIC_CONFIDENCE_THRESHOLD = 0.7
+
+# Prompts keep the static instructions first and the user message last, so consecutive
+# calls share a prompt prefix Ollama can reuse from the loaded model's KV cache.
+# Both are sent with format="json" (output constrained to valid JSON).
+
 # Prompt for static intent classification (multi-intent aware)
-INTENT_PROMPT = PromptTemplate(
-    input_variables=["text", "intents_list"],
-    template=(
-        "You are an intent classification model.\n\n"
-        "User message:\n{text}\n\n"
-        "Available intents (user may express more than one):\n{intents_list}, unknown\n\n"
-        "Rules:\n"
-        "- Choose one or more intents that match.\n"
-        "- If no clear match exists, use 'unknown'.\n"
-        "- If multiple intents are present, include all (the list can have 1, 2, 3, or more intents).\n"
-        "- Only use intents from the provided list.\n\n"
-        "Return JSON strictly in this format:\n"
-        "{{\"intents\": [\"<intent1>\", \"<intent2>\", \"<intent3>\"], \"confidence\": 0.92}}\n\n"
-    ),
+INTENT_PROMPT = (
+    "You are an intent classification model.\n\n"
+    "Available intents (user may express more than one):\n{intents_list}, unknown\n\n"
+    "Rules:\n"
+    "- Choose one or more intents that match.\n"
+    "- If no clear match exists, use 'unknown'.\n"
+    "- If multiple intents are present, include all (the list can have 1, 2, 3, or more intents).\n"
+    "- Only use intents from the provided list.\n\n"
+    "Return JSON strictly in this format:\n"
+    "{{\"intents\": [\"<intent1>\", \"<intent2>\", \"<intent3>\"], \"confidence\": 0.92}}\n\n"
+    "User message:\n{text}\n"
 )
 
 # Fallback dynamic intent generator
-DYNAMIC_INTENT_PROMPT = PromptTemplate(
-    input_variables=["text"],
-    template=(
-        "You are an intent extraction model.\n\n"
-        "User message:\n{text}\n\n"
-        "If it does not clearly match known intents, create one or more descriptive new intent labels in snake_case.\n"
-        "Keep them concise (1–2 words).\n\n"
-        "Reject pure nonsense words (like 'blibberblop') and instead return ['unknown'].\n\n"
-        "Return JSON strictly in this format:\n"
-        "{{\"intents\": [\"<intent1>\", \"<intent2>\", \"<intent3>\"], \"confidence\": 0.8}}"
-    ),
+DYNAMIC_INTENT_PROMPT = (
+    "You are an intent extraction model.\n\n"
+    "If the user message does not clearly match known intents, create one or more descriptive new intent labels in snake_case.\n"
+    "Keep them concise (1–2 words).\n\n"
+    "Reject pure nonsense words (like 'blibberblop') and instead return ['unknown'].\n\n"
+    "Return JSON strictly in this format:\n"
+    "{{\"intents\": [\"<intent1>\", \"<intent2>\", \"<intent3>\"], \"confidence\": 0.8}}\n\n"
+    "User message:\n{text}\n"
 )
 
 
@@ -45,8 +46,51 @@ def _safe_parse_json_or_empty(s: str) -> dict:
         return {}
 
 
+def classify_dynamic_intent(text: str, intents_list: List[str], model: Optional[str] = None) -> Tuple[List[str], float]:
+    """
+    Dynamic fallback: let the model propose descriptive intent labels, rejecting nonsense.
+    Returns ["unknown"] when nothing usable comes back. `model` overrides the routed model.
+    """
+    dyn_prompt = DYNAMIC_INTENT_PROMPT.format(text=fit_text("dynamic_intent", "text", text))
+    out_dyn = router.generate(
+        "classify", dyn_prompt, model=model, max_tokens=96, temperature=0.0, format="json", priority=PRIORITY_HIGH
+    )
+
+    if isinstance(out_dyn, str) and out_dyn.startswith("[Ollama Error:"):
+        return ["unknown"], 0.0
+
+    parsed_dyn = _safe_parse_json_or_empty(out_dyn)
+    dyn_intents = parsed_dyn.get("intents") or parsed_dyn.get("intent") or []
+    try:
+        dyn_conf = float(parsed_dyn.get("confidence", 0.8))
+    except Exception:
+        dyn_conf = 0.8
+
+    if isinstance(dyn_intents, str):
+        dyn_intents = [dyn_intents]
+
+    # Sanity filter: reject nonsense (words without vowels or too short)
+    clean_intents = [
+        i for i in dyn_intents
+        if i in intents_list + ["unknown"]
+        or (any(v in i for v in "aeiou") and len(i) > 3)
+    ]
+
+    if clean_intents:
+        normalized = [responses_module.normalize_intent(i) for i in clean_intents]
+        # dedupe preserving order
+        seen = set()
+        normalized_unique = [x for x in normalized if not (x in seen or seen.add(x))]
+        return normalized_unique, dyn_conf
+    else:
+        return ["unknown"], 0.5
+
+
 def classify_intent_with_ollama(
-    text: str, intents_list: List[str], confidence_threshold: float = 0.7
+    text: str,
+    intents_list: List[str],
+    confidence_threshold: float = STATIC_CONFIDENCE_THRESHOLD,
+    model: Optional[str] = None,
 ) -> Tuple[List[str], float]:
     """
     Multi-intent classification pipeline:
@@ -56,13 +100,20 @@ def classify_intent_with_ollama(
 
     Normalizes returned intents using responses.normalize_intent.
     Handles Ollama client error strings gracefully.
+    Runs on the "classify" route (services/router.py); `model` overrides its model.
     """
     intents: List[str] = []
     confidence: float = 0.0
 
     # --- Step 1: Try static classification ---
-    prompt = INTENT_PROMPT.format(text=text, intents_list=", ".join(intents_list))
-    out = ollama_generate(prompt, model=OLLAMA_MODEL, max_tokens=256, temperature=0.0)
+    # "unknown" is always appended by the template
+    prompt = INTENT_PROMPT.format(
+        text=fit_text("intent", "text", text),
+        intents_list=fit_items("intent", "intents_list", [i for i in intents_list if i != "unknown"]),
+    )
+    out = router.generate(
+        "classify", prompt, model=model, max_tokens=128, temperature=0.0, format="json", priority=PRIORITY_HIGH
+    )
 
     # Handle Ollama client-level errors (service unreachable, etc.)
     if isinstance(out, str) and out.startswith("[Ollama Error:"):
@@ -81,37 +132,7 @@ def classify_intent_with_ollama(
 
     # --- Step 2: Fallback if low confidence OR nonsense ---
     if (confidence < confidence_threshold) or (not intents):
-        dyn_prompt = DYNAMIC_INTENT_PROMPT.format(text=text)
-        out_dyn = ollama_generate(dyn_prompt, model=OLLAMA_MODEL, max_tokens=128, temperature=0.0)
-
-        if isinstance(out_dyn, str) and out_dyn.startswith("[Ollama Error:"):
-            return ["unknown"], 0.0
-
-        parsed_dyn = _safe_parse_json_or_empty(out_dyn)
-        dyn_intents = parsed_dyn.get("intents") or parsed_dyn.get("intent") or []
-        try:
-            dyn_conf = float(parsed_dyn.get("confidence", 0.8))
-        except Exception:
-            dyn_conf = 0.8
-
-        if isinstance(dyn_intents, str):
-            dyn_intents = [dyn_intents]
-
-        # Sanity filter: reject nonsense (words without vowels or too short)
-        clean_intents = [
-            i for i in dyn_intents
-            if i in intents_list + ["unknown"]
-            or (any(v in i for v in "aeiou") and len(i) > 3)
-        ]
-
-        if clean_intents:
-            normalized = [responses_module.normalize_intent(i) for i in clean_intents]
-            # dedupe preserving order
-            seen = set()
-            normalized_unique = [x for x in normalized if not (x in seen or seen.add(x))]
-            return normalized_unique, dyn_conf
-        else:
-            return ["unknown"], 0.5
+        return classify_dynamic_intent(text, intents_list, model)
 
     # Normalize intents before returning
     normalized = [responses_module.normalize_intent(i) for i in intents]
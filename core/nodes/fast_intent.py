@@ -0,0 +1,372 @@
+# core/nodes/fast_intent.py
+"""
+Local fast-path intent classifier.
+
+Hashed character n-gram TF-IDF features + a softmax linear model trained in NumPy on
+the intent registry's labels and synonyms (config/intents.yaml) and the most recent
+FAST_INTENT_TRAIN_MAX_ROWS rows of the logged history in the `logs` table. When it is
+confident about a short, single-intent message the workflow skips the LLM classifier entirely.
+
+Features are kept sparse (only the hashed n-grams a text contains) and the gradient is
+accumulated over mini-batches of rows, so training memory grows with the number of
+distinct examples, not examples × N_FEATURES.
+
+Train / refresh the serialized model:
+    python -m core.nodes.fast_intent train
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import settings
+from core.intents import get_registry
+from services import metrics
+
+# NumPy is imported where it is used: importing the workflow (and so this module) stays
+# cheap, and it is loaded with the model on the first message instead.
+if TYPE_CHECKING:
+    import numpy as np
+
+N_FEATURES = 2 ** 14
+NGRAM_RANGE = (2, 4)
+BATCH_ROWS = 1024
+
+
+# ---------------- Features ----------------
+def _tokens(text: str) -> List[str]:
+    text = text.lower().replace("_", " ")
+    words = re.findall(r"[a-z0-9']+", text)
+    feats = [f"w:{w}" for w in words]
+    for w in words:
+        padded = f" {w} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            feats.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    return feats
+
+
+def _term_counts(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse hashed term counts of one text: (feature indices, counts).
+    """
+    import numpy as np
+
+    hashed = np.fromiter(
+        (zlib.crc32(tok.encode("utf-8")) % N_FEATURES for tok in _tokens(text)), dtype=np.int32
+    )
+    indices, counts = np.unique(hashed, return_counts=True)
+    return indices.astype(np.int32), counts.astype(np.float32)
+
+
+def _tfidf(counts: np.ndarray, idf_values: np.ndarray) -> np.ndarray:
+    """
+    L2-normalized TF-IDF weights of one text's (or a CSR row range's) nonzero features.
+    """
+    import numpy as np
+
+    values = np.log1p(counts) * idf_values
+    norm = float(np.linalg.norm(values))
+    return values / norm if norm else values
+
+
+class _SparseRows:
+    """
+    CSR matrix of TF-IDF rows: row i has features indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, rows: List[Tuple[np.ndarray, np.ndarray]], idf: np.ndarray):
+        import numpy as np
+
+        lengths = np.array([len(indices) for indices, _ in rows], dtype=np.int64)
+        self.indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.indices = np.concatenate([indices for indices, _ in rows]).astype(np.int32)
+        self.values = np.concatenate([_tfidf(counts, idf[indices]) for indices, counts in rows]).astype(np.float32)
+
+    def batches(self, size: int) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        (first row, end row, row starts relative to the batch, feature indices, values).
+        """
+        n = len(self.indptr) - 1
+        for start in range(0, n, size):
+            end = min(start + size, n)
+            lo, hi = self.indptr[start], self.indptr[end]
+            yield start, end, self.indptr[start:end] - lo, self.indices[lo:hi], self.values[lo:hi]
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class _Batch:
+    """
+    A row range of a _SparseRows matrix plus its nonzeros sorted by feature, for the
+    transposed product in the gradient.
+    """
+
+    def __init__(self, start: int, end: int, starts: np.ndarray, indices: np.ndarray, values: np.ndarray):
+        import numpy as np
+
+        self.start, self.end = start, end
+        self.starts, self.indices, self.values = starts, indices, values
+        rows = np.repeat(np.arange(end - start), np.diff(np.append(starts, len(indices))))
+        order = np.argsort(indices, kind="stable")
+        self.sorted_rows = rows[order]
+        self.sorted_values = values[order]
+        self.features, self.feature_starts = np.unique(indices[order], return_index=True)
+
+
+# ---------------- Training data ----------------
+def collect_training_data(
+    db_path: Path = settings.DB_PATH, max_rows: Optional[int] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    Gather (text, label) pairs from the intent registry, its synonyms and single-intent,
+    non-escalated (or 👍-rated) rows among the `max_rows` (default
+    settings.FAST_INTENT_TRAIN_MAX_ROWS) most recent rows of the logs table.
+    """
+    if max_rows is None:
+        max_rows = settings.FAST_INTENT_TRAIN_MAX_ROWS
+    registry = get_registry()
+    labels = registry.labels
+    known = set(labels)
+    texts: List[str] = []
+    targets: List[str] = []
+
+    for intent in labels:
+        texts.append(intent.replace("_", " "))
+        targets.append(intent)
+    for variant, canonical in registry.synonyms.items():
+        if canonical in known:
+            texts.append(variant.replace("_", " "))
+            targets.append(canonical)
+
+    if Path(db_path).exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT input, intents, escalation, feedback FROM logs WHERE input IS NOT NULL "
+                "ORDER BY id DESC LIMIT ?",
+                (max_rows,),
+            )
+            examples = list(_log_examples(rows, registry.normalize, known))
+        finally:
+            conn.close()
+        # Oldest first, as before the cap
+        for text, label in reversed(examples):
+            texts.append(text)
+            targets.append(label)
+
+    return texts, targets
+
+
+def _log_examples(
+    rows: Iterable[Tuple[str, str, int, Optional[str]]], normalize: Callable[[str], str], known: Set[str]
+) -> Iterator[Tuple[str, str]]:
+    """
+    Usable (text, label) pairs from a cursor over logs rows, read one row at a time.
+    """
+    for text, intents_json, escalation, feedback in rows:
+        if feedback == "down" or (escalation and feedback != "up"):
+            continue
+        try:
+            intents = json.loads(intents_json or "[]")
+        except json.JSONDecodeError:
+            continue
+        if len(intents) != 1:
+            continue
+        label = normalize(intents[0])
+        if label in known and text.strip():
+            yield text.strip(), label
+
+
+# ---------------- Model ----------------
+class FastIntentModel:
+    def __init__(self, labels: List[str], idf: np.ndarray, W: np.ndarray, b: np.ndarray):
+        self.labels = labels
+        self.idf = idf
+        self.W = W
+        self.b = b
+
+    @classmethod
+    def train(
+        cls, texts: List[str], targets: List[str], epochs: int = 400, lr: float = 2.0, l2: float = 1e-4
+    ) -> "FastIntentModel":
+        import numpy as np
+
+        labels = sorted(set(targets))
+        label_index = {label: i for i, label in enumerate(labels)}
+        # Logged inputs repeat a lot: each distinct (text, label) is one row, weighted by its
+        # count, which gives the same gradient as the repeated rows
+        rows: List[Tuple[np.ndarray, np.ndarray]] = []
+        y: List[int] = []
+        weights: List[int] = []
+        for (text, target), count in Counter(zip(texts, targets)).items():
+            indices, counts = _term_counts(text)
+            if len(indices):
+                rows.append((indices, counts))
+                y.append(label_index[target])
+                weights.append(count)
+        w = np.array(weights, dtype=np.float32)
+        lengths = np.array([len(indices) for indices, _ in rows])
+        df = np.bincount(
+            np.concatenate([indices for indices, _ in rows]), weights=np.repeat(w, lengths), minlength=N_FEATURES
+        )
+        idf = (np.log((1 + w.sum()) / (1 + df)) + 1.0).astype(np.float32)
+        X = _SparseRows(rows, idf)
+
+        Y = np.zeros((len(rows), len(labels)), dtype=np.float32)
+        Y[np.arange(len(rows)), y] = 1.0
+        w /= w.sum()
+        batches = [_Batch(start, end, starts, indices, values) for start, end, starts, indices, values in X.batches(BATCH_ROWS)]
+        W = np.zeros((N_FEATURES, len(labels)), dtype=np.float32)
+        b = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            grad_W = np.zeros_like(W)
+            grad_b = np.zeros_like(b)
+            for batch in batches:
+                logits = np.add.reduceat(batch.values[:, None] * W[batch.indices], batch.starts, axis=0) + b
+                grad = (_softmax(logits) - Y[batch.start:batch.end]) * w[batch.start:batch.end, None]
+                # X.T @ grad: per-nonzero contributions, summed per feature in one pass
+                contrib = batch.sorted_values[:, None] * grad[batch.sorted_rows]
+                grad_W[batch.features] += np.add.reduceat(contrib, batch.feature_starts, axis=0)
+                grad_b += grad.sum(axis=0)
+            W -= lr * (grad_W + l2 * W)
+            b -= lr * grad_b
+        return cls(labels, idf, W, b)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        indices, counts = _term_counts(text)
+        logits = _tfidf(counts, self.idf[indices]) @ self.W[indices] + self.b
+        probs = _softmax(logits[None, :])[0]
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def save(self, path: Path) -> None:
+        import numpy as np
+
+        np.savez_compressed(path, labels=np.array(self.labels), idf=self.idf, W=self.W, b=self.b)
+
+    @classmethod
+    def load(cls, path: Path) -> "FastIntentModel":
+        import numpy as np
+
+        data = np.load(path, allow_pickle=False)
+        return cls([str(x) for x in data["labels"]], data["idf"], data["W"], data["b"])
+
+
+# ---------------- Runtime ----------------
+_model: Optional[FastIntentModel] = None
+_model_loaded = False
+_lock = threading.Lock()
+_stats: Dict[str, int] = {"total": 0, "fast_path": 0}
+
+
+def get_model() -> Optional[FastIntentModel]:
+    """
+    Load the serialized model on first use; returns None if it has not been trained yet.
+    """
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _lock:
+            if not _model_loaded:
+                path = Path(settings.FAST_INTENT_MODEL_PATH)
+                _model = FastIntentModel.load(path) if path.exists() else None
+                _model_loaded = True
+    return _model
+
+
+def classify_fast(text: str) -> Optional[Tuple[List[str], float]]:
+    """
+    Return (intents, confidence) when the local model clears settings.FAST_INTENT_THRESHOLD
+    for a short message, otherwise None so the caller falls through to the LLM.
+    """
+    with _lock:
+        _stats["total"] += 1
+    if not settings.FAST_INTENT_ENABLED:
+        return None
+    if len(text.split()) > settings.FAST_INTENT_MAX_WORDS:
+        return None
+    model = get_model()
+    if model is None:
+        return None
+
+    label, confidence = model.predict(text)
+    if label == "unknown" or confidence < settings.FAST_INTENT_THRESHOLD:
+        return None
+    with _lock:
+        _stats["fast_path"] += 1
+    return [label], confidence
+
+
+def guess(text: str) -> Optional[Tuple[List[str], float]]:
+    """
+    The local model's best prediction regardless of threshold, for when the LLM classifier
+    cannot be used (degraded path under load). None if no model has been trained.
+    """
+    model = get_model()
+    if model is None:
+        return None
+    label, confidence = model.predict(text)
+    return [label], confidence
+
+
+def stats() -> Dict[str, float]:
+    """
+    Fraction of classified messages that avoided the LLM.
+    """
+    with _lock:
+        total = _stats["total"]
+        fast = _stats["fast_path"]
+    return {"total": total, "fast_path": fast, "llm_avoided_ratio": round(fast / total, 4) if total else 0.0}
+
+
+metrics.REGISTRY.gauge_callback("agent_fast_intent", "Local fast-path intent classifier traffic", stats)
+
+
+def refresh(db_path: Path = settings.DB_PATH) -> FastIntentModel:
+    """
+    Retrain from the current config + logs, persist the model and swap it in.
+    """
+    global _model, _model_loaded
+    texts, targets = collect_training_data(db_path)
+    model = FastIntentModel.train(texts, targets)
+    model.save(Path(settings.FAST_INTENT_MODEL_PATH))
+    with _lock:
+        _model = model
+        _model_loaded = True
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fast-path intent classifier")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("train", help="train / refresh the serialized model")
+    p_pred = sub.add_parser("predict", help="classify a message with the local model")
+    p_pred.add_argument("text")
+    args = parser.parse_args()
+
+    if args.cmd == "train":
+        texts, _ = collect_training_data()
+        model = refresh()
+        print(f"Trained on {len(texts)} examples, {len(model.labels)} intents → {settings.FAST_INTENT_MODEL_PATH}")
+    else:
+        model = get_model()
+        if model is None:
+            print("No model found; run `python -m core.nodes.fast_intent train` first.")
+            return
+        print(model.predict(args.text))
+
+
+if __name__ == "__main__":
+    main()
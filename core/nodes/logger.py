@@ -1,12 +1,20 @@
 # core/nodes/logger.py
-from typing import Dict, Any
-from services.db_logger import save_log, save_feedback
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Any, Deque, List, Optional, Tuple
+from config import settings
+from services import db_logger, metrics
+from services.db_logger import save_log, save_log_async, save_feedback
 
-def log_interaction(state: Dict[str, Any]) -> int:
-    """
-    Save the interaction log and return DB row id.
-    """
-    payload = {
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "spill")
+
+def _payload(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "input": state.get("user_input"),
         "intents": state.get("intents", []),
         "sentiment": state.get("sentiment"),
@@ -17,7 +25,242 @@ def log_interaction(state: Dict[str, Any]) -> int:
         "meta": state.get("metadata", {}),
         "feedback": state.get("feedback", None),
     }
-    return save_log(payload)
+
+
+class LogPipeline:
+    """
+    Bounded in-process queue + worker thread that batches interaction logs into db_logger.
+
+    When the queue is full the backpressure policy decides what happens:
+    - "block": the caller waits for space
+    - "drop_oldest": the oldest queued entry is discarded (its Future resolves to None)
+    - "spill": the new entry is appended to a JSONL file (Future resolves to None);
+      replay it later with drain_spill()
+
+    stats() reports queue depth and write lag (enqueue → commit) for capacity planning.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.LOG_QUEUE_MAXSIZE,
+        batch_size: int = settings.LOG_BATCH_SIZE,
+        policy: str = settings.LOG_BACKPRESSURE,
+        spill_path: Path = settings.LOG_SPILL_PATH,
+    ):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy!r}")
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.policy = policy
+        self.spill_path = Path(spill_path)
+        self._items: Deque[Tuple[Dict[str, Any], Future, float]] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "spilled": 0, "failed": 0}
+        self._max_depth = 0
+        self._lag_last_ms = 0.0
+        self._lag_max_ms = 0.0
+        self._lag_total_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="log-pipeline", daemon=True)
+        self._thread.start()
+
+    # ---------------- Producer side ----------------
+    def submit(self, payload: Dict[str, Any]) -> "Future[Optional[int]]":
+        fut: Future = Future()
+        spill = False
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LogPipeline is shut down")
+            if len(self._items) >= self.maxsize:
+                if self.policy == "block":
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                elif self.policy == "drop_oldest":
+                    _, dropped, _ = self._items.popleft()
+                    dropped.set_result(None)
+                    self._counters["dropped"] += 1
+                else:
+                    spill = True
+            if not spill:
+                self._items.append((payload, fut, time.perf_counter()))
+                self._counters["enqueued"] += 1
+                self._max_depth = max(self._max_depth, len(self._items))
+                self._cond.notify_all()
+        if spill:
+            self._spill(payload)
+            fut.set_result(None)
+        return fut
+
+    def _spill(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, ensure_ascii=False, default=str)
+        with self._cond:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._counters["spilled"] += 1
+
+    # ---------------- Worker ----------------
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items and self._closed:
+                    return
+                batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+                self._in_flight = len(batch)
+                self._cond.notify_all()  # wake blocked producers
+            self._write(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Future, float]]) -> None:
+        try:
+            ids = db_logger.save_logs([payload for payload, _, _ in batch])
+        except Exception as e:
+            with self._cond:
+                self._counters["failed"] += len(batch)
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+            return
+        now = time.perf_counter()
+        with self._cond:
+            self._counters["written"] += len(batch)
+            for _, _, enqueued_at in batch:
+                lag_ms = (now - enqueued_at) * 1000.0
+                self._lag_total_ms += lag_ms
+                self._lag_max_ms = max(self._lag_max_ms, lag_ms)
+            self._lag_last_ms = (now - batch[-1][2]) * 1000.0
+        for (_, fut, _), row_id in zip(batch, ids):
+            fut.set_result(row_id)
+
+    # ---------------- Lifecycle / metrics ----------------
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything queued so far is written. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop accepting entries, write everything still queued and stop the worker.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def drain_spill(self) -> int:
+        """
+        Re-ingest entries spilled to the JSONL file, then truncate it. Returns the count.
+        """
+        if not self.spill_path.exists():
+            return 0
+        with self._cond:
+            tmp = self.spill_path.with_suffix(".draining")
+            self.spill_path.replace(tmp)
+        payloads = []
+        with open(tmp, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    payloads.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        for i in range(0, len(payloads), self.batch_size):
+            db_logger.save_logs(payloads[i:i + self.batch_size])
+        tmp.unlink()
+        return len(payloads)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            written = self._counters["written"]
+            oldest_ms = (time.perf_counter() - self._items[0][2]) * 1000.0 if self._items else 0.0
+            return {
+                "policy": self.policy,
+                "queue_depth": len(self._items),
+                "max_queue_depth": self._max_depth,
+                "capacity": self.maxsize,
+                **self._counters,
+                "write_lag_ms": {
+                    "last": round(self._lag_last_ms, 2),
+                    "avg": round(self._lag_total_ms / written, 2) if written else 0.0,
+                    "max": round(self._lag_max_ms, 2),
+                    "oldest_queued": round(oldest_ms, 2),
+                },
+            }
+
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> LogPipeline:
+    """
+    Process-wide log pipeline, started on first use and flushed at interpreter exit.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = LogPipeline()
+                atexit.register(shutdown_pipeline)
+    return _pipeline
+
+
+def shutdown_pipeline(timeout: Optional[float] = None) -> None:
+    """
+    Flush-on-shutdown hook: write all queued logs and stop the worker.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline is not None:
+        pipeline.shutdown(timeout)
+
+
+def pipeline_stats() -> Dict[str, Any]:
+    return _pipeline.stats() if _pipeline is not None else {}
+
+def _pipeline_gauge() -> Dict[str, float]:
+    stats = pipeline_stats()
+    if not stats:
+        return {}
+    lag = stats["write_lag_ms"]
+    return {
+        "queue_depth": stats["queue_depth"],
+        "max_queue_depth": stats["max_queue_depth"],
+        "dropped": stats["dropped"],
+        "spilled": stats["spilled"],
+        "write_lag_avg_ms": lag["avg"],
+        "write_lag_max_ms": lag["max"],
+        "oldest_queued_ms": lag["oldest_queued"],
+    }
+
+metrics.REGISTRY.gauge_callback("agent_log_pipeline", "Background log pipeline queue and lag", _pipeline_gauge)
+
+def log_interaction(state: Dict[str, Any]) -> int:
+    """
+    Save the interaction log and return DB row id.
+    """
+    return save_log(_payload(state))
+
+def log_interaction_async(state: Dict[str, Any]) -> "Future[Optional[int]]":
+    """
+    Log without blocking the caller. With LOG_PIPELINE_ENABLED the entry goes through the
+    bounded background pipeline (Future resolves to the row id, or None if it was dropped /
+    spilled); otherwise it is queued straight on the DB writer thread.
+    """
+    if settings.LOG_PIPELINE_ENABLED:
+        return get_pipeline().submit(_payload(state))
+    return save_log_async(_payload(state))
 
 def log_feedback(log_id: int, feedback: str):
     """
@@ -1,24 +1,21 @@
 # core/nodes/preprocessing.py
 import re
 from typing import Dict, Any
+from services import entities
+
+_WHITESPACE = re.compile(r"\s+")
 
 def normalize(user_input: str) -> str:
     text = user_input.strip()
     # Basic cleaning
-    text = re.sub(r"\s+", " ", text)
+    text = _WHITESPACE.sub(" ", text)
     # keep punctuation for NER but normalize whitespace
     return text
 
 def extract_entities(normalized_text: str) -> Dict[str, Any]:
     """
-    Minimal entity extraction: looks for order-like tokens / emails / dates.
-    Returns dictionary with possible keys like 'order_id' and 'email'.
+    Single-pass entity extraction (see services/entities.py for the pattern registry).
+    Returns the first value per type, e.g. 'order_id', 'refund_id', 'ticket_id', 'email',
+    'phone', 'date', 'amount', plus all matches with spans under 'matches'.
     """
-    entities = {}
-    m = re.search(r"\bORD[\d-]*\b", normalized_text, re.IGNORECASE)
-    if m:
-        entities["order_id"] = m.group(0).upper()
-    m2 = re.search(r"\b[\w\.-]+@[\w\.-]+\.\w+\b", normalized_text)
-    if m2:
-        entities["email"] = m2.group(0).lower()
-    return entities
+    return entities.extract_entities(normalized_text)
@@ -1,48 +1,84 @@
 # core/nodes/response.py
-from typing import List, Dict, Any
-from langchain.prompts import PromptTemplate
-from services.ollama_client import ollama_generate
-from config.settings import OLLAMA_MODEL
-import json
-
-RESPONSE_PROMPT = PromptTemplate(
-    input_variables=["user", "intents", "action_results", "sentiment", "urgency"],
-    template=(
-        "You are a helpful and empathetic customer support assistant.\n"
-        "User message:\n{user}\n\n"
-        "Detected intents: {intents}\n"
-        "Action results (JSON): {action_results}\n"
-        "Sentiment: {sentiment} | Urgency: {urgency}\n\n"
-        "Produce a concise, friendly response tailored to the sentiment and urgency, "
-        "referencing any action results when appropriate. If escalation_flag is present, give a short handover sentence.\n"
-    )
+from typing import List, Dict, Any, Iterator, Optional
+from services import router
+from services.ollama_client import is_overloaded
+from services.scheduler import PRIORITY_LOW, PRIORITY_NORMAL
+from services.token_budget import fit_json, fit_text
+from config.settings import LLM_CACHE_RESPONSES
+from core.nodes.responses import BUSY_RESPONSE
+
+RESPONSE_PROMPT = (
+    "You are a helpful and empathetic customer support assistant.\n"
+    "{context}"
+    "User message:\n{user}\n\n"
+    "Detected intents: {intents}\n"
+    "Action results (JSON): {action_results}\n"
+    "Sentiment: {sentiment} | Urgency: {urgency}\n\n"
+    "Produce a concise, friendly response tailored to the sentiment and urgency, "
+    "referencing any action results when appropriate. If escalation_flag is present, give a short handover sentence.\n"
 )
 
 
-def _serialize_action_results(action_results: List[Dict[str, Any]]) -> str:
-    try:
-        return json.dumps(action_results, ensure_ascii=False)
-    except Exception:
-        return str(action_results)
+FALLBACK_RESPONSE = "Sorry — I'm temporarily unable to generate a detailed reply. I've escalated this to a human agent who will follow up shortly."
 
 
-def ollama_generate_response(user: str, intents: List[str], action_results: List[Dict[str, Any]], sentiment: str, urgency: str) -> str:
-    """
-    Request a generated response from Ollama. If Ollama returns an error string,
-    provide a safe fallback message that asks for clarification and escalates.
-    """
-    prompt = RESPONSE_PROMPT.format(
-        user=user,
+def _build_prompt(user: str, intents: List[str], action_results: List[Dict[str, Any]], sentiment: str, urgency: str, context: str = "") -> str:
+    # Long messages, large tool payloads and long conversations are trimmed to their budgets
+    return RESPONSE_PROMPT.format(
+        context=fit_text("response", "context", context),
+        user=fit_text("response", "user", user),
         intents=", ".join(intents),
-        action_results=_serialize_action_results(action_results),
+        action_results=fit_json("response", "action_results", action_results),
         sentiment=sentiment,
         urgency=urgency
     )
-    out = ollama_generate(prompt, model=OLLAMA_MODEL, max_tokens=300, temperature=0.2)
 
+
+def response_priority(urgency: str) -> int:
+    # Long generations queue behind classification calls unless the customer is in a hurry
+    return PRIORITY_NORMAL if urgency == "high" else PRIORITY_LOW
+
+
+def ollama_generate_response(user: str, intents: List[str], action_results: List[Dict[str, Any]], sentiment: str, urgency: str, context: str = "", model: Optional[str] = None) -> str:
+    """
+    Request a generated response from Ollama. If Ollama returns an error string,
+    provide a safe fallback message that asks for clarification and escalates
+    (BUSY_RESPONSE instead when admission control turned the call away).
+    `context` is an optional "conversation so far" block (core.session.prompt_context).
+    Runs on the "response" route (services/router.py); `model` overrides its model.
+    """
+    prompt = _build_prompt(user, intents, action_results, sentiment, urgency, context)
+    # Sampled replies are only cached when explicitly enabled in settings
+    out = router.generate(
+        "response", prompt, model=model, max_tokens=300, temperature=0.2, cache=LLM_CACHE_RESPONSES,
+        priority=response_priority(urgency),
+    )
+
+    if is_overloaded(out):
+        return BUSY_RESPONSE
     # Ollama client might return a service error string
     if isinstance(out, str) and out.startswith("[Ollama Error:"):
         # Provide a short, safe fallback message
-        return "Sorry — I'm temporarily unable to generate a detailed reply. I've escalated this to a human agent who will follow up shortly."
+        return FALLBACK_RESPONSE
 
     return out.strip()
+
+
+def ollama_stream_response(user: str, intents: List[str], action_results: List[Dict[str, Any]], sentiment: str, urgency: str, context: str = "", model: Optional[str] = None) -> Iterator[str]:
+    """
+    Streaming variant of ollama_generate_response: yields tokens as Ollama produces them.
+    A client error before any token replaces the reply with FALLBACK_RESPONSE; an error
+    mid-stream ends the stream.
+    """
+    prompt = _build_prompt(user, intents, action_results, sentiment, urgency, context)
+    started = False
+    for token in router.stream(
+        "response", prompt, model=model, max_tokens=300, temperature=0.2, cache=LLM_CACHE_RESPONSES,
+        priority=response_priority(urgency),
+    ):
+        if token.startswith("[Ollama Error:"):
+            if not started:
+                yield BUSY_RESPONSE if is_overloaded(token) else FALLBACK_RESPONSE
+            return
+        started = True
+        yield token
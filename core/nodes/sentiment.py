@@ -1,33 +1,40 @@
 # core/nodes/sentiment.py
-from typing import Tuple
-from services.ollama_client import ollama_generate
-from config.settings import OLLAMA_MODEL
+from typing import Optional, Tuple
+from services import router
+from services.scheduler import PRIORITY_HIGH
+from services.token_budget import fit_text
 import json
 
 SENTIMENT_PROMPT = (
     "Classify the sentiment and urgency of the following message.\n\n"
-    "Message: '''{text}'''\n\n"
-    "Return JSON: {{\"sentiment\": \"positive|neutral|negative\", \"urgency\": \"low|medium|high\"}}"
+    "Return JSON: {{\"sentiment\": \"positive|neutral|negative\", \"urgency\": \"low|medium|high\"}}\n\n"
+    "Message: '''{text}'''"
 )
 
 
-def analyze_sentiment_with_ollama(text: str) -> Tuple[str, str]:
-    prompt = SENTIMENT_PROMPT.format(text=text)
-    out = ollama_generate(prompt, model=OLLAMA_MODEL, max_tokens=64, temperature=0.0)
+def heuristic_sentiment(text: str) -> Tuple[str, str]:
+    """
+    Keyword-based sentiment / urgency, used when the LLM is unavailable or saturated.
+    """
+    lower = text.lower()
+    sentiment = "negative" if any(w in lower for w in ["not", "never", "hate", "angry", "frustrat"]) else "neutral"
+    urgency = "high" if any(w in lower for w in ["now", "immediately", "asap", "urgent"]) else "low"
+    return sentiment, urgency
+
+
+def analyze_sentiment_with_ollama(text: str, model: Optional[str] = None) -> Tuple[str, str]:
+    prompt = SENTIMENT_PROMPT.format(text=fit_text("sentiment", "text", text))
+    out = router.generate(
+        "sentiment", prompt, model=model, max_tokens=48, temperature=0.0, format="json", priority=PRIORITY_HIGH
+    )
 
     if isinstance(out, str) and out.startswith("[Ollama Error:"):
         # fallback heuristic
-        lower = text.lower()
-        sentiment = "negative" if any(w in lower for w in ["not", "never", "hate", "angry", "frustrat"]) else "neutral"
-        urgency = "high" if any(w in lower for w in ["now", "immediately", "asap", "urgent"]) else "low"
-        return sentiment, urgency
+        return heuristic_sentiment(text)
 
     try:
         parsed = json.loads(out)
         return parsed.get("sentiment", "neutral"), parsed.get("urgency", "low")
     except Exception:
         # naive fallback
-        lower = text.lower()
-        sentiment = "negative" if any(w in lower for w in ["not", "never", "hate", "angry", "frustrat"]) else "neutral"
-        urgency = "high" if any(w in lower for w in ["now", "immediately", "asap", "urgent"]) else "low"
-        return sentiment, urgency
+        return heuristic_sentiment(text)
@@ -1,31 +1,33 @@
 # core/nodes/tools.py
 from typing import List, Dict, Any
-from services.mock_api import check_order_status_tool, initiate_refund_tool, open_ticket_tool
+from services import tools as tool_engine
+from services.entities import extract_entities
+from core.intents import get_registry
 
-def call_tools_for_intents(intents: List[str], normalized_input: str, entities: Dict[str, Any] | None = None, use_mock: bool = True) -> List[Dict[str, Any]]:
+def call_tools_for_intents(intents: List[str], normalized_input: str, entities: Dict[str, Any] | None = None, use_mock: bool = True, session_id: str | None = None) -> List[Dict[str, Any]]:
     """
-    Call appropriate tool handlers for detected intents.
-    Entities (like order_id or email) will be forwarded to tools when available.
+    Call the tool each detected intent is mapped to in the intent registry.
+    Entities (like order_id or email) are forwarded to tools, which use them instead of
+    re-parsing the input; when none are given the input is scanned once here.
+    Independent tool calls run concurrently (services/tools.py); results are in intent
+    order and carry the tool's latency_ms. Repeated read-only lookups are served from a
+    cache, and refunds / tickets already performed in `session_id` are replayed.
     """
-    results: List[Dict[str, Any]] = []
+    if entities is None:
+        entities = extract_entities(normalized_input)
+    registry = get_registry()
+    calls = []
+    results: List[Dict[str, Any] | None] = []
     for intent in intents:
-        if intent == "order_status":
-            # pass entities if present
-            res = check_order_status_tool(normalized_input) if use_mock else {"tool": "check_order_status", "status": "unhandled", "intent": intent}
-            # ensure order_id preferred from entities if detected
-            if entities and entities.get("order_id") and res.get("order_id") != entities.get("order_id"):
-                res["order_id"] = entities.get("order_id")
-                res["message"] = f"Order {res['order_id']} status adjusted based on extracted entity."
-            results.append(res)
-        elif intent == "refund":
-            res = initiate_refund_tool(normalized_input) if use_mock else {"tool": "initiate_refund", "status": "unhandled", "intent": intent}
-            # if we detected an order_id entity, attach it
-            if entities and entities.get("order_id"):
-                res["order_id"] = entities.get("order_id")
-            results.append(res)
-        elif intent == "technical_issue":
-            res = open_ticket_tool(normalized_input) if use_mock else {"tool": "open_ticket", "status": "unhandled", "intent": intent}
-            results.append(res)
-        else:
+        tool = registry.tool(intent)
+        if tool_engine.get_tool(tool) is None:
             results.append({"tool": "none", "status": "unhandled", "intent": intent})
+        elif use_mock:
+            calls.append((tool, {"intent": intent}))
+            results.append(None)
+        else:
+            results.append({"tool": tool, "status": "unhandled", "intent": intent})
+    if calls:
+        executed = iter(tool_engine.run_tools(calls, normalized_input, entities, session_id=session_id))
+        results = [r if r is not None else next(executed) for r in results]
     return results
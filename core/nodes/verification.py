@@ -1,33 +1,53 @@
 # core/nodes/verification.py
 
-from typing import List, Dict
+from typing import List, Dict, Optional
+from core.intents import get_registry
 from core.nodes import responses
 
+# Response modes (state["metadata"]["response_mode"]) that are safe replies on their own
+SAFE_RESPONSE_MODES = ("canned", "busy")
+
 
 def verify(
     confidence: float,
     action_results: List[Dict],
     response_text: str,
     threshold: float = 0.7,
+    intents: Optional[List[str]] = None,
+    response_mode: Optional[str] = None,
 ) -> bool:
     """
     Decide whether to escalate.
 
     Rules:
+    - Intents with escalation "always" escalate; a message whose intents are all "never" does not.
     - Do not escalate if any tool handled the request successfully.
-    - Do not escalate if we produced any safe canned response (substring match).
+    - Do not escalate if we produced a safe canned response, identified by `response_mode`
+      set by the respond node ("canned"); without one, by exact match against the registry.
+    - Do not escalate the busy reply given when the LLM is saturated (mode "busy"); the customer retries.
     - Escalate if confidence is below threshold and nothing safe handled the request.
     - Default: escalate (unrecognized state).
     """
+    registry = get_registry()
+
+    # 0. Per-intent escalation policy from the intent registry
+    if intents:
+        policies = {registry.escalation(i) for i in intents}
+        if "always" in policies:
+            return True
+        if policies == {"never"}:
+            return False
+
     # 1. Tool handled successfully → no escalation
     if action_results and any(r.get("status") == "ok" for r in action_results):
         return False
 
-    # 2. If we produced a canned response (including unknown) → safe, no escalation
-    if response_text:
-        for canned in responses.DEFAULT_RESPONSES.values():
-            if canned and canned in response_text:
-                return False
+    # 2. If we produced a canned response (including unknown) or the busy reply → safe, no escalation
+    if response_mode is not None:
+        if response_mode in SAFE_RESPONSE_MODES:
+            return False
+    elif registry.is_canned(response_text) or response_text == responses.BUSY_RESPONSE:
+        return False
 
     # 3. Otherwise, if low confidence → escalate
     if confidence < threshold:
@@ -0,0 +1,281 @@
+# core/session.py
+"""
+Multi-turn conversation state with bounded memory.
+
+A Conversation keeps only what the next turn needs: the last SESSION_WINDOW_TURNS turns in
+compact form, a rolling text summary of older turns, the latest value of every resolved
+entity (e.g. the last order_id) and the most recent intents. Full per-turn workflow states
+are never retained.
+
+Session stores:
+- MemorySessionStore: LRU of at most SESSION_MAX_IN_MEMORY conversations
+- SQLiteSessionStore: one JSON row per session, so conversations survive restarts without
+  all of them being held in RAM
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Protocol
+from config import settings
+
+TURN_TEXT_CHARS = 200
+
+# Entities worth resolving in later turns ("where is it?" → the last order_id); dates and
+# amounts are specific to the message they appear in.
+CARRY_ENTITIES = ("order_id", "refund_id", "ticket_id", "email", "phone")
+# Of those, the ids tools create. Other keys in tool results echo what the tool looked up,
+# which may be a placeholder (check_order_status invents an order id when none was given),
+# so they are only carried when the user supplied them.
+TOOL_CREATED_ENTITIES = ("refund_id", "ticket_id")
+
+
+def _clip(text: Optional[str], limit: int) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class Conversation:
+    """
+    Bounded per-session memory, carried from one workflow run into the next.
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        window: int = settings.SESSION_WINDOW_TURNS,
+        recent_intents: int = settings.SESSION_RECENT_INTENTS,
+        summary_max_chars: int = settings.SESSION_SUMMARY_MAX_CHARS,
+    ):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.summary_max_chars = summary_max_chars
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=window)
+        self.recent_intents: Deque[str] = deque(maxlen=recent_intents)
+        self.entities: Dict[str, Any] = {}
+        self.summary = ""
+        self.turn_count = 0
+        self.updated_at = time.time()
+
+    # ---------------- Read side (next turn) ----------------
+    def context(self) -> Dict[str, Any]:
+        """
+        What the workflow sees of earlier turns (stored in state["metadata"]["conversation"]).
+        """
+        return {
+            "session_id": self.session_id,
+            "turn": self.turn_count + 1,
+            "entities": dict(self.entities),
+            "recent_intents": list(self.recent_intents),
+            "summary": self.summary,
+            "recent_turns": list(self.turns),
+        }
+
+    # ---------------- Write side (after a turn) ----------------
+    def record(self, state: Dict[str, Any], log_id: Optional[int] = None) -> None:
+        """
+        Fold a finished workflow state into the conversation.
+        """
+        intents = [i for i in state.get("intents", []) if i != "unknown"]
+        turn = {
+            "user": _clip(state.get("user_input"), TURN_TEXT_CHARS),
+            "reply": _clip(state.get("response_text"), TURN_TEXT_CHARS),
+            "intents": intents,
+            "sentiment": state.get("sentiment"),
+            "escalated": bool(state.get("escalation_flag")),
+        }
+        if log_id is not None:
+            turn["log_id"] = log_id
+        if len(self.turns) == self.turns.maxlen:
+            self._fold(self.turns[0])
+        self.turns.append(turn)
+
+        for intent in intents:
+            if intent in self.recent_intents:
+                self.recent_intents.remove(intent)
+            self.recent_intents.append(intent)
+        entities = state.get("metadata", {}).get("entities") or {}
+        for key in CARRY_ENTITIES:
+            if entities.get(key):
+                self.entities[key] = entities[key]
+        # Ids created by tools (refund_id, ticket_id) are resolvable in later turns too
+        for result in state.get("action_results", []):
+            for key in TOOL_CREATED_ENTITIES:
+                if result.get(key):
+                    self.entities[key] = result[key]
+
+        self.turn_count += 1
+        self.updated_at = time.time()
+
+    def _fold(self, turn: Dict[str, Any]) -> None:
+        """
+        Append an evicted turn to the rolling summary, dropping the oldest entries past the cap.
+        """
+        topic = ", ".join(turn["intents"]) or "other"
+        line = f"{topic}: {_clip(turn['user'], 60)}" + (" (escalated)" if turn["escalated"] else "")
+        summary = f"{self.summary} | {line}" if self.summary else line
+        while len(summary) > self.summary_max_chars and " | " in summary:
+            summary = summary.split(" | ", 1)[1]
+        self.summary = _clip(summary, self.summary_max_chars)
+
+    # ---------------- Serialization ----------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "window": self.turns.maxlen,
+            "recent_intents_max": self.recent_intents.maxlen,
+            "summary_max_chars": self.summary_max_chars,
+            "turns": list(self.turns),
+            "recent_intents": list(self.recent_intents),
+            "entities": self.entities,
+            "summary": self.summary,
+            "turn_count": self.turn_count,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
+        conv = cls(
+            data["session_id"],
+            window=data.get("window", settings.SESSION_WINDOW_TURNS),
+            recent_intents=data.get("recent_intents_max", settings.SESSION_RECENT_INTENTS),
+            summary_max_chars=data.get("summary_max_chars", settings.SESSION_SUMMARY_MAX_CHARS),
+        )
+        conv.turns.extend(data.get("turns", []))
+        conv.recent_intents.extend(data.get("recent_intents", []))
+        conv.entities = dict(data.get("entities", {}))
+        conv.summary = data.get("summary", "")
+        conv.turn_count = data.get("turn_count", len(conv.turns))
+        conv.updated_at = data.get("updated_at", time.time())
+        return conv
+
+
+def prompt_context(context: Optional[Dict[str, Any]]) -> str:
+    """
+    Short "conversation so far" block for LLM prompts; empty on the first turn.
+    """
+    if not context or context.get("turn", 1) <= 1:
+        return ""
+    lines = []
+    if context.get("summary"):
+        lines.append(f"Earlier: {context['summary']}")
+    for turn in context.get("recent_turns", [])[-2:]:
+        lines.append(f"Customer: {turn['user']}")
+        lines.append(f"Agent: {turn['reply']}")
+    if context.get("entities"):
+        known = ", ".join(f"{k}={v}" for k, v in context["entities"].items())
+        lines.append(f"Known details: {known}")
+    return "Conversation so far:\n" + "\n".join(lines) + "\n\n"
+
+
+class SessionStore(Protocol):
+    """
+    Interface for conversation persistence.
+    """
+
+    def get(self, session_id: str) -> Conversation: ...
+
+    def save(self, conversation: Conversation) -> None: ...
+
+    def delete(self, session_id: str) -> None: ...
+
+
+class MemorySessionStore:
+    """
+    Thread-safe LRU of conversations; the least recently used session is dropped past max_sessions.
+    """
+
+    def __init__(self, max_sessions: int = settings.SESSION_MAX_IN_MEMORY):
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Conversation:
+        with self._lock:
+            conv = self._data.get(session_id)
+            if conv is not None:
+                self._data.move_to_end(session_id)
+                return conv
+        return Conversation(session_id)
+
+    def save(self, conversation: Conversation) -> None:
+        with self._lock:
+            self._data[conversation.session_id] = conversation
+            self._data.move_to_end(conversation.session_id)
+            while len(self._data) > self.max_sessions:
+                self._data.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """
+    Conversations persisted as JSON rows in their own SQLite file (by default next to DB_PATH).
+    Nothing is cached in memory; each turn loads and saves one small row.
+    """
+
+    def __init__(self, path: Path = settings.SESSION_DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+
+    def get(self, session_id: str) -> Conversation:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sessions WHERE session_id=?", (session_id,)).fetchone()
+        return Conversation.from_dict(json.loads(row[0])) if row else Conversation(session_id)
+
+    def save(self, conversation: Conversation) -> None:
+        data = json.dumps(conversation.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (conversation.session_id, data, conversation.updated_at),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id=?", (session_id,))
+            self._conn.commit()
+
+    def purge_older_than(self, seconds: float) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - seconds,))
+            self._conn.commit()
+            return cur.rowcount
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    """
+    Process-wide session store selected by settings.SESSION_STORE.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.SESSION_STORE == "sqlite":
+                    _store = SQLiteSessionStore(settings.SESSION_DB_PATH)
+                elif settings.SESSION_STORE == "memory":
+                    _store = MemorySessionStore(settings.SESSION_MAX_IN_MEMORY)
+                else:
+                    raise ValueError(f"Unknown SESSION_STORE: {settings.SESSION_STORE!r}")
+    return _store
+
@@ -1,10 +1,17 @@
 # core/workflow.py
 
-from typing import Dict, Any
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 from core.state import SupportAgentState
+from core.intents import get_registry
+from core.session import Conversation, prompt_context
 from core.nodes import (
     preprocessing,
+    analysis,
     classifier,
+    fast_intent,
     tools as tools_node,
     sentiment as sentiment_node,
     response as response_node,
@@ -14,109 +21,521 @@ from core.nodes import (
     responses,  # canned replies
 )
 from config import settings
-import yaml
-from pathlib import Path
+from services import metrics, router
+from services.scheduler import DEGRADED, PRIORITY_HIGH
 
-# Load intents
-INTENTS_PATH = Path(__file__).resolve().parent.parent / "config" / "intents.yaml"
-with open(INTENTS_PATH, "r") as f:
-    intents_cfg = yaml.safe_load(f)
-INTENTS_LIST = intents_cfg.get("intents", []) if isinstance(intents_cfg, dict) else []
+ESCALATION_MESSAGE = (
+    "I couldn't confidently resolve this automatically. "
+    "I'm escalating to a human agent who will follow up shortly."
+)
 
-def support_agent_workflow(
-    user_input: str, model: str = None, threshold: float = None, use_mock: bool = True
-) -> Dict[str, Any]:
+
+def _saturated(node: str, task: str, priority: int) -> bool:
     """
-    Main orchestrator for a single user interaction.
-    NOTE: This function no longer persists logs to DB — logging should be done by the caller (e.g., app.py),
-    so the caller can attach the returned log id to the conversation state.
+    Degraded path check: True (and counted) when an LLM call of `priority` on the `task`
+    route would likely wait longer than the queue deadline for an Ollama slot.
     """
-    # Initialize state
-    state: SupportAgentState = {
-        "user_input": user_input,
-        "normalized_input": "",
-        "intents": [],
-        "sentiment": "neutral",
-        "urgency": "low",
-        "action_results": [],
-        "response_text": "",
-        "confidence_score": 0.0,
-        "escalation_flag": False,
-        "log": [],
-        "metadata": {},
-    }
+    if not router.get_router().saturated(task, priority):
+        return False
+    DEGRADED.inc(node=node)
+    return True
 
-    # 1. Preprocessing
-    normalized = preprocessing.normalize(user_input)
-    state["normalized_input"] = normalized
-    entities = preprocessing.extract_entities(normalized)
-    state["metadata"]["entities"] = entities
 
-    # 2. Multi-intent classification
-    intents, confidence = classifier.classify_intent_with_ollama(
-        normalized, INTENTS_LIST
-    )
+def _degraded_intents(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    # Best local guess instead of queueing for the LLM classifier
+    intents, confidence = fast_intent.guess(state["normalized_input"]) or (["unknown"], 0.0)
+    if confidence < settings.FAST_INTENT_DEGRADED_THRESHOLD:
+        # Too unsure to act on: no intent, and no confidence to pass the escalation threshold
+        intents, confidence = ["unknown"], 0.0
+    return _intents_update(state, opts, intents, confidence, "degraded")
+
+
+# ---------------- Nodes ----------------
+# Each node reads the state and returns a partial update. Nodes never mutate the
+# state directly, so independent nodes can run on worker threads while the
+# orchestrator merges their updates.
+
+def _node_preprocess(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    return {"normalized_input": preprocessing.normalize(state["user_input"])}
+
+
+def _node_entities(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    entities = preprocessing.extract_entities(state["normalized_input"])
+    update: Dict[str, Any] = {"entities": entities}
+    # Follow-ups ("has it shipped yet?") resolve against entities from earlier turns
+    conversation = opts.get("conversation")
+    if conversation:
+        carried = {k: v for k, v in conversation["entities"].items() if k not in entities}
+        if carried:
+            update["entities"] = {**carried, **entities}
+            update["carried_entities"] = sorted(carried)
+    return {"metadata": update}
+
+
+def _intents_update(state: Dict[str, Any], opts: Dict[str, Any], intents: List[str], confidence: float, source: str) -> Dict[str, Any]:
     # Force fallback to "unknown" if no intents returned
     if not intents:
         intents = ["unknown"]
 
     # Normalize again to map any variants
     intents = [responses.normalize_intent(i) for i in intents]
-    state["intents"] = intents
-    state["confidence_score"] = confidence
 
-    # 3. Tool calls (pass entities)
+    # A short unclassifiable follow-up continues the previous topic of the conversation
+    conversation = opts.get("conversation")
+    if (
+        intents == ["unknown"]
+        and conversation
+        and conversation["recent_intents"]
+        and len(state["normalized_input"].split()) <= settings.SESSION_FOLLOWUP_MAX_WORDS
+    ):
+        intents = [conversation["recent_intents"][-1]]
+        confidence = max(confidence, classifier.STATIC_CONFIDENCE_THRESHOLD)
+        source = "conversation"
+    return {
+        "intents": intents,
+        "confidence_score": confidence,
+        "metadata": {"intent_source": source},
+    }
+
+
+def _node_classify(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    # Local fast path first; only fall through to the LLM when it is not confident
+    fast = fast_intent.classify_fast(state["normalized_input"])
+    if fast is not None:
+        return _intents_update(state, opts, *fast, "fast_path")
+    if _saturated("classify", "classify", PRIORITY_HIGH):
+        return _degraded_intents(state, opts)
+    intents, confidence = classifier.classify_intent_with_ollama(
+        state["normalized_input"], get_registry().labels, model=opts["model"]
+    )
+    return _intents_update(state, opts, intents, confidence, "llm")
+
+
+def _node_tools(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
     action_results = tools_node.call_tools_for_intents(
-        intents, normalized, entities=entities, use_mock=use_mock
+        state["intents"],
+        state["normalized_input"],
+        entities=state["metadata"].get("entities"),
+        use_mock=opts["use_mock"],
+        session_id=(opts["conversation"] or {}).get("session_id"),
     )
-    state["action_results"] = action_results
+    return {"action_results": action_results}
+
+
+def _node_sentiment(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    if _saturated("sentiment", "sentiment", PRIORITY_HIGH):
+        sentiment, urgency = sentiment_node.heuristic_sentiment(state["normalized_input"])
+        return {"sentiment": sentiment, "urgency": urgency, "metadata": {"sentiment_source": "heuristic"}}
+    sentiment, urgency = sentiment_node.analyze_sentiment_with_ollama(state["normalized_input"], model=opts["model"])
+    return {"sentiment": sentiment, "urgency": urgency}
+
+
+def _node_analyze(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fused mode: one LLM call for intents, confidence, sentiment and urgency.
+    Falls back to the per-node classifier + sentiment calls when the output fails validation.
+    """
+    text = state["normalized_input"]
+    fast = fast_intent.classify_fast(text)
+    if fast is not None:
+        update = _intents_update(state, opts, *fast, "fast_path")
+        mode = "fast_path"
+    elif _saturated("analyze", "analysis", PRIORITY_HIGH):
+        update = _degraded_intents(state, opts)
+        mode = "degraded"
+    else:
+        result = analysis.analyze_with_ollama(text, get_registry().labels, model=opts["model"])
+        if result is not None:
+            intents, confidence = result.intents, result.confidence
+            # Same low-confidence escape hatch as the per-node classifier
+            if confidence < classifier.STATIC_CONFIDENCE_THRESHOLD or intents == ["unknown"]:
+                intents, confidence = classifier.classify_dynamic_intent(text, get_registry().labels, model=opts["model"])
+            update = _intents_update(state, opts, intents, confidence, "llm")
+            update.update({"sentiment": result.sentiment, "urgency": result.urgency})
+            update["metadata"]["analysis_mode"] = "fused"
+            return update
+        intents, confidence = classifier.classify_intent_with_ollama(text, get_registry().labels, model=opts["model"])
+        update = _intents_update(state, opts, intents, confidence, "llm")
+        mode = "per_node"
 
-    # 4. Sentiment + urgency
-    sentiment, urgency = sentiment_node.analyze_sentiment_with_ollama(normalized)
-    state["sentiment"] = sentiment
-    state["urgency"] = urgency
+    update.update(_node_sentiment(state, opts))
+    update["metadata"]["analysis_mode"] = mode
+    return update
 
-    # 5. Response generation
-    response_text = None
+
+def _static_response(state: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Tool messages or canned replies, if any, with their response mode ("tool", "busy",
+    "canned"); (None, None) means the LLM has to write the reply.
+    """
+    intents = state["intents"]
+    action_results = state["action_results"]
 
     # Case A: Aggregate tool-handled messages
     success_msgs = [r.get("message") for r in action_results if r.get("status") == "ok" and r.get("message")]
     if success_msgs:
         # join them so multiple handled intents are covered
-        response_text = " ".join(success_msgs)
+        return " ".join(success_msgs), "tool"
+
+    # Unclassified because the LLM was saturated: ask to retry rather than to clarify
+    if intents == ["unknown"] and state["metadata"].get("intent_source") == "degraded":
+        return responses.BUSY_RESPONSE, "busy"
 
     # Case B: Canned replies (combine multi-intents) — only if no tool message
-    if not response_text and intents:
+    if intents:
         canned = responses.combine_responses(intents)
         if canned:
-            response_text = canned
+            return canned, "canned"
+
+    return None, None
+
+
+def _busy(state: Dict[str, Any]) -> bool:
+    return _saturated("respond", "response", response_node.response_priority(state["urgency"]))
+
 
-    # Case C: LLM-generated fallback (if still nothing)
+def _node_respond(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    response_text, mode = _static_response(state)
+
+    # Case C: LLM-generated fallback (if still nothing); a canned busy reply under load
     if not response_text:
-        response_text = response_node.ollama_generate_response(
-            user_input, intents, action_results, sentiment, urgency
-        )
+        if _busy(state):
+            response_text = responses.BUSY_RESPONSE
+        else:
+            response_text = response_node.ollama_generate_response(
+                state["user_input"], state["intents"], state["action_results"], state["sentiment"], state["urgency"],
+                context=prompt_context(opts.get("conversation")), model=opts["model"],
+            )
+        mode = "busy" if response_text == responses.BUSY_RESPONSE else "llm"
 
-    state["response_text"] = response_text
+    return {"response_text": response_text, "metadata": {"response_mode": mode}}
 
-    # 6. Verification (now includes "unknown" as safe if canned)
+
+def _node_verify(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    # Verification (canned replies, including "unknown", are safe; see response_mode)
     escalate = verification_node.verify(
         confidence=state["confidence_score"],
-        action_results=action_results,
-        response_text=response_text,
-        threshold=threshold or settings.CONFIDENCE_THRESHOLD,
+        action_results=state["action_results"],
+        response_text=state["response_text"],
+        threshold=opts["threshold"],
+        intents=state["intents"],
+        response_mode=state["metadata"].get("response_mode"),
     )
-    state["escalation_flag"] = escalate
-
-    # 7. Fallback / Escalation
-    if escalate:
-        esc_payload = fallback_node.create_escalation_payload(state)
-        state["metadata"]["escalation_payload"] = esc_payload
-        # Short human-handoff response
-        state["response_text"] = (
-            "I couldn't confidently resolve this automatically. "
-            "I'm escalating to a human agent who will follow up shortly."
+    return {"escalation_flag": escalate}
+
+
+def _node_escalate(state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, Any]:
+    if not state["escalation_flag"]:
+        return {}
+    esc_payload = fallback_node.create_escalation_payload(state)
+    # Short human-handoff response
+    return {
+        "metadata": {"escalation_payload": esc_payload},
+        "response_text": ESCALATION_MESSAGE,
+    }
+
+
+NodeFn = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+
+# Dependency graph, listed in a valid sequential order: name → (node, dependencies).
+WORKFLOW_GRAPH: List[Tuple[str, NodeFn, Tuple[str, ...]]] = [
+    ("preprocess", _node_preprocess, ()),
+    ("entities", _node_entities, ("preprocess",)),
+    ("classify", _node_classify, ("preprocess",)),
+    ("sentiment", _node_sentiment, ("preprocess",)),
+    ("tools", _node_tools, ("classify", "entities")),
+    ("respond", _node_respond, ("tools", "sentiment")),
+    ("verify", _node_verify, ("respond",)),
+    ("escalate", _node_escalate, ("verify",)),
+]
+
+# Nodes that run after the reply text exists; the streaming workflow runs them once the stream ends.
+RESPONSE_NODES = ("respond", "verify", "escalate")
+
+# Fused analysis: a single "analyze" node replaces classify + sentiment.
+FUSED_WORKFLOW_GRAPH: List[Tuple[str, NodeFn, Tuple[str, ...]]] = [
+    ("preprocess", _node_preprocess, ()),
+    ("entities", _node_entities, ("preprocess",)),
+    ("analyze", _node_analyze, ("preprocess",)),
+    ("tools", _node_tools, ("analyze", "entities")),
+    ("respond", _node_respond, ("tools", "analyze")),
+    ("verify", _node_verify, ("respond",)),
+    ("escalate", _node_escalate, ("verify",)),
+]
+
+
+def _merge(state: Dict[str, Any], update: Dict[str, Any]) -> None:
+    for key, value in update.items():
+        if key == "metadata":
+            state["metadata"].update(value)
+        else:
+            state[key] = value
+
+
+def _timed(name: str, node: NodeFn, state: Dict[str, Any], opts: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    start = time.perf_counter()
+    with metrics.span("node", name):
+        update = node(state, opts)
+    return update, (time.perf_counter() - start) * 1000.0
+
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.WORKFLOW_MAX_WORKERS, thread_name_prefix="workflow"
         )
+    return _executor
+
+
+def _run_sequential(graph: List[Tuple[str, NodeFn, Tuple[str, ...]]], state: Dict[str, Any], opts: Dict[str, Any]) -> None:
+    for name, node, _ in graph:
+        _merge(state, _timed(name, node, state, opts)[0])
+
+
+def _run_concurrent(graph: List[Tuple[str, NodeFn, Tuple[str, ...]]], state: Dict[str, Any], opts: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Run the graph, dispatching every node whose dependencies are satisfied.
+    Returns per-node durations in milliseconds.
+    """
+    executor = _get_executor()
+    done_nodes: set[str] = set()
+    pending: Dict[Any, str] = {}
+    timings: Dict[str, float] = {}
+
+    def submit_ready() -> None:
+        running = set(pending.values())
+        for name, node, deps in graph:
+            if name in done_nodes or name in running:
+                continue
+            if all(d in done_nodes for d in deps):
+                # copy_context so the request trace follows the node onto the worker thread
+                ctx = contextvars.copy_context()
+                pending[executor.submit(ctx.run, _timed, name, node, state, opts)] = name
+
+    submit_ready()
+    while pending:
+        finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for fut in finished:
+            name = pending.pop(fut)
+            update, elapsed_ms = fut.result()
+            _merge(state, update)
+            timings[name] = round(elapsed_ms, 2)
+            done_nodes.add(name)
+        submit_ready()
+    return timings
+
+
+def _init_state(user_input: str) -> SupportAgentState:
+    return {
+        "user_input": user_input,
+        "normalized_input": "",
+        "intents": [],
+        "sentiment": "neutral",
+        "urgency": "low",
+        "action_results": [],
+        "response_text": "",
+        "confidence_score": 0.0,
+        "escalation_flag": False,
+        "log": [],
+        "metadata": {},
+    }
+
+
+def _execute(graph: List[Tuple[str, NodeFn, Tuple[str, ...]]], state: Dict[str, Any], opts: Dict[str, Any], concurrent: bool) -> None:
+    if concurrent:
+        start = time.perf_counter()
+        node_ms = _run_concurrent(graph, state, opts)
+        wall_ms = (time.perf_counter() - start) * 1000.0
+        state["metadata"]["timings"] = {
+            "mode": "concurrent",
+            "nodes_ms": node_ms,
+            "wall_ms": round(wall_ms, 2),
+            "sequential_ms": round(sum(node_ms.values()), 2),
+            "saved_ms": round(max(0.0, sum(node_ms.values()) - wall_ms), 2),
+        }
+    else:
+        _run_sequential(graph, state, opts)
+
+
+def _resolve(
+    model: Optional[str], threshold: float, use_mock: bool, concurrent: bool, fused: bool,
+    conversation: Optional[Conversation] = None,
+):
+    opts = {
+        # None = each LLM call uses the model routed for its task (settings.MODEL_ROUTES)
+        "model": model or None,
+        "threshold": settings.CONFIDENCE_THRESHOLD if threshold is None else threshold,
+        "use_mock": use_mock,
+        # Snapshot of earlier turns; nodes read it, only the session id / turn go into metadata
+        "conversation": conversation.context() if conversation is not None else None,
+    }
+    if concurrent is None:
+        concurrent = settings.WORKFLOW_CONCURRENT
+    if fused is None:
+        fused = settings.FUSED_ANALYSIS
+    graph = FUSED_WORKFLOW_GRAPH if fused else WORKFLOW_GRAPH
+    return graph, opts, concurrent
+
+
+def _start_session(state: Dict[str, Any], opts: Dict[str, Any]) -> None:
+    context = opts["conversation"]
+    if context is not None:
+        state["metadata"]["session"] = {"session_id": context["session_id"], "turn": context["turn"]}
+
 
-    # 8. NOTE: Logging is intentionally not performed here. Caller should call logger_node.log_interaction(state)
+def _finish_trace(state: Dict[str, Any], trace: metrics.Trace, concurrent: bool) -> None:
+    """
+    Attach the per-request trace to metadata (persisted in the meta column) and feed the
+    end-to-end histogram.
+    """
+    state["metadata"]["trace"] = trace.to_dict()
+    metrics.WORKFLOW_DURATION.observe(
+        state["metadata"]["trace"]["total_ms"] / 1000.0, mode="concurrent" if concurrent else "sequential"
+    )
+
+
+def support_agent_workflow(
+    user_input: str,
+    model: Optional[str] = None,
+    threshold: float = None,
+    use_mock: bool = True,
+    concurrent: bool = None,
+    fused: bool = None,
+    conversation: Optional[Conversation] = None,
+) -> Dict[str, Any]:
+    """
+    Main orchestrator for a single user interaction.
+    NOTE: This function no longer persists logs to DB — logging should be done by the caller (e.g., app.py),
+    so the caller can attach the returned log id to the conversation state.
+
+    `model` overrides the model of every LLM call; by default each task (classification,
+    sentiment, reply) uses its own model and endpoints from settings.MODEL_ROUTES.
+
+    With concurrent=True (default: settings.WORKFLOW_CONCURRENT) independent nodes such as
+    classification, sentiment and entity extraction run in parallel, and per-node timings are
+    recorded in state["metadata"]["timings"]. The resulting state is otherwise identical to the
+    sequential path.
+
+    With fused=True (default: settings.FUSED_ANALYSIS) intents, sentiment and urgency come from a
+    single structured LLM call, falling back to the per-node calls if its output is invalid.
+
+    With a `conversation` (core.session.Conversation) entities and intents from earlier turns
+    carry into this one, and the finished turn is recorded on it; persisting it is up to the
+    caller (see core.session.get_store).
+    """
+    state = _init_state(user_input)
+    graph, opts, concurrent = _resolve(model, threshold, use_mock, concurrent, fused, conversation)
+    _start_session(state, opts)
+    with metrics.trace() as trace:
+        _execute(graph, state, opts, concurrent)
+    _finish_trace(state, trace, concurrent)
+    if conversation is not None:
+        conversation.record(state)
+
+    # NOTE: Logging is intentionally not performed here. Caller should call logger_node.log_interaction(state)
     return state
+
+
+class WorkflowStream:
+    """
+    Iterable of reply chunks produced by support_agent_workflow_stream.
+
+    Iterating yields the reply as it is generated; once the stream is exhausted the
+    verification / escalation nodes run and `result()` returns the final state.
+    """
+
+    def __init__(
+        self, state: Dict[str, Any], opts: Dict[str, Any], tokens: Iterator[str], started: float,
+        trace: metrics.Trace, concurrent: bool, conversation: Optional[Conversation] = None,
+    ):
+        self.state = state
+        self._conversation = conversation
+        self._opts = opts
+        self._trace = trace
+        self._concurrent = concurrent
+        self._tokens = tokens
+        self._started = started
+        self._parts: List[str] = []
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[str]:
+        if self._consumed:
+            return
+        self._consumed = True
+        first_token_ms = None
+        tokens = iter(self._tokens)
+        while True:
+            # Re-enter the request trace only while producing a chunk, never across the yield
+            with metrics.use_trace(self._trace):
+                token = next(tokens, None)
+            if token is None:
+                break
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - self._started) * 1000.0
+            self._parts.append(token)
+            yield token
+        self._finish(first_token_ms)
+
+    def _finish(self, first_token_ms: Optional[float]) -> None:
+        self.state["response_text"] = "".join(self._parts).strip()
+        # The scheduler can still reject the streamed generation; that reply is busy, not LLM
+        if self.state["response_text"] == responses.BUSY_RESPONSE:
+            self.state["metadata"]["response_mode"] = "busy"
+        with metrics.use_trace(self._trace):
+            for name, node, _ in WORKFLOW_GRAPH:
+                if name in RESPONSE_NODES and name != "respond":
+                    _merge(self.state, _timed(name, node, self.state, self._opts)[0])
+        self.state["metadata"]["stream"] = {
+            "ttft_ms": round(first_token_ms or 0.0, 2),
+            "total_ms": round((time.perf_counter() - self._started) * 1000.0, 2),
+        }
+        _finish_trace(self.state, self._trace, self._concurrent)
+        if self._conversation is not None:
+            self._conversation.record(self.state)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Drain any remaining chunks and return the final state.
+        """
+        for _ in self:
+            pass
+        return self.state
+
+
+def support_agent_workflow_stream(
+    user_input: str,
+    model: Optional[str] = None,
+    threshold: float = None,
+    use_mock: bool = True,
+    concurrent: bool = None,
+    fused: bool = None,
+    conversation: Optional[Conversation] = None,
+) -> WorkflowStream:
+    """
+    Streaming variant of support_agent_workflow. Analysis and tool nodes run up front;
+    tool/canned replies are emitted as one chunk, LLM fallback replies token by token.
+    Time-to-first-token is recorded in state["metadata"]["stream"].
+    """
+    started = time.perf_counter()
+    state = _init_state(user_input)
+    graph, opts, concurrent = _resolve(model, threshold, use_mock, concurrent, fused, conversation)
+    _start_session(state, opts)
+    with metrics.trace() as trace:
+        _execute([n for n in graph if n[0] not in RESPONSE_NODES], state, opts, concurrent)
+
+    response_text, mode = _static_response(state)
+    if not response_text and _busy(state):
+        response_text, mode = responses.BUSY_RESPONSE, "busy"
+    state["metadata"]["response_mode"] = mode or "llm"
+    if response_text:
+        tokens: Iterator[str] = iter([response_text])
+    else:
+        tokens = response_node.ollama_stream_response(
+            state["user_input"], state["intents"], state["action_results"], state["sentiment"], state["urgency"],
+            context=prompt_context(opts.get("conversation")), model=opts["model"],
+        )
+    return WorkflowStream(state, opts, tokens, started, trace, concurrent, conversation)
@@ -0,0 +1,96 @@
+# pages/analytics.py
+import datetime
+
+import pandas as pd
+import streamlit as st
+from services import rollups
+from services.db_logger import init_db
+
+
+# ---------------- Page Setup ----------------
+st.set_page_config(
+    page_title="Support Analytics",
+    page_icon="📊",
+    layout="wide",
+)
+
+
+@st.cache_resource(show_spinner=False)
+def _init_db() -> bool:
+    # Migrates older databases and creates the rollup tables if needed (once per process)
+    init_db()
+    return True
+
+
+_init_db()
+
+WINDOWS = {
+    "Last 24 hours": (datetime.timedelta(hours=24), "hour"),
+    "Last 7 days": (datetime.timedelta(days=7), "day"),
+    "Last 30 days": (datetime.timedelta(days=30), "day"),
+    "All time": (None, "week"),
+}
+
+
+# ---------------- Sidebar Controls ----------------
+st.sidebar.header("📊 Filters")
+window = st.sidebar.selectbox("Time window (UTC)", list(WINDOWS), index=1)
+delta, default_period = WINDOWS[window]
+period = st.sidebar.radio("Bucket", list(rollups.PERIOD_FORMATS), index=list(rollups.PERIOD_FORMATS).index(default_period))
+since = datetime.datetime.utcnow() - delta if delta else None
+if st.sidebar.button("Rebuild rollups from logs"):
+    with st.spinner("Backfilling…"):
+        result = rollups.backfill()
+    st.sidebar.success(f"Rebuilt in {result['seconds']}s")
+
+
+# ---------------- Title ----------------
+st.title("📊 Support Analytics")
+
+
+# ---------------- Headline Metrics ----------------
+totals = rollups.totals(since=since)
+if not totals["interactions"]:
+    st.info("No interactions logged in this window yet.")
+    st.stop()
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Interactions", f"{totals['interactions']:,}")
+c2.metric("Escalation rate", f"{totals['escalation_rate']:.1%}")
+c3.metric("👍 / 👎", f"{totals['feedback_up']} / {totals['feedback_down']}")
+c4.metric("👍 ratio", f"{totals['up_ratio']:.0%}" if totals["feedback_up"] + totals["feedback_down"] else "–")
+
+
+# ---------------- Traffic ----------------
+volume = pd.DataFrame(rollups.volume_over_time(period, since=since)).set_index("period")
+left, right = st.columns(2)
+with left:
+    st.subheader("Volume")
+    st.bar_chart(volume[["interactions", "escalated"]])
+with right:
+    st.subheader("Escalation rate")
+    st.line_chart(volume[["escalation_rate"]])
+
+
+# ---------------- Intents ----------------
+st.subheader("Intents over time")
+intents = pd.DataFrame(rollups.intents_over_time(period, since=since))
+if not intents.empty:
+    st.area_chart(intents.pivot_table(index="period", columns="intent", values="interactions", fill_value=0))
+
+left, right = st.columns(2)
+with left:
+    st.subheader("By intent")
+    summary = pd.DataFrame(rollups.intent_summary(since=since))
+    if not summary.empty:
+        st.dataframe(summary.set_index("intent"), use_container_width=True)
+with right:
+    st.subheader("Sentiment mix")
+    intent_filter = st.selectbox("Intent", ["(all)"] + (summary["intent"].tolist() if not summary.empty else []))
+    mix = rollups.sentiment_mix(None if intent_filter == "(all)" else intent_filter, since=since)
+    st.bar_chart(pd.Series(mix, name="interactions"))
+
+
+# ---------------- Feedback ----------------
+st.subheader("Feedback")
+st.bar_chart(volume[["feedback_up", "feedback_down"]])
@@ -1,63 +1,399 @@
 # services/db_logger.py
+import atexit
+import queue
 import sqlite3
 import json
-from typing import Dict, Any
-from config.settings import DB_PATH
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import DB_PATH, DB_BATCH_SIZE, DB_BATCH_WAIT_MS, DB_BUSY_TIMEOUT_MS
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+INSERT_LOG_SQL = """
+INSERT INTO logs (input, intents, sentiment, urgency, actions, response, escalation, meta, feedback)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def connect(path: Path = None) -> sqlite3.Connection:
+    """
+    Open a connection with WAL mode and tuned pragmas.
+    """
+    conn = sqlite3.connect(path or DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Long-lived connection for the calling thread (one per thread and DB path).
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    path = str(DB_PATH)
+    if path not in conns:
+        conns[path] = connect(DB_PATH)
+    return conns[path]
+
+
+SCHEMA_VERSION = 3
+
+HOUR_BUCKET = "strftime('%Y-%m-%d %H:00:00', {ts})"
+
+# Schema migrations, applied in order to bring PRAGMA user_version up to SCHEMA_VERSION.
+# Each step must be safe on databases created by any earlier version of this module.
+MIGRATIONS = {
+    2: [
+        "CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_escalation ON logs(escalation, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_sentiment ON logs(sentiment, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_urgency ON logs(urgency, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_feedback ON logs(feedback)",
+        """
+        CREATE TABLE IF NOT EXISTS log_intents (
+            log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+            intent TEXT NOT NULL,
+            PRIMARY KEY (log_id, intent)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_log_intents_intent ON log_intents(intent, log_id)",
+        # Keep log_intents in sync with logs.intents for every writer
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_logs_intents_insert AFTER INSERT ON logs
+        WHEN json_valid(NEW.intents)
+        BEGIN
+            INSERT OR IGNORE INTO log_intents (log_id, intent)
+            SELECT NEW.id, value FROM json_each(NEW.intents) WHERE type = 'text';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_logs_delete AFTER DELETE ON logs
+        BEGIN
+            DELETE FROM log_intents WHERE log_id = OLD.id;
+        END
+        """,
+        # Backfill existing rows
+        """
+        INSERT OR IGNORE INTO log_intents (log_id, intent)
+        SELECT logs.id, j.value FROM logs, json_each(logs.intents) AS j
+        WHERE json_valid(logs.intents) AND j.type = 'text'
+        """,
+    ],
+}
+
+
+# Rebuild the hourly rollups from logs (migration 3 and `python -m services.rollups backfill`)
+ROLLUP_BACKFILL = [
+    "DELETE FROM rollup_hourly",
+    "DELETE FROM rollup_hourly_intent",
+    f"""
+    INSERT INTO rollup_hourly (hour, sentiment, escalation, interactions, feedback_up, feedback_down)
+    SELECT {HOUR_BUCKET.format(ts="ts")}, COALESCE(sentiment, 'unknown'), COALESCE(escalation, 0),
+           COUNT(*), SUM(feedback IS 'up'), SUM(feedback IS 'down')
+    FROM logs WHERE ts IS NOT NULL GROUP BY 1, 2, 3
+    """,
+    f"""
+    INSERT INTO rollup_hourly_intent (hour, intent, sentiment, escalation, interactions, feedback_up, feedback_down)
+    SELECT {HOUR_BUCKET.format(ts="l.ts")}, li.intent, COALESCE(l.sentiment, 'unknown'), COALESCE(l.escalation, 0),
+           COUNT(*), SUM(l.feedback IS 'up'), SUM(l.feedback IS 'down')
+    FROM logs l JOIN log_intents li ON li.log_id = l.id
+    WHERE l.ts IS NOT NULL GROUP BY 1, 2, 3, 4
+    """,
+]
+
+MIGRATIONS[3] = [
+    # Hourly rollups (hour × sentiment × escalation, and the same per intent) maintained by
+    # triggers in the writing transaction, so dashboards never scan logs. Logs are append-only
+    # apart from feedback; after deleting rows, rebuild with ROLLUP_BACKFILL.
+    """
+    CREATE TABLE IF NOT EXISTS rollup_hourly (
+        hour TEXT NOT NULL,
+        sentiment TEXT NOT NULL,
+        escalation INTEGER NOT NULL,
+        interactions INTEGER NOT NULL DEFAULT 0,
+        feedback_up INTEGER NOT NULL DEFAULT 0,
+        feedback_down INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, sentiment, escalation)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_hourly_intent (
+        hour TEXT NOT NULL,
+        intent TEXT NOT NULL,
+        sentiment TEXT NOT NULL,
+        escalation INTEGER NOT NULL,
+        interactions INTEGER NOT NULL DEFAULT 0,
+        feedback_up INTEGER NOT NULL DEFAULT 0,
+        feedback_down INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, intent, sentiment, escalation)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_logs_insert AFTER INSERT ON logs
+    WHEN NEW.ts IS NOT NULL
+    BEGIN
+        INSERT INTO rollup_hourly (hour, sentiment, escalation, interactions, feedback_up, feedback_down)
+        VALUES ({HOUR_BUCKET.format(ts="NEW.ts")}, COALESCE(NEW.sentiment, 'unknown'), COALESCE(NEW.escalation, 0),
+                1, NEW.feedback IS 'up', NEW.feedback IS 'down')
+        ON CONFLICT (hour, sentiment, escalation) DO UPDATE SET
+            interactions = interactions + 1,
+            feedback_up = feedback_up + excluded.feedback_up,
+            feedback_down = feedback_down + excluded.feedback_down;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_intents_insert AFTER INSERT ON log_intents
+    BEGIN
+        INSERT INTO rollup_hourly_intent (hour, intent, sentiment, escalation, interactions, feedback_up, feedback_down)
+        SELECT {HOUR_BUCKET.format(ts="ts")}, NEW.intent, COALESCE(sentiment, 'unknown'), COALESCE(escalation, 0),
+               1, feedback IS 'up', feedback IS 'down'
+        FROM logs WHERE id = NEW.log_id AND ts IS NOT NULL
+        ON CONFLICT (hour, intent, sentiment, escalation) DO UPDATE SET
+            interactions = interactions + 1,
+            feedback_up = feedback_up + excluded.feedback_up,
+            feedback_down = feedback_down + excluded.feedback_down;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_feedback AFTER UPDATE OF feedback ON logs
+    WHEN OLD.feedback IS NOT NEW.feedback AND NEW.ts IS NOT NULL
+    BEGIN
+        UPDATE rollup_hourly SET
+            feedback_up = feedback_up - (OLD.feedback IS 'up') + (NEW.feedback IS 'up'),
+            feedback_down = feedback_down - (OLD.feedback IS 'down') + (NEW.feedback IS 'down')
+        WHERE hour = {HOUR_BUCKET.format(ts="NEW.ts")}
+          AND sentiment = COALESCE(NEW.sentiment, 'unknown') AND escalation = COALESCE(NEW.escalation, 0);
+        UPDATE rollup_hourly_intent SET
+            feedback_up = feedback_up - (OLD.feedback IS 'up') + (NEW.feedback IS 'up'),
+            feedback_down = feedback_down - (OLD.feedback IS 'down') + (NEW.feedback IS 'down')
+        WHERE hour = {HOUR_BUCKET.format(ts="NEW.ts")}
+          AND sentiment = COALESCE(NEW.sentiment, 'unknown') AND escalation = COALESCE(NEW.escalation, 0)
+          AND intent IN (SELECT intent FROM log_intents WHERE log_id = NEW.id);
+    END
+    """,
+    *ROLLUP_BACKFILL,
+]
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+    if "feedback" not in columns:
+        # Very old databases predate the feedback column
+        conn.execute("ALTER TABLE logs ADD COLUMN feedback TEXT")
+    for target in sorted(MIGRATIONS):
+        if version >= target:
+            continue
+        with conn:
+            for statement in MIGRATIONS[target]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version={target}")
+        version = target
 
 
 def init_db():
     """
-    Initialize SQLite database with the required logs table.
+    Initialize SQLite database with the required logs table and migrate it to SCHEMA_VERSION
+    (indexes, normalized log_intents table, hourly rollups). Safe to run on existing
+    agent_logs.db files.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            input TEXT,
-            intents TEXT,
-            sentiment TEXT,
-            urgency TEXT,
-            actions TEXT,
-            response TEXT,
-            escalation INTEGER,
-            meta TEXT,
-            feedback TEXT
-        )
-        """)
-        conn.commit()
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        input TEXT,
+        intents TEXT,
+        sentiment TEXT,
+        urgency TEXT,
+        actions TEXT,
+        response TEXT,
+        escalation INTEGER,
+        meta TEXT,
+        feedback TEXT
+    )
+    """)
+    conn.commit()
+    _migrate(conn)
+
+
+def _log_row(payload: Dict[str, Any]) -> Tuple:
+    return (
+        payload.get("input"),
+        json.dumps(payload.get("intents", []), ensure_ascii=False),
+        payload.get("sentiment"),
+        payload.get("urgency"),
+        json.dumps(payload.get("actions", []), ensure_ascii=False),
+        payload.get("response"),
+        1 if payload.get("escalation") else 0,
+        json.dumps(payload.get("meta", {}), ensure_ascii=False),
+        payload.get("feedback"),
+    )
+
+
+class LogWriter:
+    """
+    Dedicated writer thread that group-commits queued writes.
+
+    Callers enqueue work and get a Future; the writer drains up to DB_BATCH_SIZE items
+    (waiting at most DB_BATCH_WAIT_MS for stragglers) and commits them in a single
+    transaction, so concurrent sessions share one fsync instead of contending for the lock.
+    """
+
+    def __init__(self, path: Path, batch_size: int = DB_BATCH_SIZE, batch_wait_ms: float = DB_BATCH_WAIT_MS):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[Tuple[str, Any, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, item: Any) -> Future:
+        fut: Future = Future()
+        if kind == "log":
+            # Serialize on the caller's thread: a payload json can't encode fails its own
+            # Future instead of reaching the writer
+            try:
+                item = _log_row(item)
+            except Exception as e:
+                fut.set_exception(e)
+                return fut
+        self._queue.put((kind, item, fut))
+        return fut
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        conn = connect(self.path)
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    return
+                batch = [first]
+                stop = False
+                while len(batch) < self.batch_size:
+                    try:
+                        if self.batch_wait > 0:
+                            nxt = self._queue.get(timeout=self.batch_wait)
+                        else:
+                            # Only take what is already queued; writes that arrive while
+                            # this batch commits form the next batch
+                            nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _apply(c: sqlite3.Cursor, kind: str, item: Any) -> Any:
+        if kind == "log":
+            c.execute(INSERT_LOG_SQL, item)  # row built by submit()
+            return c.lastrowid
+        log_id, feedback = item  # feedback
+        c.execute("UPDATE logs SET feedback=? WHERE id=?", (feedback, log_id))
+        return None
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[str, Any, Future]]) -> None:
+        try:
+            with conn:
+                c = conn.cursor()
+                results = [self._apply(c, kind, item) for kind, item, _ in batch]
+        except Exception:
+            # Retry one by one so a single bad write only fails its own Future; nothing
+            # may escape, or the writer thread dies and every later write blocks
+            for kind, item, fut in batch:
+                try:
+                    with conn:
+                        result = self._apply(conn.cursor(), kind, item)
+                except Exception as e:
+                    fut.set_exception(e)
+                else:
+                    fut.set_result(result)
+            return
+        for (_, _, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+
+_writers: Dict[str, LogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer() -> LogWriter:
+    path = str(DB_PATH)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = LogWriter(DB_PATH)
+        return writer
+
+
+@atexit.register
+def close_writers() -> None:
+    """
+    Flush pending writes and stop writer threads.
+    """
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def save_log_async(payload: Dict[str, Any]) -> "Future[int]":
+    """
+    Queue a log entry for the writer thread; the Future resolves to its row id.
+    """
+    return get_writer().submit("log", payload)
 
 
 def save_log(payload: Dict[str, Any]) -> int:
     """
     Save a log entry and return its row id.
     """
-    with sqlite3.connect(DB_PATH) as conn:
+    return save_log_async(payload).result()
+
+
+def save_logs(payloads: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert a batch of log entries in one transaction on the calling thread's connection.
+    Returns the row ids in payload order.
+    """
+    conn = get_connection()
+    ids: List[int] = []
+    with conn:
         c = conn.cursor()
-        c.execute("""
-        INSERT INTO logs (input, intents, sentiment, urgency, actions, response, escalation, meta, feedback)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            payload.get("input"),
-            json.dumps(payload.get("intents", []), ensure_ascii=False),
-            payload.get("sentiment"),
-            payload.get("urgency"),
-            json.dumps(payload.get("actions", []), ensure_ascii=False),
-            payload.get("response"),
-            1 if payload.get("escalation") else 0,
-            json.dumps(payload.get("meta", {}), ensure_ascii=False),
-            payload.get("feedback"),
-        ))
-        conn.commit()
-        return c.lastrowid
+        for payload in payloads:
+            c.execute(INSERT_LOG_SQL, _log_row(payload))
+            ids.append(c.lastrowid)
+    return ids
 
 
 def save_feedback(log_id: int, feedback: str):
     """
     Update feedback for a given log entry.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute("UPDATE logs SET feedback=? WHERE id=?", (feedback, log_id))
-        conn.commit()
+    get_writer().submit("feedback", (log_id, feedback)).result()
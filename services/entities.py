@@ -0,0 +1,193 @@
+# services/entities.py
+"""
+Single-pass entity extraction.
+
+Entity types live in a registry; each has a pattern and an optional prefilter, a cheap
+test every match must pass ('@' for emails, 'ord' for order ids). Scanning first runs
+the prefilters, which are plain substring checks (or a short compiled pattern where a
+substring is not enough), then scans the text once with an alternation of named groups
+built from only the types whose prefilter passed. Most messages mention one or two entity
+types, so the alternation tried at each position is short; it is compiled once per
+combination of types and cached.
+
+Earlier registrations win when two types could match at the same position, so more
+specific types (emails, prefixed ids, dates) are registered before generic ones
+(amounts, phone numbers). Matches only start where the previous character is not a word
+character; the combined pattern is gated on that so the alternation is not retried at
+every position inside a word.
+
+    >>> extract_entities("Refund ORD1234 to jane@example.com")
+    {'order_id': 'ORD1234', 'email': 'jane@example.com', 'matches': [...]}
+"""
+import re
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Pattern, Sequence, Tuple, Union
+
+
+class EntityType(NamedTuple):
+    name: str
+    pattern: str
+    normalize: Callable[[str], str]
+    ignore_case: bool
+    prefilter: Optional[Tuple[Union[str, Pattern], ...]] = None
+
+
+class Entity(NamedTuple):
+    type: str
+    value: str
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "value": self.value, "start": self.start, "end": self.end}
+
+
+_registry: Dict[str, EntityType] = {}
+# Combined pattern per tuple of type names that passed their prefilters
+_compiled: Dict[Tuple[str, ...], Pattern] = {}
+_lock = threading.Lock()
+
+
+def register_entity(
+    name: str,
+    pattern: str,
+    normalize: Callable[[str], str] = str.strip,
+    ignore_case: bool = False,
+    prefilter: Optional[Sequence[Union[str, Pattern]]] = None,
+) -> None:
+    """
+    Add (or replace) an entity type. `pattern` must not contain named groups; `name` must
+    be a valid identifier since it becomes the group name in the combined pattern.
+
+    `prefilter`, if given, lists lowercase substrings or compiled patterns of which every
+    match of `pattern` contains at least one; they are checked against the lowercased text
+    and the type is left out of the scan when none is found.
+    """
+    if not name.isidentifier():
+        raise ValueError(f"Entity type name must be an identifier: {name!r}")
+    re.compile(pattern)  # fail fast on a bad pattern
+    if prefilter is not None:
+        prefilter = tuple(prefilter)
+        if not prefilter or any(isinstance(p, str) and (not p or p != p.lower()) for p in prefilter):
+            raise ValueError(f"Prefilter for {name!r} must be lowercase substrings or compiled patterns")
+    with _lock:
+        _registry[name] = EntityType(name, pattern, normalize, ignore_case, prefilter)
+        _compiled.clear()
+
+
+def unregister_entity(name: str) -> None:
+    with _lock:
+        _registry.pop(name, None)
+        _compiled.clear()
+
+
+def entity_types() -> List[EntityType]:
+    """
+    Registered types in match-priority order.
+    """
+    return list(_registry.values())
+
+
+def _passes(prefilter: Tuple[Union[str, Pattern], ...], lowered: str) -> bool:
+    for p in prefilter:
+        if p in lowered if isinstance(p, str) else p.search(lowered):
+            return True
+    return False
+
+
+def _combined(names: Tuple[str, ...]) -> Pattern:
+    compiled = _compiled.get(names)
+    if compiled is None:
+        with _lock:
+            compiled = _compiled.get(names)
+            if compiled is None:
+                types = [_registry[name] for name in names]
+                parts = [f"(?P<{t.name}>{'(?i:' + t.pattern + ')' if t.ignore_case else t.pattern})" for t in types]
+                compiled = _compiled[names] = re.compile(r"(?<!\w)(?:" + "|".join(parts) + ")")
+    return compiled
+
+
+def scan(text: str) -> List[Entity]:
+    """
+    All entity matches in `text`, in order of appearance, with spans into `text`.
+    """
+    if not text:
+        return []
+    registry = _registry
+    lowered = text.lower()
+    names = tuple(
+        t.name for t in list(registry.values()) if t.prefilter is None or _passes(t.prefilter, lowered)
+    )
+    if not names:
+        return []
+    found: List[Entity] = []
+    for m in _combined(names).finditer(text):
+        name = m.lastgroup
+        found.append(Entity(name, registry[name].normalize(m.group(name)), m.start(), m.end()))
+    return found
+
+
+def extract_entities(text: str) -> Dict[str, Any]:
+    """
+    First value per entity type (e.g. 'order_id', 'email'), plus every match with its span
+    under 'matches'.
+    """
+    matches = scan(text)
+    entities: Dict[str, Any] = {}
+    for e in matches:
+        entities.setdefault(e.type, e.value)
+    entities["matches"] = [e.to_dict() for e in matches]
+    return entities
+
+
+# ---------------- Built-in entity types ----------------
+_MONTHS = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+
+register_entity(
+    "email", r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}\b", normalize=str.lower, prefilter=["@"]
+)
+register_entity(
+    "order_id", r"\bORD-?\d{3,}\b", normalize=lambda s: s.upper().replace("-", ""), ignore_case=True,
+    prefilter=["ord"],
+)
+register_entity(
+    "refund_id", r"\bRFD-?\d{3,}\b", normalize=lambda s: s.upper().replace("-", ""), ignore_case=True,
+    prefilter=["rfd"],
+)
+register_entity(
+    "ticket_id", r"\bTKT-?\d{3,}\b", normalize=lambda s: s.upper().replace("-", ""), ignore_case=True,
+    prefilter=["tkt"],
+)
+register_entity(
+    "date",
+    r"\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b\d{1,2}/\d{1,2}/\d{2,4}\b"
+    rf"|\b{_MONTHS} \d{{1,2}}(?:st|nd|rd|th)?(?:,? \d{{4}})?\b"
+    rf"|\b\d{{1,2}}(?:st|nd|rd|th)? {_MONTHS}(?: \d{{4}})?\b",
+    ignore_case=True,
+    # a digit next to a date separator, before a (month) word or after one
+    prefilter=[re.compile(r"\d(?:[-/]\d|(?:st|nd|rd|th)? [a-z]|(?<=[a-z] \d)|(?<=[a-z]\. \d))")],
+)
+register_entity(
+    "amount",
+    r"[$€£]\s?\d[\d,]*(?:\.\d{1,2})?\b"
+    r"|\b\d[\d,]*(?:\.\d{1,2})? ?(?:usd|eur|gbp|dollars|euros|pounds)\b",
+    normalize=lambda s: s.replace(" ", ""),
+    ignore_case=True,
+    prefilter=["$", "€", "£", "usd", "eur", "gbp", "dollars", "pounds"],
+)
+# A phone number needs a '+' country code, an area code in parentheses or a separator
+# between its digit groups, so bare digit runs (zip codes, account numbers) are not phones.
+register_entity(
+    "phone",
+    r"(?<![\w+])(?:"
+    r"\+\d{1,3}[ .-]?(?:\(\d{1,4}\)|\d{1,4})[ .-]?\d{3,4}[ .-]?\d{3,4}"
+    r"|\(\d{2,4}\)[ .-]?\d{3,4}[ .-]?\d{3,4}"
+    r"|\d{2,4}[ .-]\d{3,4}[ .-]?\d{3,4}"
+    r")\b",
+    normalize=lambda s: re.sub(r"[^\d+]", "", s),
+    prefilter=[re.compile(r"[-+ .(]\d")],
+)
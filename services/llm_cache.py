@@ -0,0 +1,222 @@
+# services/llm_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol
+
+
+def make_key(model: str, prompt: str, options: Dict[str, Any]) -> str:
+    """
+    Build a stable cache key from the model, a hash of the prompt and the sampling options
+    (max_tokens, temperature, ...).
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    opts = json.dumps(options, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{model}\x00{prompt_hash}\x00{opts}".encode("utf-8")).hexdigest()
+
+
+class LLMCache(Protocol):
+    """
+    Interface every cache tier implements; OllamaClient accepts any object with it.
+    """
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class MemoryCache:
+    """
+    Thread-safe in-memory LRU with per-entry TTL and a maximum number of entries.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, value = item
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class SQLiteCache:
+    """
+    Persistent cache tier stored in its own SQLite file (by default next to DB_PATH).
+    `table` lets other key/value stores (e.g. tool idempotency records) reuse it.
+
+    Expired rows (and the oldest rows past `max_rows`, if set) are purged when the cache
+    is opened and every `purge_every` writes, so the file does not grow without bound.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 3600,
+        table: str = "llm_cache",
+        max_rows: Optional[int] = None,
+        purge_every: int = 1000,
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = Path(path)
+        self.ttl = ttl
+        self.table = table
+        self.max_rows = max_rows
+        self.purge_every = purge_every
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.table} (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            created REAL
+        )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table} (created)")
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created FROM {self.table} WHERE key=?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._writes += 1
+            if self.purge_every and self._writes % self.purge_every == 0:
+                self._purge()
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired rows, then the oldest rows past max_rows. Returns the number deleted.
+        """
+        with self._lock:
+            removed = self._purge()
+            self._conn.commit()
+            return removed
+
+    def _purge(self) -> int:
+        removed = 0
+        if self.ttl:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl,)
+            )
+            removed += cur.rowcount
+        if self.max_rows is not None:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+            removed += cur.rowcount
+        self.purged += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return {"size": size, "hits": self.hits, "misses": self.misses, "purged": self.purged}
+
+
+class TieredCache:
+    """
+    Memory tier in front of an optional persistent tier. Persistent hits are promoted to memory.
+    """
+
+    def __init__(self, memory: MemoryCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            out: Dict[str, Any] = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "memory": self.memory.stats(),
+            }
+        if self.persistent is not None:
+            out["persistent"] = self.persistent.stats()
+        return out
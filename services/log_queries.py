@@ -0,0 +1,120 @@
+# services/log_queries.py
+"""
+Common analytics over the logs table, computed in SQL on the indexed schema
+(see db_logger.MIGRATIONS) instead of decoding JSON rows in Python.
+
+Time bounds accept "YYYY-MM-DD[ HH:MM:SS]" strings or datetime/date objects and
+compare against logs.ts (UTC, as written by CURRENT_TIMESTAMP).
+"""
+import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+from services.db_logger import get_connection
+
+TimeBound = Optional[Union[str, datetime.date, datetime.datetime]]
+
+
+def _ts(value: TimeBound) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.isoformat()
+
+
+def _where(since: TimeBound, until: TimeBound, intent: Optional[str], alias: str = "l") -> Tuple[str, str, List[Any]]:
+    """
+    Build (join, where, params) for the shared filters.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    join = ""
+    if intent:
+        join = f" JOIN log_intents li ON li.log_id = {alias}.id AND li.intent = ?"
+        params.append(intent)
+    if since is not None:
+        clauses.append(f"{alias}.ts >= ?")
+        params.append(_ts(since))
+    if until is not None:
+        clauses.append(f"{alias}.ts < ?")
+        params.append(_ts(until))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return join, where, params
+
+
+def escalation_rate(intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> Dict[str, Any]:
+    """
+    Escalated share of interactions, optionally for one intent, e.g.
+    escalation_rate("refund", since=last_week).
+    """
+    join, where, params = _where(since, until, intent)
+    total, escalated = get_connection().execute(
+        f"SELECT COUNT(*), COALESCE(SUM(l.escalation), 0) FROM logs l{join}{where}", params
+    ).fetchone()
+    return {"total": total, "escalated": escalated, "rate": round(escalated / total, 4) if total else 0.0}
+
+
+def intent_counts(since: TimeBound = None, until: TimeBound = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Most frequent intents with their escalation rate.
+    """
+    _, where, params = _where(since, until, None)
+    rows = get_connection().execute(
+        f"""
+        SELECT li.intent, COUNT(*), COALESCE(SUM(l.escalation), 0)
+        FROM log_intents li JOIN logs l ON l.id = li.log_id{where}
+        GROUP BY li.intent ORDER BY COUNT(*) DESC LIMIT ?
+        """,
+        params + [limit],
+    ).fetchall()
+    return [
+        {"intent": intent, "count": count, "escalation_rate": round(esc / count, 4) if count else 0.0}
+        for intent, count, esc in rows
+    ]
+
+
+def sentiment_breakdown(intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> Dict[str, int]:
+    join, where, params = _where(since, until, intent)
+    rows = get_connection().execute(
+        f"SELECT COALESCE(l.sentiment, 'unknown'), COUNT(*) FROM logs l{join}{where} GROUP BY 1", params
+    ).fetchall()
+    return dict(rows)
+
+
+def urgency_breakdown(intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> Dict[str, int]:
+    join, where, params = _where(since, until, intent)
+    rows = get_connection().execute(
+        f"SELECT COALESCE(l.urgency, 'unknown'), COUNT(*) FROM logs l{join}{where} GROUP BY 1", params
+    ).fetchall()
+    return dict(rows)
+
+
+def feedback_summary(intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> Dict[str, Any]:
+    """
+    👍/👎 counts and the share of rated interactions that were positive.
+    """
+    join, where, params = _where(since, until, intent)
+    up, down = get_connection().execute(
+        f"""
+        SELECT COALESCE(SUM(l.feedback = 'up'), 0), COALESCE(SUM(l.feedback = 'down'), 0)
+        FROM logs l{join}{where}
+        """,
+        params,
+    ).fetchone()
+    rated = up + down
+    return {"up": up, "down": down, "up_ratio": round(up / rated, 4) if rated else 0.0}
+
+
+def volume_by_period(period: str = "day", intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> List[Dict[str, Any]]:
+    """
+    Interaction and escalation counts bucketed by "hour" or "day".
+    """
+    fmt = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}[period]
+    join, where, params = _where(since, until, intent)
+    rows = get_connection().execute(
+        f"""
+        SELECT strftime('{fmt}', l.ts) AS bucket, COUNT(*), COALESCE(SUM(l.escalation), 0)
+        FROM logs l{join}{where} GROUP BY bucket ORDER BY bucket
+        """,
+        params,
+    ).fetchall()
+    return [{"period": bucket, "count": count, "escalated": esc} for bucket, count, esc in rows]
@@ -0,0 +1,354 @@
+# services/metrics.py
+"""
+In-process metrics and per-request tracing.
+
+- Counter / Histogram / callback gauges in a small registry, rendered in the Prometheus
+  text exposition format and served from a local HTTP endpoint (GET /metrics).
+- span(kind, name) times a block, feeds the matching histogram and, if a trace is
+  active for the current request, appends the span to it. The trace lives in a
+  ContextVar, so worker threads see it when work is submitted with copy_context().
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = f'le="{_fmt_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {int(cumulative)}")
+                inf = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, inf)} {int(series[-1])}")
+                lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(series[-2])}")
+                lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {int(series[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Any]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help, labelnames)
+            return self._metrics[name]
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, labelnames, buckets)
+            return self._metrics[name]
+
+    def gauge_callback(self, name: str, help: str, fn: Callable[[], Any]) -> None:
+        """
+        Register a gauge read at scrape time. fn returns a number, or a dict of
+        {label_value: number} rendered with a single "key" label.
+        """
+        with self._lock:
+            self._gauges[name] = (help, fn)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = list(self._gauges.items())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        for name, (help, fn) in gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                for k, v in sorted(value.items()):
+                    lines.append(f'{name}{{key="{_escape(k)}"}} {_fmt_value(float(v))}')
+            elif value is not None:
+                lines.append(f"{name} {_fmt_value(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+NODE_DURATION = REGISTRY.histogram(
+    "agent_node_duration_seconds", "Workflow node latency", ("node",)
+)
+WORKFLOW_DURATION = REGISTRY.histogram(
+    "agent_workflow_duration_seconds", "End-to-end workflow latency", ("mode",)
+)
+LLM_DURATION = REGISTRY.histogram(
+    "agent_llm_request_duration_seconds", "Client-side Ollama call latency", ("model", "outcome")
+)
+LLM_PROMPT_EVAL = REGISTRY.histogram(
+    "agent_llm_prompt_eval_seconds", "Ollama-reported prompt evaluation time", ("model",)
+)
+LLM_EVAL = REGISTRY.histogram(
+    "agent_llm_eval_seconds", "Ollama-reported generation time", ("model",)
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "agent_llm_prompt_tokens_total", "Prompt tokens evaluated by Ollama", ("model",)
+)
+LLM_EVAL_TOKENS = REGISTRY.counter(
+    "agent_llm_eval_tokens_total", "Tokens generated by Ollama", ("model",)
+)
+LLM_COALESCED = REGISTRY.counter(
+    "agent_llm_coalesced_total", "LLM calls served by an identical in-flight request", ("model", "mode")
+)
+
+
+# ---------------- Tracing ----------------
+class Trace:
+    """
+    Spans recorded for one request; safe to append to from several threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000.0, 2),
+            "spans": spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("agent_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("agent_span", default=None)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """
+    Start a per-request trace for the current context.
+    """
+    t = Trace()
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def use_trace(t: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """
+    Re-activate an existing trace, e.g. while resuming a generator that belongs to a request.
+    """
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(kind: str, name: str, histogram: Optional[Histogram] = None, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block. Yields a dict the caller may fill with extra attributes (token counts, ...).
+    The duration is observed in `histogram` (default: node histogram for kind="node") and
+    the span is appended to the active trace, tagged with its parent span.
+    """
+    attrs: Dict[str, Any] = {}
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        _current_span.reset(token)
+        record_span(kind, name, start, time.perf_counter() - start, attrs, histogram, parent, **labels)
+
+
+def record_span(
+    kind: str,
+    name: str,
+    start: float,
+    elapsed: float,
+    attrs: Optional[Dict[str, Any]] = None,
+    histogram: Optional[Histogram] = None,
+    parent: Optional[str] = None,
+    **labels: Any,
+) -> None:
+    """
+    Record an already-measured span (for generators, where a context manager would
+    straddle yields). `start` is a time.perf_counter() value, `elapsed` is in seconds.
+    """
+    attrs = attrs or {}
+    if parent is None:
+        parent = _current_span.get()
+    if histogram is None and kind == "node":
+        histogram = NODE_DURATION
+        labels = {"node": name, **labels}
+    if histogram is not None:
+        # Label values may also be filled in by the block (e.g. outcome="error")
+        labels = {**labels, **{k: attrs[k] for k in histogram.labelnames if k in attrs}}
+        histogram.observe(elapsed, **labels)
+    t = _current_trace.get()
+    if t is not None:
+        record = {
+            "kind": kind,
+            "name": name,
+            "start_ms": round((start - t.started) * 1000.0, 2),
+            "duration_ms": round(elapsed * 1000.0, 2),
+        }
+        if parent:
+            record["parent"] = parent
+        record.update(attrs)
+        t.add(record)
+
+
+def record_llm_stats(model: str, done_chunk: Dict[str, Any], attrs: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Record token counts / durations from Ollama's final "done" chunk (durations are in ns).
+    """
+    prompt_tokens = done_chunk.get("prompt_eval_count")
+    eval_tokens = done_chunk.get("eval_count")
+    if prompt_tokens:
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, model=model)
+    if eval_tokens:
+        LLM_EVAL_TOKENS.inc(eval_tokens, model=model)
+    if done_chunk.get("prompt_eval_duration"):
+        LLM_PROMPT_EVAL.observe(done_chunk["prompt_eval_duration"] / 1e9, model=model)
+    if done_chunk.get("eval_duration"):
+        LLM_EVAL.observe(done_chunk["eval_duration"] / 1e9, model=model)
+    if attrs is not None:
+        attrs.update({
+            "prompt_tokens": prompt_tokens,
+            "eval_tokens": eval_tokens,
+            "ollama_total_ms": round(done_chunk.get("total_duration", 0) / 1e6, 2),
+            "ollama_load_ms": round(done_chunk.get("load_duration", 0) / 1e6, 2),
+            "ollama_prompt_eval_ms": round(done_chunk.get("prompt_eval_duration", 0) / 1e6, 2),
+            "ollama_eval_ms": round(done_chunk.get("eval_duration", 0) / 1e6, 2),
+        })
+
+
+# ---------------- Exposition ----------------
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+def start_metrics_server(host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics in a daemon thread. Idempotent: returns the running server.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        _server = server
+        return server
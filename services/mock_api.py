@@ -2,23 +2,34 @@
 from typing import Dict, Any, Optional
 import random
 import datetime
-import re
+import time
+from config import settings
+from services.entities import extract_entities
 
 
-def _extract_order_id(text: str) -> Optional[str]:
+def _entities(normalized_input: str, entities: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Extract an order ID from text if it matches pattern ORD####.
+    Use entities already extracted upstream; only scan the text when called standalone.
     """
-    match = re.search(r"\bORD\d{3,}\b", text.upper())
-    return match.group(0) if match else None
+    return entities if entities is not None else extract_entities(normalized_input)
 
 
-def check_order_status_tool(normalized_input: str) -> Dict[str, Any]:
+def _simulate_latency(tool: str) -> None:
+    """
+    Sleep for the configured backend latency of `tool` (settings.MOCK_API_LATENCY_MS).
+    """
+    latency_ms = settings.MOCK_API_LATENCY_MS.get(tool, 0)
+    if latency_ms:
+        time.sleep(latency_ms / 1000.0)
+
+
+def check_order_status_tool(normalized_input: str, entities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Simulate checking order status. If an order ID is found in the input,
     use it; otherwise, generate a random one.
     """
-    order_id = _extract_order_id(normalized_input) or f"ORD{random.randint(1000, 9999)}"
+    _simulate_latency("check_order_status")
+    order_id = _entities(normalized_input, entities).get("order_id") or f"ORD{random.randint(1000, 9999)}"
     shipped = random.choice([True, False])
 
     return {
@@ -33,12 +44,13 @@ def check_order_status_tool(normalized_input: str) -> Dict[str, Any]:
     }
 
 
-def initiate_refund_tool(normalized_input: str) -> Dict[str, Any]:
+def initiate_refund_tool(normalized_input: str, entities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Simulate initiating a refund. If an order ID is found in input,
     link refund to that order; otherwise, generate only refund id.
     """
-    order_id = _extract_order_id(normalized_input)
+    _simulate_latency("initiate_refund")
+    order_id = _entities(normalized_input, entities).get("order_id")
     refund_id = f"RFD{random.randint(10000, 99999)}"
 
     return {
@@ -55,10 +67,11 @@ def initiate_refund_tool(normalized_input: str) -> Dict[str, Any]:
     }
 
 
-def open_ticket_tool(normalized_input: str) -> Dict[str, Any]:
+def open_ticket_tool(normalized_input: str, entities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Simulate opening a support ticket.
     """
+    _simulate_latency("open_ticket")
     ticket_id = f"TKT{random.randint(100000, 999999)}"
 
     return {
@@ -1,9 +1,749 @@
 # services/ollama_client.py
 
-import requests
+import asyncio
 import json
-from typing import Any
-from config.settings import OLLAMA_URL, OLLAMA_MODEL
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import requests
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.settings import (
+    OLLAMA_URL,
+    OLLAMA_MODEL,
+    OLLAMA_POOL_SIZE,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_TOTAL_TIMEOUT,
+    OLLAMA_MAX_RETRIES,
+    OLLAMA_RETRY_BACKOFF,
+    OLLAMA_NUM_CTX,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_COALESCE,
+    OLLAMA_MAX_IN_FLIGHT,
+    OLLAMA_MAX_QUEUE,
+    OLLAMA_QUEUE_DEADLINE,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL,
+    LLM_CACHE_PERSIST,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_PERSIST_MAX_ROWS,
+)
+from services import metrics
+from services.llm_cache import LLMCache, MemoryCache, SQLiteCache, TieredCache, make_key
+from services.scheduler import PRIORITY_NORMAL, AdmissionRejected, AdmissionScheduler
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Prefix of the error string returned when admission control turns a call away
+OVERLOADED_ERROR = "[Ollama Error: overloaded"
+# Prefix of the error string returned when the server could not be reached at all (connection
+# refused / failed / timed out while connecting), as opposed to an HTTP error or slow reply
+UNREACHABLE_ERROR = "[Ollama Error: unreachable"
+
+
+def is_overloaded(text: str) -> bool:
+    return isinstance(text, str) and text.startswith(OVERLOADED_ERROR)
+
+
+def is_unreachable(text: str) -> bool:
+    return isinstance(text, str) and text.startswith(UNREACHABLE_ERROR)
+
+
+def _unreachable(e: Exception) -> str:
+    # Error detail that renders as UNREACHABLE_ERROR + ": ..." inside "[Ollama Error: ...]"
+    return f"unreachable: {e}"
+
+
+class _Retryable(Exception):
+    """Raised internally to retry an async request on a retryable HTTP status."""
+
+
+class _StreamError(Exception):
+    """Raised internally by the sync stream; surfaced to callers as an "[Ollama Error: ...]" string."""
+
+
+def _parse_chunk(line: bytes | str, debug: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Decode one NDJSON line from Ollama's stream. Returns None for blank / malformed lines.
+    """
+    if not line:
+        return None
+    try:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        data = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if debug:
+        print("OLLAMA RAW:", data)
+    return data
+
+
+class GenerateOptions(BaseModel):
+    """
+    Generation settings, mapped onto Ollama's /api/generate request:
+    num_predict / temperature / num_ctx / stop go under "options"; format and keep_alive
+    are top-level fields.
+
+    num_ctx defaults to one value for every call because a different context size makes
+    Ollama reload the model; keep_alive keeps it (and its prompt KV cache) resident between
+    messages.
+    """
+
+    num_predict: int = 512
+    temperature: float = 0.0
+    num_ctx: Optional[int] = OLLAMA_NUM_CTX
+    stop: Optional[List[str]] = None
+    format: Optional[str] = None  # "json" = constrained JSON output
+    keep_alive: Optional[Union[str, int]] = OLLAMA_KEEP_ALIVE
+
+    def to_payload(self, prompt: str, model: str, stream: bool = True) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"num_predict": self.num_predict, "temperature": self.temperature}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        if self.stop:
+            options["stop"] = list(self.stop)
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": stream, "options": options}
+        if self.format:
+            payload["format"] = self.format
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def cache_fields(self) -> Dict[str, Any]:
+        # keep_alive does not change the output
+        return self.model_dump(exclude={"keep_alive"}, exclude_none=True)
+
+
+def make_options(
+    max_tokens: int = 512,
+    temperature: float = 0.0,
+    num_ctx: Optional[int] = None,
+    stop: Optional[Sequence[str]] = None,
+    format: Optional[str] = None,
+    keep_alive: Optional[Union[str, int]] = None,
+    options: Optional[GenerateOptions] = None,
+) -> GenerateOptions:
+    """
+    Build GenerateOptions from the keyword arguments of generate()/stream()/agenerate();
+    an explicit `options` object wins.
+    """
+    if options is not None:
+        return options
+    fields: Dict[str, Any] = {"num_predict": max_tokens, "temperature": temperature}
+    if num_ctx is not None:
+        fields["num_ctx"] = num_ctx
+    if stop:
+        fields["stop"] = list(stop)
+    if format is not None:
+        fields["format"] = format
+    if keep_alive is not None:
+        fields["keep_alive"] = keep_alive
+    return GenerateOptions(**fields)
+
+
+class _Call:
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[str] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key: the first caller (the leader) runs the call,
+    callers arriving with the same key while it is in flight wait for it and share its
+    result. Nothing is kept once the call returns, so this is not a cache.
+
+    Threads and asyncio tasks use separate tables; async flights are per event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], "asyncio.Future[str]"] = {}
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        Run fn() once for all concurrent callers of `key`. Returns (result, shared).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.result = f"[Ollama Error: {e}]"
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    async def ado(self, key: str, factory: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """
+        Async counterpart of do(). The upstream call runs as its own task and is shielded,
+        so a cancelled caller (leader included) does not cancel it for the others.
+        """
+        flight = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(flight)
+            leader = task is None
+            if leader:
+                task = self._tasks[flight] = asyncio.ensure_future(factory())
+                task.add_done_callback(lambda _: self._discard(flight))
+        return await asyncio.shield(task), not leader
+
+    def _discard(self, flight: Tuple[int, str]) -> None:
+        with self._lock:
+            self._tasks.pop(flight, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+
+class OllamaClient:
+    """
+    Reusable Ollama client with a keep-alive connection pool.
+
+    The sync path uses a requests.Session with a pooled HTTPAdapter and urllib3 retries
+    (exponential backoff on connection errors and 429/5xx). The async path (agenerate)
+    uses an httpx.AsyncClient with the same pool size, timeouts and retry policy.
+
+    Errors are returned as "[Ollama Error: ...]" strings, like ollama_generate always did.
+
+    An optional cache (see services/llm_cache.py) short-circuits repeated generations.
+    Calls with temperature == 0 are cached by default; other calls only with cache=True.
+    Error strings are never cached.
+
+    With coalesce=True, concurrent generate()/agenerate() calls with the same (model, prompt,
+    options) share one upstream request (same eligibility as caching: temperature == 0 or
+    cache=True). This also covers the window before the first result reaches the cache, and
+    works when caching is disabled. Streams are not coalesced.
+
+    With max_in_flight > 0, upstream calls go through an AdmissionScheduler (see
+    services/scheduler.py): callers pass a priority and wait at most queue_deadline seconds
+    for a slot, otherwise they get an OVERLOADED_ERROR string right away. Cache hits and
+    coalesced calls never take a slot.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        pool_size: int = OLLAMA_POOL_SIZE,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        total_timeout: float = OLLAMA_TOTAL_TIMEOUT,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        backoff: float = OLLAMA_RETRY_BACKOFF,
+        cache: Optional[LLMCache] = None,
+        coalesce: bool = OLLAMA_COALESCE,
+        max_in_flight: int = OLLAMA_MAX_IN_FLIGHT,
+        max_queue: int = OLLAMA_MAX_QUEUE,
+        queue_deadline: Optional[float] = OLLAMA_QUEUE_DEADLINE,
+        flights: Optional[SingleFlight] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        # Clients for several endpoints may share one SingleFlight (see services/router.py)
+        self.flights: Optional[SingleFlight] = flights or (SingleFlight() if coalesce else None)
+        self.scheduler: Optional[AdmissionScheduler] = (
+            AdmissionScheduler(max_in_flight, max_queue, queue_deadline) if max_in_flight else None
+        )
+        self._session: Optional[requests.Session] = None
+        # An httpx.AsyncClient is bound to the loop it first ran on, so there is one per event loop
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    # ---------------- Sessions ----------------
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    retry = Retry(
+                        total=self.max_retries,
+                        connect=self.max_retries,
+                        read=0,
+                        status=self.max_retries,
+                        backoff_factor=self.backoff,
+                        status_forcelist=RETRY_STATUS_CODES,
+                        allowed_methods=frozenset({"GET", "POST"}),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_size,
+                        pool_maxsize=self.pool_size,
+                        max_retries=retry,
+                    )
+                    session = requests.Session()
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update({"Content-Type": "application/json"})
+                    self._session = session
+        return self._session
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            # httpx is only needed by async callers, so import it lazily
+            import httpx
+
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return client
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def aclose(self) -> None:
+        """
+        Close the running event loop's async client; those of other loops go with their loop.
+        """
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ---------------- Admission ----------------
+    def _slot(self, priority: int, queue_deadline: Optional[float]):
+        return self.scheduler.slot(priority, queue_deadline) if self.scheduler is not None else nullcontext()
+
+    @asynccontextmanager
+    async def _aslot(self, priority: int, queue_deadline: Optional[float]) -> AsyncIterator[None]:
+        if self.scheduler is None:
+            yield
+        else:
+            async with self.scheduler.aslot(priority, queue_deadline):
+                yield
+
+    @staticmethod
+    def _rejected(e: AdmissionRejected, attrs: Dict[str, Any]) -> str:
+        attrs["outcome"] = "rejected"
+        return f"{OVERLOADED_ERROR}: {e}]"
+
+    # ---------------- Requests ----------------
+    def _cache_key(self, prompt: str, model: str, opts: GenerateOptions, cache: Optional[bool]) -> Optional[str]:
+        if self.cache is None or cache is False:
+            return None
+        if cache is None and opts.temperature != 0.0:
+            return None
+        return make_key(model, prompt, opts.cache_fields())
+
+    def _flight_key(
+        self, prompt: str, model: str, opts: GenerateOptions, cache: Optional[bool], cache_key: Optional[str]
+    ) -> Optional[str]:
+        if self.flights is None or (opts.temperature != 0.0 and cache is not True):
+            return None
+        return cache_key or make_key(model, prompt, opts.cache_fields())
+
+    @staticmethod
+    def _coalesced(model: str, attrs: Dict[str, Any], mode: str) -> None:
+        attrs["outcome"] = "coalesced"
+        metrics.LLM_COALESCED.inc(model=model, mode=mode)
+
+    def _cache_store(self, key: Optional[str], text: str) -> None:
+        if key is not None and not text.startswith("[Ollama Error:"):
+            self.cache.set(key, text)
+
+    def generate(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_tokens: int = 512,
+        temperature: float = 0.0,
+        timeout: float = 60,
+        debug: bool = False,
+        cache: Optional[bool] = None,
+        num_ctx: Optional[int] = None,
+        stop: Optional[Sequence[str]] = None,
+        format: Optional[str] = None,
+        keep_alive: Optional[Union[str, int]] = None,
+        options: Optional[GenerateOptions] = None,
+        priority: int = PRIORITY_NORMAL,
+        queue_deadline: Optional[float] = None,
+    ) -> str:
+        """
+        Send prompt to Ollama and return the concatenated streamed text.
+
+        Args:
+            max_tokens: Sent as options.num_predict.
+            timeout: Per-call read timeout in seconds (time between bytes).
+            The whole call, retries included, is bounded by total_timeout.
+            cache: None = cache only deterministic calls, True = opt in, False = bypass.
+            num_ctx, stop, format, keep_alive: see GenerateOptions (None = defaults from settings).
+            options: A prebuilt GenerateOptions; overrides the individual arguments.
+            priority: Admission priority (services.scheduler.PRIORITY_*; lower is served first).
+            queue_deadline: Max seconds to wait for a slot (None = client default).
+        """
+        opts = make_options(max_tokens, temperature, num_ctx, stop, format, keep_alive, options)
+        with metrics.span("llm", "ollama_generate", metrics.LLM_DURATION, model=model) as attrs:
+            attrs["model"] = model
+            key = self._cache_key(prompt, model, opts, cache)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    attrs["outcome"] = "cache_hit"
+                    return cached
+
+            def call() -> str:
+                done: Dict[str, Any] = {}
+                try:
+                    with self._slot(priority, queue_deadline):
+                        text = self._generate(prompt, model, opts, timeout, debug, done)
+                except AdmissionRejected as e:
+                    return self._rejected(e, attrs)
+                self._finish_call(model, text, done, attrs)
+                self._cache_store(key, text)
+                return text
+
+            flight = self._flight_key(prompt, model, opts, cache, key)
+            if flight is None:
+                return call()
+            text, shared = self.flights.do(flight, call)
+            if shared:
+                self._coalesced(model, attrs, "sync")
+            return text
+
+    @staticmethod
+    def _finish_call(model: str, text: str, done: Dict[str, Any], attrs: Dict[str, Any]) -> None:
+        attrs["outcome"] = "error" if text.startswith("[Ollama Error:") else "ok"
+        if done:
+            metrics.record_llm_stats(model, done, attrs)
+
+    def stream(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_tokens: int = 512,
+        temperature: float = 0.0,
+        timeout: float = 60,
+        debug: bool = False,
+        cache: Optional[bool] = None,
+        num_ctx: Optional[int] = None,
+        stop: Optional[Sequence[str]] = None,
+        format: Optional[str] = None,
+        keep_alive: Optional[Union[str, int]] = None,
+        options: Optional[GenerateOptions] = None,
+        priority: int = PRIORITY_NORMAL,
+        queue_deadline: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Yield response tokens as Ollama streams them.
+
+        On failure an "[Ollama Error: ...]" string is yielded as the last chunk. A cache hit is
+        yielded as a single chunk; a completed stream is stored in the cache like generate().
+        """
+        opts = make_options(max_tokens, temperature, num_ctx, stop, format, keep_alive, options)
+        start = time.perf_counter()
+        attrs: Dict[str, Any] = {"model": model, "streamed": True}
+        key = self._cache_key(prompt, model, opts, cache)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                attrs["outcome"] = "cache_hit"
+                metrics.record_span("llm", "ollama_stream", start, time.perf_counter() - start, attrs, metrics.LLM_DURATION)
+                yield cached
+                return
+
+        parts: list[str] = []
+        done: Dict[str, Any] = {}
+        try:
+            with self._slot(priority, queue_deadline):
+                for token in self._stream(prompt, model, opts, timeout, debug, done):
+                    if not parts:
+                        attrs["ttft_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+                    parts.append(token)
+                    yield token
+        except AdmissionRejected as e:
+            text = self._rejected(e, attrs)
+            metrics.record_span("llm", "ollama_stream", start, time.perf_counter() - start, attrs, metrics.LLM_DURATION)
+            yield text
+            return
+        except _StreamError as e:
+            attrs["outcome"] = "error"
+            metrics.record_span("llm", "ollama_stream", start, time.perf_counter() - start, attrs, metrics.LLM_DURATION)
+            yield f"[Ollama Error: {str(e)}]"
+            return
+        text = "".join(parts).strip()
+        self._finish_call(model, text, done, attrs)
+        metrics.record_span("llm", "ollama_stream", start, time.perf_counter() - start, attrs, metrics.LLM_DURATION)
+        self._cache_store(key, text)
+
+    def _generate(
+        self, prompt: str, model: str, opts: GenerateOptions, timeout: float, debug: bool,
+        done: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        try:
+            return "".join(self._stream(prompt, model, opts, timeout, debug, done)).strip()
+        except _StreamError as e:
+            # Return an explicit error string so the app can handle it
+            return f"[Ollama Error: {str(e)}]"
+
+    def _stream(
+        self, prompt: str, model: str, opts: GenerateOptions, timeout: float, debug: bool,
+        done: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """
+        Yield tokens; the final "done" chunk (token counts, durations) is copied into `done`.
+        """
+        deadline = time.monotonic() + self.total_timeout
+        payload = opts.to_payload(prompt, model)
+
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=(self.connect_timeout, timeout),
+            )
+            resp.raise_for_status()
+        except requests.exceptions.ConnectionError as e:
+            # Also covers ConnectTimeout; a ReadTimeout or HTTP status error is not a connection problem
+            raise _StreamError(_unreachable(e)) from e
+        except requests.exceptions.RequestException as e:
+            raise _StreamError(str(e)) from e
+
+        with resp:
+            try:
+                for line in resp.iter_lines():
+                    if time.monotonic() > deadline:
+                        raise _StreamError(f"total timeout of {self.total_timeout}s exceeded")
+                    data = _parse_chunk(line, debug)
+                    if data is None:
+                        continue
+                    # Ollama streams objects like {"response": "...", "done": false}
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done", False):
+                        if done is not None:
+                            done.update(data)
+                        break
+            except requests.exceptions.RequestException as e:
+                raise _StreamError(str(e)) from e
+
+    async def agenerate(
+        self,
+        prompt: str,
+        model: str = OLLAMA_MODEL,
+        max_tokens: int = 512,
+        temperature: float = 0.0,
+        timeout: float = 60,
+        debug: bool = False,
+        cache: Optional[bool] = None,
+        num_ctx: Optional[int] = None,
+        stop: Optional[Sequence[str]] = None,
+        format: Optional[str] = None,
+        keep_alive: Optional[Union[str, int]] = None,
+        options: Optional[GenerateOptions] = None,
+        priority: int = PRIORITY_NORMAL,
+        queue_deadline: Optional[float] = None,
+    ) -> str:
+        """
+        Asyncio-native equivalent of generate(), sharing one pooled client per event loop.
+        """
+        opts = make_options(max_tokens, temperature, num_ctx, stop, format, keep_alive, options)
+        with metrics.span("llm", "ollama_agenerate", metrics.LLM_DURATION, model=model) as attrs:
+            attrs["model"] = model
+            key = self._cache_key(prompt, model, opts, cache)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    attrs["outcome"] = "cache_hit"
+                    return cached
+
+            async def call() -> str:
+                done: Dict[str, Any] = {}
+                try:
+                    async with self._aslot(priority, queue_deadline):
+                        text = await asyncio.wait_for(
+                            self._agenerate(prompt, model, opts, timeout, debug, done),
+                            timeout=self.total_timeout,
+                        )
+                except AdmissionRejected as e:
+                    return self._rejected(e, attrs)
+                except asyncio.TimeoutError:
+                    text = f"[Ollama Error: total timeout of {self.total_timeout}s exceeded]"
+                self._finish_call(model, text, done, attrs)
+                self._cache_store(key, text)
+                return text
+
+            flight = self._flight_key(prompt, model, opts, cache, key)
+            if flight is None:
+                return await call()
+            text, shared = await self.flights.ado(flight, call)
+            if shared:
+                self._coalesced(model, attrs, "async")
+            return text
+
+    def ping(self) -> bool:
+        """
+        Health probe: True if the server answers /api/tags.
+        """
+        try:
+            resp = self.session.get(f"{self.base_url}/api/tags", timeout=(self.connect_timeout, self.connect_timeout))
+            return resp.ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def warm_up(self, model: str = OLLAMA_MODEL, keep_alive: Optional[Union[str, int]] = None) -> Dict[str, Any]:
+        """
+        Load `model` into memory ahead of the first message (an empty prompt makes Ollama
+        load the model and return), using the default num_ctx so later calls do not reload it.
+        """
+        opts = make_options(keep_alive=keep_alive)
+        payload = opts.to_payload("", model, stream=False)
+        payload["options"] = {"num_ctx": opts.num_ctx} if opts.num_ctx else {}
+        start = time.perf_counter()
+        with metrics.span("llm", "ollama_warm_up", model=model) as attrs:
+            try:
+                resp = self.session.post(
+                    f"{self.base_url}/api/generate", json=payload, timeout=(self.connect_timeout, self.total_timeout)
+                )
+                resp.raise_for_status()
+                attrs["outcome"] = "ok"
+                result = {"model": model, "ok": True}
+            except requests.exceptions.RequestException as e:
+                attrs["outcome"] = "error"
+                result = {"model": model, "ok": False, "error": str(e)}
+        result["ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        return result
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def _agenerate(
+        self, prompt: str, model: str, opts: GenerateOptions, timeout: float, debug: bool,
+        done: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        import httpx
+
+        client = self._get_async_client()
+        payload = opts.to_payload(prompt, model)
+        call_timeout = httpx.Timeout(timeout, connect=self.connect_timeout)
+
+        attempt = 0
+        while True:
+            try:
+                output_chunks: list[str] = []
+                async with client.stream("POST", "/api/generate", json=payload, timeout=call_timeout) as resp:
+                    if resp.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        raise _Retryable(f"HTTP {resp.status_code}")
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        data = _parse_chunk(line, debug)
+                        if data is None:
+                            continue
+                        if "response" in data:
+                            output_chunks.append(data["response"])
+                        if data.get("done", False):
+                            if done is not None:
+                                done.update(data)
+                            break
+                return "".join(output_chunks).strip()
+            except (_Retryable, httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.max_retries:
+                    if isinstance(e, _Retryable):
+                        return f"[Ollama Error: {str(e)}]"
+                    return f"[Ollama Error: {_unreachable(e)}]"
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+                attempt += 1
+            except httpx.HTTPError as e:
+                return f"[Ollama Error: {str(e)}]"
+
+
+_default_client: Optional[OllamaClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """
+    Return the process-wide pooled client, creating it on first use.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = OllamaClient(cache=build_default_cache())
+    return _default_client
+
+
+def set_client(client: OllamaClient) -> None:
+    """
+    Replace the process-wide client (e.g. to point at another server or change pool settings).
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+
+def build_default_cache() -> Optional[LLMCache]:
+    """
+    Build the cache configured in settings (None when caching is disabled).
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+    persistent = (
+        SQLiteCache(LLM_CACHE_DB_PATH, ttl=LLM_CACHE_TTL, max_rows=LLM_CACHE_PERSIST_MAX_ROWS)
+        if LLM_CACHE_PERSIST else None
+    )
+    return TieredCache(MemoryCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL), persistent)
+
+
+def warm_up_models(models: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Preload each model (default: OLLAMA_MODEL) so the first user message does not pay the
+    model load time. Failures are reported, not raised.
+    """
+    client = get_client()
+    return [client.warm_up(model) for model in dict.fromkeys(models or [OLLAMA_MODEL])]
+
+
+def get_scheduler() -> Optional[AdmissionScheduler]:
+    """
+    Admission scheduler of the process-wide client (None when the limiter is disabled).
+    """
+    return get_client().scheduler
+
+
+def _queue_gauge() -> Dict[str, float]:
+    scheduler = _default_client.scheduler if _default_client is not None else None
+    return scheduler.stats() if scheduler is not None else {}
+
+
+def _cache_gauge() -> Dict[str, float]:
+    stats = _default_client.cache_stats() if _default_client is not None else {}
+    return {k: stats[k] for k in ("hits", "misses", "hit_rate") if k in stats}
+
+
+metrics.REGISTRY.gauge_callback("agent_llm_cache", "LLM result cache counters", _cache_gauge)
+metrics.REGISTRY.gauge_callback("agent_llm_queue", "Ollama admission queue depth and in-flight calls", _queue_gauge)
 
 
 def ollama_generate(
@@ -13,10 +753,19 @@ def ollama_generate(
     temperature: float = 0.0,
     timeout: int = 60,
     debug: bool = False,
+    cache: Optional[bool] = None,
+    num_ctx: Optional[int] = None,
+    stop: Optional[Sequence[str]] = None,
+    format: Optional[str] = None,
+    keep_alive: Optional[Union[str, int]] = None,
+    options: Optional[GenerateOptions] = None,
+    priority: int = PRIORITY_NORMAL,
+    queue_deadline: Optional[float] = None,
 ) -> str:
     """
     Send prompt to Ollama and return generated text.
     Handles streaming JSON objects from Ollama's /api/generate endpoint.
+    Thin wrapper around the shared pooled OllamaClient.
 
     Args:
         prompt: The input prompt to send.
@@ -25,45 +774,70 @@ def ollama_generate(
         temperature: Sampling temperature.
         timeout: Request timeout in seconds.
         debug: If True, prints raw chunks for debugging.
+        cache: None caches only temperature 0 calls; True opts in; False bypasses the cache.
+        num_ctx, stop, format, keep_alive: Ollama options, see GenerateOptions
+            (format="json" constrains the reply to valid JSON).
+        options: A prebuilt GenerateOptions; overrides the individual arguments.
+        priority, queue_deadline: Admission control, see OllamaClient.
 
     Returns:
         The concatenated response text from Ollama.
     """
-    url = f"{OLLAMA_URL}/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "stream": True,
-    }
-    headers = {"Content-Type": "application/json"}
+    return get_client().generate(
+        prompt, model=model, max_tokens=max_tokens, temperature=temperature, timeout=timeout, debug=debug,
+        cache=cache, num_ctx=num_ctx, stop=stop, format=format, keep_alive=keep_alive, options=options,
+        priority=priority, queue_deadline=queue_deadline,
+    )
 
-    try:
-        resp = requests.post(
-            url, json=payload, headers=headers, stream=True, timeout=timeout
-        )
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        # Return an explicit error string so the app can handle it
-        return f"[Ollama Error: {str(e)}]"
 
-    output_chunks: list[str] = []
+def ollama_stream(
+    prompt: str,
+    model: str = OLLAMA_MODEL,
+    max_tokens: int = 512,
+    temperature: float = 0.0,
+    timeout: int = 60,
+    debug: bool = False,
+    cache: Optional[bool] = None,
+    num_ctx: Optional[int] = None,
+    stop: Optional[Sequence[str]] = None,
+    format: Optional[str] = None,
+    keep_alive: Optional[Union[str, int]] = None,
+    options: Optional[GenerateOptions] = None,
+    priority: int = PRIORITY_NORMAL,
+    queue_deadline: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    Generator counterpart of ollama_generate: yields tokens as they arrive so callers can
+    render them incrementally. Errors arrive as a final "[Ollama Error: ...]" chunk.
+    """
+    yield from get_client().stream(
+        prompt, model=model, max_tokens=max_tokens, temperature=temperature, timeout=timeout, debug=debug,
+        cache=cache, num_ctx=num_ctx, stop=stop, format=format, keep_alive=keep_alive, options=options,
+        priority=priority, queue_deadline=queue_deadline,
+    )
+
 
-    for line in resp.iter_lines():
-        if not line:
-            continue
-        try:
-            data = json.loads(line.decode("utf-8"))
-            if debug:
-                print("OLLAMA RAW:", data)
-
-            # Ollama streams objects like {"response": "...", "done": false}
-            if "response" in data:
-                output_chunks.append(data["response"])
-            if data.get("done", False):
-                break
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            continue
-
-    return "".join(output_chunks).strip()
+async def ollama_agenerate(
+    prompt: str,
+    model: str = OLLAMA_MODEL,
+    max_tokens: int = 512,
+    temperature: float = 0.0,
+    timeout: int = 60,
+    debug: bool = False,
+    cache: Optional[bool] = None,
+    num_ctx: Optional[int] = None,
+    stop: Optional[Sequence[str]] = None,
+    format: Optional[str] = None,
+    keep_alive: Optional[Union[str, int]] = None,
+    options: Optional[GenerateOptions] = None,
+    priority: int = PRIORITY_NORMAL,
+    queue_deadline: Optional[float] = None,
+) -> str:
+    """
+    Async counterpart of ollama_generate using the shared client's async pool.
+    """
+    return await get_client().agenerate(
+        prompt, model=model, max_tokens=max_tokens, temperature=temperature, timeout=timeout, debug=debug,
+        cache=cache, num_ctx=num_ctx, stop=stop, format=format, keep_alive=keep_alive, options=options,
+        priority=priority, queue_deadline=queue_deadline,
+    )
@@ -0,0 +1,187 @@
+# services/rollups.py
+"""
+Read side of the hourly rollup tables (rollup_hourly, rollup_hourly_intent).
+
+The rollups are maintained by triggers as save_log / save_feedback write (see
+db_logger.MIGRATIONS[3]), so these queries touch one row per hour bucket instead of
+one row per interaction. Rebuild them from the logs table with:
+
+    python -m services.rollups backfill
+"""
+import argparse
+import datetime
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from services import db_logger
+
+TimeBound = Optional[Union[str, datetime.date, datetime.datetime]]
+
+PERIOD_FORMATS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d", "week": "%Y-W%W"}
+
+
+def _ts(value: TimeBound) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.isoformat()
+
+
+def _where(since: TimeBound, until: TimeBound, intent: Optional[str] = None) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    if intent:
+        clauses.append("intent = ?")
+        params.append(intent)
+    if since is not None:
+        clauses.append("hour >= ?")
+        params.append(_ts(since))
+    if until is not None:
+        clauses.append("hour < ?")
+        params.append(_ts(until))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _ratio(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def backfill() -> Dict[str, Any]:
+    """
+    Recompute both rollup tables from logs in one transaction.
+    """
+    db_logger.init_db()
+    conn = db_logger.get_connection()
+    start = time.perf_counter()
+    with conn:
+        for statement in db_logger.ROLLUP_BACKFILL:
+            conn.execute(statement)
+    return {
+        "rollup_hourly": conn.execute("SELECT COUNT(*) FROM rollup_hourly").fetchone()[0],
+        "rollup_hourly_intent": conn.execute("SELECT COUNT(*) FROM rollup_hourly_intent").fetchone()[0],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def totals(since: TimeBound = None, until: TimeBound = None) -> Dict[str, Any]:
+    """
+    Interaction count, escalation rate and 👍/👎 ratio for the window.
+    """
+    where, params = _where(since, until)
+    interactions, escalated, up, down = db_logger.get_connection().execute(
+        f"""
+        SELECT COALESCE(SUM(interactions), 0), COALESCE(SUM(interactions * escalation), 0),
+               COALESCE(SUM(feedback_up), 0), COALESCE(SUM(feedback_down), 0)
+        FROM rollup_hourly{where}
+        """,
+        params,
+    ).fetchone()
+    return {
+        "interactions": interactions,
+        "escalated": escalated,
+        "escalation_rate": _ratio(escalated, interactions),
+        "feedback_up": up,
+        "feedback_down": down,
+        "up_ratio": _ratio(up, up + down),
+    }
+
+
+def volume_over_time(period: str = "hour", since: TimeBound = None, until: TimeBound = None) -> List[Dict[str, Any]]:
+    """
+    Interactions, escalations and feedback per period ("hour", "day" or "week").
+    """
+    fmt = PERIOD_FORMATS[period]
+    where, params = _where(since, until)
+    rows = db_logger.get_connection().execute(
+        f"""
+        SELECT strftime('{fmt}', hour) AS period, SUM(interactions), SUM(interactions * escalation),
+               SUM(feedback_up), SUM(feedback_down)
+        FROM rollup_hourly{where} GROUP BY period ORDER BY period
+        """,
+        params,
+    ).fetchall()
+    return [
+        {
+            "period": p,
+            "interactions": n,
+            "escalated": esc,
+            "escalation_rate": _ratio(esc, n),
+            "feedback_up": up,
+            "feedback_down": down,
+        }
+        for p, n, esc, up, down in rows
+    ]
+
+
+def intents_over_time(period: str = "day", since: TimeBound = None, until: TimeBound = None) -> List[Dict[str, Any]]:
+    """
+    Interactions per (period, intent); an interaction counts once for each detected intent.
+    """
+    fmt = PERIOD_FORMATS[period]
+    where, params = _where(since, until)
+    rows = db_logger.get_connection().execute(
+        f"""
+        SELECT strftime('{fmt}', hour) AS period, intent, SUM(interactions)
+        FROM rollup_hourly_intent{where} GROUP BY period, intent ORDER BY period
+        """,
+        params,
+    ).fetchall()
+    return [{"period": p, "intent": intent, "interactions": n} for p, intent, n in rows]
+
+
+def intent_summary(since: TimeBound = None, until: TimeBound = None) -> List[Dict[str, Any]]:
+    """
+    Per-intent volume, escalation rate and feedback, busiest first.
+    """
+    where, params = _where(since, until)
+    rows = db_logger.get_connection().execute(
+        f"""
+        SELECT intent, SUM(interactions) AS n, SUM(interactions * escalation),
+               SUM(feedback_up), SUM(feedback_down)
+        FROM rollup_hourly_intent{where} GROUP BY intent ORDER BY n DESC
+        """,
+        params,
+    ).fetchall()
+    return [
+        {
+            "intent": intent,
+            "interactions": n,
+            "escalated": esc,
+            "escalation_rate": _ratio(esc, n),
+            "feedback_up": up,
+            "feedback_down": down,
+            "up_ratio": _ratio(up, up + down),
+        }
+        for intent, n, esc, up, down in rows
+    ]
+
+
+def sentiment_mix(intent: Optional[str] = None, since: TimeBound = None, until: TimeBound = None) -> Dict[str, int]:
+    where, params = _where(since, until, intent)
+    table = "rollup_hourly_intent" if intent else "rollup_hourly"
+    rows = db_logger.get_connection().execute(
+        f"SELECT sentiment, SUM(interactions) FROM {table}{where} GROUP BY sentiment ORDER BY 2 DESC",
+        params,
+    ).fetchall()
+    return dict(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hourly analytics rollups")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("backfill", help="rebuild the rollup tables from the logs table")
+    p_show = sub.add_parser("show", help="print totals and per-intent summary")
+    p_show.add_argument("--since", help="only hours >= this value (UTC, e.g. 2025-09-01)")
+    args = parser.parse_args()
+
+    if args.cmd == "backfill":
+        print(json.dumps(backfill(), indent=2))
+    else:
+        db_logger.init_db()
+        report = {"totals": totals(since=args.since), "intents": intent_summary(since=args.since)}
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
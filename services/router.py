@@ -0,0 +1,298 @@
+# services/router.py
+"""
+Per-task model and endpoint routing for LLM calls.
+
+Each task (classify, sentiment, analysis, response) maps to a model and a named pool of
+Ollama endpoints (settings.MODEL_ROUTES / settings.OLLAMA_POOLS), so cheap structured
+calls can run a small model on cheap hardware while reply generation uses a bigger one.
+
+Within a pool, calls go to the healthy endpoint with the fewest calls in flight (round
+robin between ties). An endpoint that cannot be reached (connection refused / failed) is
+taken out of rotation for OLLAMA_HEALTH_INTERVAL seconds, then tried again; start_health_checks() also
+probes every endpoint in the background so recovered servers return without traffic.
+
+The endpoint at OLLAMA_URL is served by the process-wide client (ollama_client.get_client /
+set_client); other endpoints get their own client sharing its cache and in-flight
+coalescing.
+"""
+import itertools
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from services import metrics, ollama_client
+from services.ollama_client import OllamaClient, is_unreachable
+from services.scheduler import PRIORITY_NORMAL
+
+_health_thread: Optional[threading.Thread] = None
+
+
+class Endpoint:
+    """
+    One Ollama server in a pool, with passive (call outcome) and active (probe) health.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.in_flight = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self._client: Optional[OllamaClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> OllamaClient:
+        default = ollama_client.get_client()
+        if self.url == settings.OLLAMA_URL.rstrip("/"):
+            return default
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = OllamaClient(base_url=self.url, cache=default.cache, flights=default.flights)
+        return self._client
+
+    def available(self, now: float) -> bool:
+        return self.healthy or now >= self.retry_at
+
+    def load(self) -> int:
+        scheduler = self.client.scheduler
+        queued = scheduler.stats()["queue_depth"] if scheduler is not None else 0
+        return self.in_flight + queued
+
+    def record(self, text: str) -> bool:
+        """
+        Update health from a call result; returns False if the endpoint could not be reached.
+        Overload, HTTP errors (e.g. an unknown model) and slow replies are not health problems:
+        they say nothing about the endpoint, and another one would not do better.
+        """
+        failed = is_unreachable(text)
+        with self._lock:
+            if failed:
+                self.healthy = False
+                self.retry_at = time.monotonic() + settings.OLLAMA_HEALTH_INTERVAL
+            else:
+                self.healthy = True
+        return not failed
+
+    def probe(self) -> bool:
+        ok = self.client.ping()
+        with self._lock:
+            self.healthy = ok
+            if not ok:
+                self.retry_at = time.monotonic() + settings.OLLAMA_HEALTH_INTERVAL
+        return ok
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"url": self.url, "healthy": self.healthy, "in_flight": self.in_flight}
+
+
+class EndpointPool:
+    """
+    Least-in-flight load balancing over the available endpoints of a pool.
+    """
+
+    def __init__(self, name: str, urls: List[str]):
+        if not urls:
+            raise ValueError(f"Endpoint pool {name!r} has no endpoints")
+        self.name = name
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+
+    def pick(self, exclude: Tuple[Endpoint, ...] = ()) -> Optional[Endpoint]:
+        now = time.monotonic()
+        endpoints = [e for e in self.endpoints if e not in exclude]
+        if not endpoints:
+            return None
+        # With every endpoint down, keep trying them rather than failing outright
+        candidates = [e for e in endpoints if e.available(now)] or endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        with self._lock:
+            start = next(self._rr) % len(candidates)
+        rotated = candidates[start:] + candidates[:start]
+        return min(rotated, key=Endpoint.load)
+
+    def acquire(self, exclude: Tuple[Endpoint, ...] = ()) -> Optional[Endpoint]:
+        endpoint = self.pick(exclude)
+        if endpoint is not None:
+            with self._lock:
+                endpoint.in_flight += 1
+        return endpoint
+
+    def release(self, endpoint: Endpoint, text: str) -> bool:
+        with self._lock:
+            endpoint.in_flight -= 1
+        return endpoint.record(text)
+
+
+class ModelRouter:
+    """
+    Resolves a task (plus an optional explicit model) to a model and an endpoint, and
+    runs generate / stream / agenerate there. A call that cannot reach its endpoint is
+    retried once on another endpoint of the pool.
+    """
+
+    ATTEMPTS = 2
+
+    def __init__(self, routes: Dict[str, Dict[str, str]], pools: Dict[str, List[str]]):
+        self.pools = {name: EndpointPool(name, urls) for name, urls in pools.items()}
+        self.routes: Dict[str, Tuple[str, str]] = {}
+        for task, route in routes.items():
+            pool = route.get("pool", "default")
+            if pool not in self.pools:
+                raise ValueError(f"Route {task!r} uses unknown pool {pool!r}")
+            self.routes[task] = (route.get("model") or settings.OLLAMA_MODEL, pool)
+
+    def resolve(self, task: str, model: Optional[str] = None) -> Tuple[str, EndpointPool]:
+        """
+        Model and pool for `task`; an explicit `model` overrides the routed one.
+        """
+        routed_model, pool = self.routes.get(task, (settings.OLLAMA_MODEL, "default"))
+        return model or routed_model, self.pools[pool]
+
+    def saturated(self, task: str, priority: int = PRIORITY_NORMAL) -> bool:
+        """
+        True when even the least loaded endpoint for `task` would queue past its deadline.
+        """
+        scheduler = self.resolve(task)[1].pick().client.scheduler  # pools are never empty
+        return scheduler is not None and scheduler.saturated(priority)
+
+    def generate(self, task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> str:
+        model, pool = self.resolve(task, model)
+        tried: Tuple[Endpoint, ...] = ()
+        text = "[Ollama Error: no endpoint available]"
+        while len(tried) < self.ATTEMPTS and (endpoint := pool.acquire(tried)) is not None:
+            tried += (endpoint,)
+            text = "[Ollama Error: no result]"
+            try:
+                text = endpoint.client.generate(prompt, model=model, **kwargs)
+            finally:
+                ok = pool.release(endpoint, text)
+            if ok:
+                break
+        return text
+
+    def stream(self, task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> Iterator[str]:
+        model, pool = self.resolve(task, model)
+        tried: Tuple[Endpoint, ...] = ()
+        while len(tried) < self.ATTEMPTS and (endpoint := pool.acquire(tried)) is not None:
+            tried += (endpoint,)
+            last = ""
+            started = False
+            try:
+                for token in endpoint.client.stream(prompt, model=model, **kwargs):
+                    last = token
+                    # An error before any output may still be retried elsewhere
+                    if not started and is_unreachable(token) and len(tried) < self.ATTEMPTS:
+                        break
+                    started = True
+                    yield token
+            finally:
+                ok = pool.release(endpoint, last)
+            if ok or started:
+                return
+        if tried:
+            yield last
+        else:
+            yield "[Ollama Error: no endpoint available]"
+
+    async def agenerate(self, task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> str:
+        model, pool = self.resolve(task, model)
+        tried: Tuple[Endpoint, ...] = ()
+        text = "[Ollama Error: no endpoint available]"
+        while len(tried) < self.ATTEMPTS and (endpoint := pool.acquire(tried)) is not None:
+            tried += (endpoint,)
+            text = "[Ollama Error: no result]"
+            try:
+                text = await endpoint.client.agenerate(prompt, model=model, **kwargs)
+            finally:
+                ok = pool.release(endpoint, text)
+            if ok:
+                break
+        return text
+
+    # ---------------- Health / warm-up ----------------
+    def check_health(self) -> Dict[str, List[Dict[str, Any]]]:
+        report: Dict[str, List[Dict[str, Any]]] = {}
+        for name, pool in self.pools.items():
+            for endpoint in pool.endpoints:
+                endpoint.probe()
+            report[name] = [e.to_dict() for e in pool.endpoints]
+        return report
+
+    def warm_up(self) -> List[Dict[str, Any]]:
+        """
+        Load every routed model on every endpoint of its pool.
+        """
+        pairs = dict.fromkeys((model, pool) for model, pool in self.routes.values())
+        results = []
+        for model, pool in pairs:
+            for endpoint in self.pools[pool].endpoints:
+                results.append({"endpoint": endpoint.url, **endpoint.client.warm_up(model)})
+        return results
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """
+    Process-wide router built from settings.MODEL_ROUTES and settings.OLLAMA_POOLS.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(settings.MODEL_ROUTES, settings.OLLAMA_POOLS)
+    return _router
+
+
+def set_router(router: ModelRouter) -> None:
+    global _router
+    with _router_lock:
+        _router = router
+
+
+def start_health_checks(interval: float = settings.OLLAMA_HEALTH_INTERVAL) -> threading.Thread:
+    """
+    Probe every endpoint every `interval` seconds on a daemon thread (started once).
+    """
+    global _health_thread
+
+    def loop() -> None:
+        while True:
+            time.sleep(interval)
+            get_router().check_health()
+
+    with _router_lock:
+        if _health_thread is None:
+            _health_thread = threading.Thread(target=loop, name="ollama-health", daemon=True)
+            _health_thread.start()
+    return _health_thread
+
+
+def generate(task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> str:
+    """
+    ollama_generate routed by task; keyword arguments are passed to OllamaClient.generate.
+    """
+    return get_router().generate(task, prompt, model, **kwargs)
+
+
+def stream(task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> Iterator[str]:
+    yield from get_router().stream(task, prompt, model, **kwargs)
+
+
+async def agenerate(task: str, prompt: str, model: Optional[str] = None, **kwargs: Any) -> str:
+    return await get_router().agenerate(task, prompt, model, **kwargs)
+
+
+def _health_gauge() -> Dict[str, float]:
+    if _router is None:
+        return {}
+    return {e.url: float(e.healthy) for pool in _router.pools.values() for e in pool.endpoints}
+
+
+metrics.REGISTRY.gauge_callback("agent_llm_endpoint_healthy", "Ollama endpoint health (1 = in rotation)", _health_gauge)
@@ -0,0 +1,235 @@
+# services/scheduler.py
+"""
+Admission control in front of the single Ollama instance.
+
+At most `max_in_flight` generations run at once; further callers wait in a priority queue
+(lower number = served first, FIFO within a priority). A caller waits at most its queue
+deadline, and is turned away immediately when the estimated wait (queue ahead of it ×
+average slot time / slots) already exceeds that deadline, so the workflow can take a fast
+degraded path instead of piling onto an overloaded server.
+
+Works for threads (acquire / slot) and asyncio tasks (aacquire / aslot) on the same queue.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from services import metrics
+
+PRIORITY_HIGH = 0    # short structured calls (classification, sentiment) and urgent replies
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # long reply generations
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+EWMA_ALPHA = 0.2
+
+QUEUE_WAIT = metrics.REGISTRY.histogram(
+    "agent_llm_queue_wait_seconds", "Time LLM calls waited for an Ollama slot", ("priority",)
+)
+REJECTED = metrics.REGISTRY.counter(
+    "agent_llm_rejected_total", "LLM calls turned away by admission control", ("priority", "reason")
+)
+DEGRADED = metrics.REGISTRY.counter(
+    "agent_degraded_total", "Workflow steps that took the degraded path under load", ("node",)
+)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a call cannot get a slot within its queue deadline.
+    """
+
+    def __init__(self, reason: str, waited: float = 0.0):
+        super().__init__(f"{reason} after {waited:.2f}s in queue" if waited else reason)
+        self.reason = reason
+        self.waited = waited
+
+
+def _priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, priority: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionScheduler:
+    """
+    Priority queue + in-flight limit. Slots are handed directly to the next waiter on
+    release, so a newly arriving call never overtakes one that is already queued.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int = 64, deadline: Optional[float] = None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._waiting = 0
+        self._in_flight = 0
+        self._service_s: Optional[float] = None  # EWMA of how long a slot is held
+
+    # ---------------- Introspection ----------------
+    def estimated_wait(self, priority: int = PRIORITY_NORMAL) -> float:
+        """
+        Expected queue time for a call of `priority` arriving now (0.0 when a slot is free
+        or no slot time has been observed yet).
+        """
+        with self._lock:
+            return self._estimate(priority)
+
+    def _estimate(self, priority: int) -> float:
+        if self._in_flight < self.max_in_flight and not self._waiting:
+            return 0.0
+        if self._service_s is None:
+            return 0.0
+        ahead = sum(1 for p, _, w in self._queue if p <= priority and not w.cancelled)
+        return (ahead + 1) * self._service_s / self.max_in_flight
+
+    def saturated(self, priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> bool:
+        """
+        True when a call of `priority` would likely not be admitted within its deadline.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        return deadline is not None and self.estimated_wait(priority) > deadline
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "max_in_flight": self.max_in_flight,
+                "avg_slot_s": round(self._service_s or 0.0, 4),
+            }
+
+    # ---------------- Admission ----------------
+    def _enter(self, priority: int, deadline: Optional[float], loop=None) -> Optional[_Waiter]:
+        """
+        Take a free slot (returns None) or enqueue a waiter; raises when turned away up front.
+        """
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiting:
+                self._in_flight += 1
+                return None
+            if self._waiting >= self.max_queue:
+                reason = "queue_full"
+            elif deadline is not None and self._estimate(priority) > deadline:
+                reason = "estimated_wait"
+            else:
+                waiter = _Waiter(priority, loop)
+                heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+                self._waiting += 1
+                return waiter
+        self._reject(priority, reason)
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Leave the queue after a timeout / cancellation. Returns True if the slot was granted
+        in the meantime (the caller then owns it).
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            self._waiting -= 1
+            return False
+
+    def _reject(self, priority: int, reason: str, waited: float = 0.0) -> None:
+        REJECTED.inc(priority=_priority_name(priority), reason=reason)
+        raise AdmissionRejected(reason, waited)
+
+    def _admitted(self, priority: int, started: float) -> float:
+        waited = time.perf_counter() - started
+        QUEUE_WAIT.observe(waited, priority=_priority_name(priority))
+        return waited
+
+    def acquire(self, priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> float:
+        """
+        Block until a slot is free; returns the seconds waited. Raises AdmissionRejected.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        started = time.perf_counter()
+        waiter = self._enter(priority, deadline)
+        if waiter is not None and not waiter.event.wait(deadline):
+            if not self._abandon(waiter):
+                self._reject(priority, "deadline", time.perf_counter() - started)
+        return self._admitted(priority, started)
+
+    async def aacquire(self, priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> float:
+        """
+        Async counterpart of acquire(); waiting does not block the event loop.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        started = time.perf_counter()
+        waiter = self._enter(priority, deadline, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), deadline)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    self._reject(priority, "deadline", time.perf_counter() - started)
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    self.release(None)
+                raise
+        return self._admitted(priority, started)
+
+    def release(self, held: Optional[float]) -> None:
+        """
+        Return a slot; `held` (seconds) feeds the slot-time estimate. The slot goes straight
+        to the highest-priority waiter, if any.
+        """
+        with self._lock:
+            if held is not None:
+                self._service_s = held if self._service_s is None else (
+                    EWMA_ALPHA * held + (1 - EWMA_ALPHA) * self._service_s
+                )
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._waiting -= 1
+                waiter.wake()
+                return
+            self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> Iterator[float]:
+        self.acquire(priority, deadline)
+        start = time.perf_counter()
+        try:
+            yield start
+        finally:
+            self.release(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def aslot(self, priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> AsyncIterator[float]:
+        await self.aacquire(priority, deadline)
+        start = time.perf_counter()
+        try:
+            yield start
+        finally:
+            self.release(time.perf_counter() - start)
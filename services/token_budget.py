@@ -0,0 +1,177 @@
+# services/token_budget.py
+"""
+Prompt-size budgeting for LLM calls.
+
+Every variable part of a prompt (user text, intent list, tool results, conversation
+context) has a token budget in settings.PROMPT_BUDGETS[prompt][field]. Oversized values
+are trimmed deterministically, so identical inputs still produce identical prompts (and
+LLM cache keys):
+
+- text: keep the head and the tail (complaints tend to end with the actual ask) around a
+  "[…]" marker, cut on whitespace
+- JSON payloads: drop empty fields and clip long strings first, then drop trailing items
+  and note how many were omitted
+- lists: keep items in order until the budget is reached
+
+Token counts come from a cheap local estimate (no tokenizer dependency): the larger of the
+number of word/punctuation pieces and chars / TOKEN_ESTIMATE_CHARS_PER_TOKEN. Estimated
+tokens in and trimmed are exported as Prometheus counters per prompt and field.
+"""
+import json
+import re
+import time
+from typing import Any, List, Optional
+from config import settings
+from services import metrics
+
+TRIM_MARKER = " […] "
+JSON_STRING_MAX_CHARS = 160
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+PROMPT_FIELD_TOKENS = metrics.REGISTRY.counter(
+    "agent_prompt_field_tokens_total", "Estimated tokens of prompt fields before budgeting", ("prompt", "field")
+)
+PROMPT_TRIMMED_TOKENS = metrics.REGISTRY.counter(
+    "agent_prompt_trimmed_tokens_total", "Estimated tokens removed by prompt budgeting", ("prompt", "field")
+)
+PROMPT_TRIMS = metrics.REGISTRY.counter(
+    "agent_prompt_trims_total", "Prompt fields that exceeded their budget", ("prompt", "field")
+)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    by_chars = -(-len(text) // settings.TOKEN_ESTIMATE_CHARS_PER_TOKEN)
+    if by_chars > 4096:
+        return by_chars  # far past any budget; skip the regex pass on huge pastes
+    return max(len(_PIECES.findall(text)), by_chars)
+
+
+def budget(prompt: str, field: str) -> Optional[int]:
+    return (settings.PROMPT_BUDGETS.get(prompt) or {}).get(field) or None
+
+
+def _record(prompt: str, field: str, before: int, after: int) -> None:
+    PROMPT_FIELD_TOKENS.inc(before, prompt=prompt, field=field)
+    if after < before:
+        PROMPT_TRIMS.inc(prompt=prompt, field=field)
+        PROMPT_TRIMMED_TOKENS.inc(before - after, prompt=prompt, field=field)
+        # Shows up in the request trace next to the LLM call it shrank
+        metrics.record_span(
+            "budget", f"{prompt}.{field}", time.perf_counter(), 0.0, {"tokens_in": before, "tokens_out": after}
+        )
+
+
+# ---------------- Trimming primitives ----------------
+def truncate_text(text: str, max_tokens: int, head_ratio: float = 2 / 3) -> str:
+    """
+    Shorten text to about max_tokens, keeping head and tail around TRIM_MARKER.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    chars = max_tokens * settings.TOKEN_ESTIMATE_CHARS_PER_TOKEN - len(TRIM_MARKER)
+    for _ in range(4):
+        head_len = int(chars * head_ratio)
+        tail_len = max(0, chars - head_len)
+        head = text[:head_len]
+        cut = head.rfind(" ")
+        if cut > head_len * 0.8:
+            head = head[:cut]
+        tail = text[len(text) - tail_len:] if tail_len else ""
+        cut = tail.find(" ")
+        if 0 <= cut < tail_len * 0.2:
+            tail = tail[cut + 1:]
+        out = head.rstrip() + TRIM_MARKER + tail.lstrip()
+        if estimate_tokens(out) <= max_tokens:
+            return out
+        # Punctuation-heavy text: fewer chars per token than assumed, shrink and retry
+        chars = int(chars * max_tokens / estimate_tokens(out) * 0.95)
+    return out
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    if isinstance(value, str) and len(value) > JSON_STRING_MAX_CHARS:
+        return value[: JSON_STRING_MAX_CHARS - 1] + "…"
+    return value
+
+
+def _dumps(value: Any, compact: bool = False) -> str:
+    try:
+        if compact:
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        return json.dumps(value, ensure_ascii=False, default=str)
+    except Exception:
+        return str(value)
+
+
+def truncate_json(value: Any, max_tokens: int) -> str:
+    """
+    Serialize value within about max_tokens: compact it, then drop trailing list items.
+    """
+    text = _dumps(value)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    value = _compact(value)
+    text = _dumps(value, compact=True)
+    if estimate_tokens(text) <= max_tokens or not isinstance(value, list):
+        return text if estimate_tokens(text) <= max_tokens else truncate_text(text, max_tokens)
+    kept = list(value)
+    while len(kept) > 1:
+        kept.pop()
+        text = _dumps(kept + [{"omitted_results": len(value) - len(kept)}], compact=True)
+        if estimate_tokens(text) <= max_tokens:
+            return text
+    return truncate_text(text, max_tokens)
+
+
+def truncate_items(items: List[str], max_tokens: int, sep: str = ", ") -> str:
+    """
+    Join items in order, stopping before the budget is exceeded.
+    """
+    kept: List[str] = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item) + (estimate_tokens(sep) if kept else 0)
+        if kept and used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    return sep.join(kept)
+
+
+# ---------------- Budgeted fields ----------------
+def fit_text(prompt: str, field: str, text: str) -> str:
+    limit = budget(prompt, field)
+    if limit is None or not text:
+        return text
+    before = estimate_tokens(text)
+    out = text if before <= limit else truncate_text(text, limit)
+    _record(prompt, field, before, estimate_tokens(out) if out is not text else before)
+    return out
+
+
+def fit_json(prompt: str, field: str, value: Any) -> str:
+    limit = budget(prompt, field)
+    if limit is None:
+        return _dumps(value)
+    full = _dumps(value)
+    before = estimate_tokens(full)
+    out = full if before <= limit else truncate_json(value, limit)
+    _record(prompt, field, before, estimate_tokens(out) if out is not full else before)
+    return out
+
+
+def fit_items(prompt: str, field: str, items: List[str], sep: str = ", ") -> str:
+    limit = budget(prompt, field)
+    full = sep.join(items)
+    if limit is None:
+        return full
+    out = truncate_items(items, limit, sep)
+    _record(prompt, field, estimate_tokens(full), estimate_tokens(out))
+    return out
@@ -0,0 +1,363 @@
+# services/tools.py
+"""
+Tool registry and execution engine.
+
+Tools are registered by name (config/intents.yaml maps intents to tool names) with an
+optional per-tool timeout. run_tools() dispatches the calls of one message concurrently
+on a shared thread pool and returns their results in call order, each with the tool's
+latency. A call that exceeds its timeout is abandoned (its thread finishes in the
+background) and reported as status "timeout"; after TOOL_BREAKER_FAILURES consecutive
+failures a tool's circuit opens and it is skipped (status "unavailable") for
+TOOL_BREAKER_RESET seconds, after which a single probe call decides whether it closes.
+
+Results are reused by the entities a tool is keyed on (`key_entities`):
+- read-only tools: successful results are cached for TOOL_CACHE_TTL[tool] seconds, so
+  re-asking about the same order does not hit the backend again ("cached": true)
+- mutating tools: the result is stored under an idempotency key of intent + normalized
+  key entities (+ the session, when there is one) for TOOL_IDEMPOTENCY_TTL seconds (a
+  retry window), so retrying a refund for the same order, however it is phrased, returns
+  the original id instead of firing twice ("replayed": true). A request with none of its
+  key entities is only told apart by its message, so it is replayed only when resubmitted
+  word for word in the same session, and never without one. Concurrent duplicates share
+  one call, and a call that timed out is still recorded once it completes.
+
+    register_tool("lookup_invoice", lookup_invoice_tool, timeout=2.0, read_only=True, key_entities=("order_id",))
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from services import metrics, mock_api
+from services.llm_cache import MemoryCache, SQLiteCache, TieredCache
+
+ToolFn = Callable[[str, Optional[Dict[str, Any]]], Dict[str, Any]]
+
+TOOL_DURATION = metrics.REGISTRY.histogram(
+    "agent_tool_seconds", "Tool call latency by tool and outcome", ("tool", "status")
+)
+TOOL_REUSE = metrics.REGISTRY.counter(
+    "agent_tool_reuse_total", "Tool results served from the cache / idempotency store", ("tool", "result")
+)
+
+
+class Tool(NamedTuple):
+    name: str
+    fn: ToolFn
+    timeout: Optional[float]
+    read_only: bool = False
+    key_entities: Tuple[str, ...] = ()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed → open after `failures` failures in a row;
+    open → half-open after `reset` seconds, letting one probe call through.
+    """
+
+    def __init__(self, failures: int = settings.TOOL_BREAKER_FAILURES, reset: float = settings.TOOL_BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.consecutive = 0
+                self.opened_at = None
+                return
+            self.consecutive += 1
+            if self.opened_at is not None or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+_registry: Dict[str, Tool] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_caches: Dict[str, MemoryCache] = {}
+_idempotency: Optional[TieredCache] = None
+_inflight: Dict[str, "Future"] = {}
+
+
+def register_tool(
+    name: str,
+    fn: ToolFn,
+    timeout: Optional[float] = None,
+    read_only: bool = False,
+    key_entities: Tuple[str, ...] = (),
+) -> None:
+    """
+    Add (or replace) a tool. `fn(normalized_input, entities)` returns an action result dict;
+    `timeout` defaults to settings.TOOL_TIMEOUTS[name] or settings.TOOL_DEFAULT_TIMEOUT.
+    `read_only` tools are cached by `key_entities`; all others are made idempotent on them
+    (see _result_key).
+    """
+    if timeout is None:
+        timeout = settings.TOOL_TIMEOUTS.get(name, settings.TOOL_DEFAULT_TIMEOUT)
+    ttl = settings.TOOL_CACHE_TTL.get(name, settings.TOOL_CACHE_DEFAULT_TTL)
+    with _lock:
+        _registry[name] = Tool(name, fn, timeout, read_only, tuple(key_entities))
+        _breakers[name] = CircuitBreaker()
+        _caches.pop(name, None)
+        if read_only and key_entities and ttl > 0:
+            _caches[name] = MemoryCache(max_entries=settings.TOOL_CACHE_MAX_ENTRIES, ttl=ttl)
+
+
+def unregister_tool(name: str) -> None:
+    with _lock:
+        _registry.pop(name, None)
+        _breakers.pop(name, None)
+        _caches.pop(name, None)
+
+
+def get_tool(name: Optional[str]) -> Optional[Tool]:
+    return _registry.get(name) if name else None
+
+
+def breaker_states() -> Dict[str, str]:
+    return {name: breaker.state for name, breaker in list(_breakers.items())}
+
+
+def cache_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {name: cache.stats() for name, cache in list(_caches.items())}
+    if _idempotency is not None:
+        out["idempotency"] = _idempotency.stats()
+    return out
+
+
+def _get_idempotency_store() -> TieredCache:
+    global _idempotency
+    if _idempotency is None:
+        with _lock:
+            if _idempotency is None:
+                persistent = (
+                    SQLiteCache(
+                        settings.TOOL_IDEMPOTENCY_DB_PATH,
+                        ttl=settings.TOOL_IDEMPOTENCY_TTL,
+                        table="tool_results",
+                        max_rows=settings.TOOL_IDEMPOTENCY_MAX_ENTRIES,
+                    )
+                    if settings.TOOL_IDEMPOTENCY_PERSIST else None
+                )
+                memory = MemoryCache(max_entries=settings.TOOL_IDEMPOTENCY_MAX_ENTRIES, ttl=settings.TOOL_IDEMPOTENCY_TTL)
+                _idempotency = TieredCache(memory, persistent)
+    return _idempotency
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.TOOL_MAX_WORKERS, thread_name_prefix="tool")
+    return _executor
+
+
+def _call(tool: Tool, normalized_input: str, entities: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], float]:
+    start = time.perf_counter()
+    result = dict(tool.fn(normalized_input, entities))
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def _failure(tool: Tool, status: str, error: str) -> Dict[str, Any]:
+    return {"tool": tool.name, "status": status, "error": error}
+
+
+# ---------------- Result reuse (cache / idempotency) ----------------
+def _key_value(value: Any) -> Optional[str]:
+    """
+    Case- and whitespace-folded form of an entity value (or message) for result keys.
+    """
+    if value is None:
+        return None
+    return " ".join(str(value).lower().split()) or None
+
+
+def _result_key(
+    tool: Tool,
+    normalized_input: str,
+    entities: Optional[Dict[str, Any]],
+    session_id: Optional[str],
+    intent: Optional[str],
+) -> Optional[str]:
+    """
+    Key a call's result is reused under, or None if it must not be reused. Read-only tools
+    need every key entity (without an order_id the call cannot be told apart). Mutating
+    tools are keyed on whichever key entities are present, scoped to the intent and the
+    session if any; with none present, only the exact message within a session identifies
+    the request.
+    """
+    values = {name: _key_value((entities or {}).get(name)) for name in tool.key_entities}
+    if tool.read_only:
+        if tool.name not in _caches or not all(values.values()):
+            return None
+        scope = ""
+    elif any(values.values()):
+        scope = f"{session_id or ''}\x00{intent or ''}"
+    elif session_id:
+        values = {"message": _key_value(normalized_input)}
+        scope = f"{session_id}\x00{intent or ''}"
+    else:
+        return None
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{tool.name}\x00{scope}\x00{payload}".encode("utf-8")).hexdigest()
+
+
+def _store_for(tool: Tool) -> Optional[Any]:
+    return _caches.get(tool.name) if tool.read_only else _get_idempotency_store()
+
+
+def _reused(tool: Tool, key: Optional[str]) -> Optional[Dict[str, Any]]:
+    store = _store_for(tool) if key else None
+    value = store.get(key) if store is not None else None
+    if value is None:
+        if key:
+            TOOL_REUSE.inc(tool=tool.name, result="miss")
+        return None
+    result = json.loads(value)
+    result["cached" if tool.read_only else "replayed"] = True
+    result["latency_ms"] = 0.0
+    TOOL_REUSE.inc(tool=tool.name, result="hit" if tool.read_only else "replay")
+    return result
+
+
+def _remember(tool: Tool, key: str, future: "Future") -> None:
+    """
+    Done-callback of a keyed call: store a successful result (also one its caller stopped
+    waiting for), then let the next duplicate call through.
+    """
+    try:
+        if not future.cancelled() and future.exception() is None:
+            result, _ = future.result()
+            store = _store_for(tool)
+            if store is not None and result.get("status", "ok") == "ok":
+                store.set(key, json.dumps(result, ensure_ascii=False, default=str))
+    finally:
+        with _lock:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+
+
+def _submit(tool: Tool, key: Optional[str], normalized_input: str, entities: Optional[Dict[str, Any]]) -> "Future":
+    """
+    Start a call; a keyed call that is already running is joined instead of started again.
+    """
+    executor = _get_executor()
+    if key is None:
+        return executor.submit(_call, tool, normalized_input, entities)
+    with _lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = executor.submit(_call, tool, normalized_input, entities)
+        _inflight[key] = future
+    future.add_done_callback(lambda f: _remember(tool, key, f))
+    return future
+
+
+def _finish(tool: Tool, future: "Future", timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    Wait (up to `timeout` more seconds) for a submitted call and turn it into an action result.
+    """
+    breaker = _breakers.get(tool.name)
+    try:
+        result, latency_ms = future.result(timeout=timeout)
+    except TimeoutError:
+        # The call keeps running in the pool; it only counts against the breaker here
+        if breaker:
+            breaker.record(False)
+        TOOL_DURATION.observe(tool.timeout or 0.0, tool=tool.name, status="timeout")
+        result = _failure(tool, "timeout", f"no response within {tool.timeout}s")
+        result["latency_ms"] = round((tool.timeout or 0.0) * 1000.0, 2)
+        return result
+    except Exception as exc:
+        if breaker:
+            breaker.record(False)
+        TOOL_DURATION.observe(0.0, tool=tool.name, status="error")
+        return _failure(tool, "error", f"{type(exc).__name__}: {exc}")
+    if breaker:
+        breaker.record(True)
+    result = dict(result)  # the call's result may be shared with joined duplicates and the store
+    TOOL_DURATION.observe(latency_ms / 1000.0, tool=tool.name, status=str(result.get("status", "ok")))
+    result["latency_ms"] = round(latency_ms, 2)
+    return result
+
+
+def run_tools(
+    calls: List[Tuple[str, Dict[str, Any]]],
+    normalized_input: str,
+    entities: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run `calls` ([(tool_name, extra result fields)], e.g. the intent that triggered it)
+    concurrently; results come back in call order. Unknown tools are reported as
+    "unhandled", open circuits as "unavailable". Cached / already-performed results are
+    returned without calling the tool; `session_id` scopes the idempotency keys of
+    mutating tools.
+    """
+    started = time.monotonic()
+    submitted: List[Tuple[Optional[Tool], Any]] = []
+    for name, extra in calls:
+        tool = get_tool(name)
+        if tool is None:
+            submitted.append((None, {"tool": name or "none", "status": "unhandled"}))
+            continue
+        key = _result_key(tool, normalized_input, entities, session_id, extra.get("intent"))
+        reused = _reused(tool, key)
+        breaker = _breakers.get(name)
+        if reused is not None:
+            submitted.append((None, reused))
+        elif breaker is not None and not breaker.allow():
+            submitted.append((None, _failure(tool, "unavailable", "circuit open")))
+        else:
+            submitted.append((tool, _submit(tool, key, normalized_input, entities)))
+
+    results: List[Dict[str, Any]] = []
+    for (tool, outcome), (_, extra) in zip(submitted, calls):
+        if tool is None:
+            result = outcome
+        else:
+            # Every call started at about the same time, so each waits out its own timeout
+            remaining = None if tool.timeout is None else max(0.0, tool.timeout - (time.monotonic() - started))
+            result = _finish(tool, outcome, remaining)
+        for key, value in extra.items():
+            result.setdefault(key, value)
+        results.append(result)
+    return results
+
+
+def _breaker_gauge() -> Dict[str, float]:
+    return {name: float(state != "closed") for name, state in breaker_states().items()}
+
+
+metrics.REGISTRY.gauge_callback("agent_tool_circuit_open", "Tools whose circuit breaker is open (1)", _breaker_gauge)
+
+
+# ---------------- Built-in tools (mock backends) ----------------
+register_tool("check_order_status", mock_api.check_order_status_tool, read_only=True, key_entities=("order_id",))
+register_tool("initiate_refund", mock_api.initiate_refund_tool, key_entities=("order_id", "amount"))
+register_tool("open_ticket", mock_api.open_ticket_tool, key_entities=("order_id",))
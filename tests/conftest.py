@@ -0,0 +1,16 @@
+# tests/conftest.py
+import pytest
+
+from services import db_logger
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """
+    A fresh, migrated agent_logs.db in tmp_path in place of data/agent_logs.db.
+    """
+    path = tmp_path / "agent_logs.db"
+    monkeypatch.setattr(db_logger, "DB_PATH", path)
+    db_logger.init_db()
+    yield path
+    db_logger.close_writers()
@@ -0,0 +1,62 @@
+# tests/test_entities.py
+import re
+
+import pytest
+
+from services import entities
+
+
+@pytest.mark.parametrize("text, phone", [
+    ("call +1 555 123 4567", "+15551234567"),
+    ("call +44 (20) 7946 0958", "+442079460958"),
+    ("call (555) 123-4567", "5551234567"),
+    ("call 555-123-4567", "5551234567"),
+    ("call 555.123.4567", "5551234567"),
+])
+def test_phone_needs_prefix_or_separator(text, phone):
+    assert entities.extract_entities(text)["phone"] == phone
+
+
+@pytest.mark.parametrize("text", ["zip 12345678", "account 1234567890", "ORD12345678"])
+def test_bare_digit_runs_are_not_phones(text):
+    assert "phone" not in entities.extract_entities(text)
+
+
+def test_matches_in_order_with_spans():
+    text = "Refund ord-1234 to Jane@Example.com by 2025-09-01, it was $25.50"
+    found = entities.scan(text)
+
+    assert [(e.type, e.value) for e in found] == [
+        ("order_id", "ORD1234"), ("email", "jane@example.com"), ("date", "2025-09-01"), ("amount", "$25.50"),
+    ]
+    for e in found:
+        assert entities._registry[e.type].normalize(text[e.start:e.end]) == e.value
+
+
+def test_earlier_registration_wins_overlaps():
+    # a date also reads as a phone number; date is registered first
+    assert [e.type for e in entities.scan("on 2025-09-01")] == ["date"]
+    assert [e.type for e in entities.scan("ORD1234@example.com")] == ["email"]
+
+
+def test_prefilter_leaves_type_out_of_scan():
+    assert entities.extract_entities("My package is late, can you help?") == {"matches": []}
+    assert entities.extract_entities("Sept 5th, 2024")["date"] == "Sept 5th, 2024"
+    assert entities.extract_entities("5 March")["date"] == "5 March"
+
+
+def test_register_entity_with_prefilter():
+    entities.register_entity(
+        "sku", r"\bSKU-\d{4}\b", normalize=str.upper, ignore_case=True, prefilter=["sku", re.compile(r"\d{4}")]
+    )
+    try:
+        assert entities.extract_entities("need sku-1234 and ORD5555")["sku"] == "SKU-1234"
+        assert entities.extract_entities("ORD5555")["order_id"] == "ORD5555"
+    finally:
+        entities.unregister_entity("sku")
+    assert "sku" not in entities.extract_entities("need sku-1234")
+
+
+def test_prefilter_must_be_lowercase():
+    with pytest.raises(ValueError):
+        entities.register_entity("sku", r"\bSKU-\d{4}\b", prefilter=["SKU"])
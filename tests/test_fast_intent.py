@@ -0,0 +1,72 @@
+# tests/test_fast_intent.py
+import json
+import tracemalloc
+
+from core.intents import get_registry
+from core.nodes import fast_intent
+from services import db_logger
+
+PHRASES = {
+    "order_status": "where is my order ORD{}",
+    "refund": "i want a refund for ORD{}",
+    "technical_issue": "the app keeps crashing, error {}",
+    "greeting": "hello there, friend {}",
+}
+
+
+def _populate(rows: int) -> None:
+    labels = list(PHRASES)
+    db_logger.save_logs([
+        {"input": PHRASES[labels[i % len(labels)]].format(i), "intents": [labels[i % len(labels)]]}
+        for i in range(rows)
+    ])
+
+
+def test_training_reads_only_recent_rows(db_path):
+    _populate(5000)
+    texts, _ = fast_intent.collect_training_data(db_path, max_rows=100)
+
+    seeds = len(get_registry().labels) + len(get_registry().synonyms)
+    assert len(texts) <= seeds + 100
+    assert "hello there, friend 4999" in texts  # newest row
+    assert "where is my order ORD0" not in texts  # oldest row
+
+
+def test_training_memory_is_bounded(db_path, monkeypatch):
+    _populate(20000)
+    texts, targets = fast_intent.collect_training_data(db_path, max_rows=2000)
+    monkeypatch.setattr(fast_intent, "BATCH_ROWS", 256)
+    import numpy  # noqa: F401  (imported lazily by training; keep the import out of the trace)
+
+    tracemalloc.start()
+    try:
+        fast_intent.FastIntentModel.train(texts, targets, epochs=5)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # A dense rows × N_FEATURES float32 matrix alone would be ~130 MB here
+    assert peak < 24 * 2 ** 20
+
+
+def test_trained_model_classifies_known_phrases(db_path):
+    _populate(2000)
+    model = fast_intent.FastIntentModel.train(*fast_intent.collect_training_data(db_path, max_rows=400))
+
+    assert model.predict("where is my order")[0] == "order_status"
+    assert model.predict("refund please")[0] == "refund"
+
+
+def test_escalated_and_downvoted_rows_are_skipped(db_path):
+    db_logger.save_logs([
+        {"input": "escalated row", "intents": ["refund"], "escalation": True},
+        {"input": "downvoted row", "intents": ["refund"], "feedback": "down"},
+        {"input": "multi intent row", "intents": ["refund", "order_status"]},
+        {"input": "kept row", "intents": ["refund"]},
+    ])
+    texts, targets = fast_intent.collect_training_data(db_path)
+
+    assert "kept row" in texts
+    assert targets[texts.index("kept row")] == "refund"
+    assert not {"escalated row", "downvoted row", "multi intent row"} & set(texts)
+    assert json.loads(json.dumps(targets))  # plain strings, serializable with the model
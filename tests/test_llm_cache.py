@@ -0,0 +1,109 @@
+# tests/test_llm_cache.py
+import time
+
+from services.llm_cache import MemoryCache, SQLiteCache, TieredCache, make_key
+
+
+def _expire(monkeypatch, seconds: float) -> None:
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + seconds)
+
+
+def test_make_key_depends_on_model_prompt_and_options():
+    key = make_key("m", "prompt", {"temperature": 0, "max_tokens": 10})
+
+    assert key == make_key("m", "prompt", {"max_tokens": 10, "temperature": 0})
+    assert key != make_key("other", "prompt", {"temperature": 0, "max_tokens": 10})
+    assert key != make_key("m", "prompt", {"temperature": 0, "max_tokens": 20})
+
+
+def test_memory_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2, ttl=0)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_entries_expire(monkeypatch):
+    cache = MemoryCache(max_entries=10, ttl=60)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+
+    _expire(monkeypatch, 61)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_tiered_promotes_persistent_hits(tmp_path):
+    memory = MemoryCache(max_entries=1, ttl=60)
+    cache = TieredCache(memory, SQLiteCache(tmp_path / "cache.db", ttl=60))
+    cache.set("a", "1")
+    cache.set("b", "2")  # evicts "a" from memory only
+    assert memory.get("a") is None
+
+    assert cache.get("a") == "1"
+    assert memory.get("a") == "1"
+    assert cache.stats()["hits"] == 1
+
+
+def test_tiered_expires_in_both_tiers(tmp_path, monkeypatch):
+    cache = TieredCache(MemoryCache(max_entries=10, ttl=60), SQLiteCache(tmp_path / "cache.db", ttl=60))
+    cache.set("a", "1")
+
+    _expire(monkeypatch, 61)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def _age(cache: SQLiteCache, key: str, seconds: float) -> None:
+    cache._conn.execute(f"UPDATE {cache.table} SET created = created - ? WHERE key = ?", (seconds, key))
+    cache._conn.commit()
+
+
+def test_sqlite_purges_expired_rows_on_open(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=60)
+    cache.set("old", "a")
+    cache.set("new", "b")
+    _age(cache, "old", 120)
+
+    reopened = SQLiteCache(tmp_path / "cache.db", ttl=60)
+    assert reopened.stats()["size"] == 1
+    assert reopened.get("new") == "b"
+
+
+def test_sqlite_purges_every_n_writes(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=60, purge_every=5)
+    cache.set("old", "a")
+    _age(cache, "old", 120)
+    for i in range(3):
+        cache.set(f"k{i}", "v")
+    assert cache.stats()["size"] == 4
+
+    cache.set("k3", "v")  # fifth write
+    assert cache.stats()["size"] == 4
+    assert cache.stats()["purged"] == 1
+
+
+def test_sqlite_keeps_newest_max_rows(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=0, max_rows=3, purge_every=1)
+    for i in range(5):
+        cache.set(f"k{i}", "v")
+        time.sleep(0.001)
+
+    assert cache.stats()["size"] == 3
+    assert cache.get("k0") is None and cache.get("k1") is None
+    assert cache.get("k4") == "v"
+
+
+def test_sqlite_without_ttl_keeps_rows(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=0)
+    cache.set("k", "v")
+    _age(cache, "k", 10 ** 6)
+
+    assert cache.purge_expired() == 0
+    assert cache.get("k") == "v"
@@ -0,0 +1,90 @@
+# tests/test_logger.py
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+from core.nodes.logger import LogPipeline
+from services import db_logger
+
+
+@pytest.fixture
+def stalled_db(monkeypatch):
+    """
+    db_logger.save_logs that records payloads but holds every write until `release` is set.
+    """
+    release = threading.Event()
+    written = []
+    ids = itertools.count(1)
+
+    def save_logs(payloads):
+        release.wait(5)
+        written.extend(p["input"] for p in payloads)
+        return [next(ids) for _ in payloads]
+
+    monkeypatch.setattr(db_logger, "save_logs", save_logs)
+    return release, written
+
+
+def _pipeline(tmp_path, policy, maxsize):
+    pipeline = LogPipeline(maxsize=maxsize, batch_size=10, policy=policy, spill_path=tmp_path / "spill.jsonl")
+    first = pipeline.submit({"input": "p0"})
+    # Wait for the worker to take p0 into its (stalled) write, leaving the queue empty
+    deadline = time.monotonic() + 5
+    while pipeline.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return pipeline, first
+
+
+def test_block_waits_for_space(tmp_path, stalled_db):
+    release, written = stalled_db
+    pipeline, _ = _pipeline(tmp_path, "block", maxsize=1)
+    pipeline.submit({"input": "p1"})
+
+    submitted = threading.Event()
+    threading.Thread(target=lambda: (pipeline.submit({"input": "p2"}), submitted.set())).start()
+    assert not submitted.wait(0.1)
+
+    release.set()
+    assert submitted.wait(5)
+    assert pipeline.flush(5)
+    assert written == ["p0", "p1", "p2"]
+    assert pipeline.stats()["dropped"] == pipeline.stats()["spilled"] == 0
+    pipeline.shutdown(5)
+
+
+def test_drop_oldest_discards_oldest_queued(tmp_path, stalled_db):
+    release, written = stalled_db
+    pipeline, first = _pipeline(tmp_path, "drop_oldest", maxsize=2)
+    oldest = pipeline.submit({"input": "p1"})
+    pipeline.submit({"input": "p2"})
+    newest = pipeline.submit({"input": "p3"})
+
+    assert oldest.result(1) is None
+    release.set()
+    assert pipeline.flush(5)
+    assert written == ["p0", "p2", "p3"]
+    assert first.result(1) == 1 and newest.result(1) == 3
+    assert pipeline.stats()["dropped"] == 1
+    pipeline.shutdown(5)
+
+
+def test_spill_appends_to_file_and_drains(tmp_path, stalled_db):
+    release, written = stalled_db
+    pipeline, _ = _pipeline(tmp_path, "spill", maxsize=1)
+    pipeline.submit({"input": "p1"})
+    spilled = pipeline.submit({"input": "p2"})
+
+    assert spilled.result(1) is None
+    lines = (tmp_path / "spill.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["input"] for line in lines] == ["p2"]
+
+    release.set()
+    assert pipeline.flush(5)
+    assert pipeline.drain_spill() == 1
+    assert written == ["p0", "p1", "p2"]
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert pipeline.stats()["spilled"] == 1
+    pipeline.shutdown(5)
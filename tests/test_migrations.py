@@ -0,0 +1,141 @@
+# tests/test_migrations.py
+import json
+import sqlite3
+
+import pytest
+
+from services import db_logger
+
+# logs as created by the original init_db (schema version 0)
+BASELINE_LOGS = """
+CREATE TABLE logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    input TEXT,
+    intents TEXT,
+    sentiment TEXT,
+    urgency TEXT,
+    actions TEXT,
+    response TEXT,
+    escalation INTEGER,
+    meta TEXT,
+    feedback TEXT
+)
+"""
+
+BASELINE_ROWS = [
+    ("2025-01-01 09:15:00", ["order_status"], "neutral", 0, None),
+    ("2025-01-01 09:45:00", ["order_status", "refund"], "negative", 1, "down"),
+    ("2025-01-01 10:05:00", ["billing"], "positive", 0, "up"),
+    ("2025-01-01 10:30:00", "not json", None, 0, None),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """
+    An agent_logs.db in tmp_path as the baseline code left it, with a few rows.
+    """
+    path = tmp_path / "agent_logs.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(BASELINE_LOGS)
+        conn.executemany(
+            "INSERT INTO logs (ts, input, intents, sentiment, escalation, feedback) VALUES (?, 'hi', ?, ?, ?, ?)",
+            [(ts, json.dumps(i) if isinstance(i, list) else i, s, e, f) for ts, i, s, e, f in BASELINE_ROWS],
+        )
+    conn.close()
+    monkeypatch.setattr(db_logger, "DB_PATH", path)
+    yield path
+    db_logger.close_writers()
+
+
+def _query(sql, *args):
+    return db_logger.get_connection().execute(sql, args).fetchall()
+
+
+def test_upgrades_baseline_to_current_version(baseline_db):
+    db_logger.init_db()
+    db_logger.init_db()  # running again is a no-op
+
+    assert _query("PRAGMA user_version") == [(db_logger.SCHEMA_VERSION,)]
+    assert _query("SELECT COUNT(*) FROM logs") == [(len(BASELINE_ROWS),)]
+
+
+def test_migration_2_adds_indexes(baseline_db):
+    db_logger.init_db()
+    indexes = {name for (name,) in _query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    assert {"idx_logs_ts", "idx_logs_escalation", "idx_logs_sentiment", "idx_logs_urgency",
+            "idx_logs_feedback", "idx_log_intents_intent"} <= indexes
+    plan = " ".join(row[-1] for row in _query("EXPLAIN QUERY PLAN SELECT * FROM logs WHERE ts >= ?", "2025"))
+    assert "idx_logs_ts" in plan
+
+
+def test_migration_2_backfills_and_syncs_log_intents(baseline_db):
+    db_logger.init_db()
+
+    assert _query("SELECT log_id, intent FROM log_intents ORDER BY log_id, intent") == [
+        (1, "order_status"), (2, "order_status"), (2, "refund"), (3, "billing"),
+    ]
+    log_id = db_logger.save_log({"input": "new", "intents": ["refund", "technical_issue"]})
+    assert _query("SELECT intent FROM log_intents WHERE log_id = ? ORDER BY intent", log_id) == [
+        ("refund",), ("technical_issue",),
+    ]
+    conn = db_logger.get_connection()
+    with conn:
+        conn.execute("DELETE FROM logs WHERE id = 2")
+    assert _query("SELECT COUNT(*) FROM log_intents WHERE log_id = 2") == [(0,)]
+
+
+def test_adds_feedback_column_to_older_databases(tmp_path, monkeypatch):
+    path = tmp_path / "agent_logs.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(BASELINE_LOGS.replace(",\n    feedback TEXT", ""))
+    conn.close()
+    monkeypatch.setattr(db_logger, "DB_PATH", path)
+    try:
+        db_logger.init_db()
+        columns = {row[1] for row in _query("PRAGMA table_info(logs)")}
+        assert "feedback" in columns
+        assert _query("PRAGMA user_version") == [(db_logger.SCHEMA_VERSION,)]
+    finally:
+        db_logger.close_writers()
+
+
+def _rollups():
+    return (
+        _query("SELECT * FROM rollup_hourly ORDER BY 1, 2, 3"),
+        _query("SELECT * FROM rollup_hourly_intent ORDER BY 1, 2, 3, 4"),
+    )
+
+
+def test_migration_3_backfills_hourly_rollups(baseline_db):
+    db_logger.init_db()
+    hourly, per_intent = _rollups()
+
+    # (hour, sentiment, escalation, interactions, feedback_up, feedback_down)
+    assert hourly == [
+        ("2025-01-01 09:00:00", "negative", 1, 1, 0, 1),
+        ("2025-01-01 09:00:00", "neutral", 0, 1, 0, 0),
+        ("2025-01-01 10:00:00", "positive", 0, 1, 1, 0),
+        ("2025-01-01 10:00:00", "unknown", 0, 1, 0, 0),
+    ]
+    assert ("2025-01-01 09:00:00", "order_status", "negative", 1, 1, 0, 1) in per_intent
+    assert ("2025-01-01 09:00:00", "refund", "negative", 1, 1, 0, 1) in per_intent
+    assert len(per_intent) == 4
+
+
+def test_migration_3_triggers_match_a_rebuild(baseline_db):
+    db_logger.init_db()
+    log_id = db_logger.save_log({"input": "new", "intents": ["billing"], "sentiment": "negative"})
+    db_logger.save_feedback(log_id, "down")
+    db_logger.save_feedback(1, "up")
+    db_logger.save_feedback(2, "up")
+    incremental = _rollups()
+
+    conn = db_logger.get_connection()
+    with conn:
+        for statement in db_logger.ROLLUP_BACKFILL:
+            conn.execute(statement)
+    assert _rollups() == incremental
+    assert sum(row[3] for row in incremental[0]) == len(BASELINE_ROWS) + 1
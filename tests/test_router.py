@@ -0,0 +1,86 @@
+# tests/test_router.py
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.ollama_client import OVERLOADED_ERROR, OllamaClient, is_unreachable
+from services.router import Endpoint, ModelRouter
+
+
+class _ModelNotFound(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = b'{"error": "model \'typo\' not found"}'
+        self.send_response(404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def not_found_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ModelNotFound)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def closed_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def _endpoint(url: str) -> Endpoint:
+    endpoint = Endpoint(url)
+    endpoint._client = OllamaClient(base_url=url, max_retries=0, backoff=0.0, coalesce=False, max_in_flight=0)
+    return endpoint
+
+
+@pytest.mark.parametrize("text", [
+    "Hello!",
+    f"{OVERLOADED_ERROR}: queue full]",
+    "[Ollama Error: 404 Client Error: Not Found for url: http://x/api/generate]",
+    "[Ollama Error: total timeout of 120s exceeded]",
+])
+def test_endpoint_stays_healthy_unless_unreachable(text):
+    endpoint = Endpoint("http://ollama:11434")
+    assert endpoint.record(text)
+    assert endpoint.healthy
+
+
+def test_unreachable_endpoint_leaves_rotation():
+    endpoint = Endpoint("http://ollama:11434")
+    assert not endpoint.record("[Ollama Error: unreachable: Connection refused]")
+    assert not endpoint.healthy
+
+
+def test_client_classifies_errors(not_found_url, closed_url):
+    closed, not_found = _endpoint(closed_url).client, _endpoint(not_found_url).client
+    assert is_unreachable(closed.generate("hi", model="m"))
+    assert is_unreachable(asyncio.run(closed.agenerate("hi", model="m")))
+    for text in (not_found.generate("hi", model="typo"), asyncio.run(not_found.agenerate("hi", model="typo"))):
+        assert text.startswith("[Ollama Error:") and not is_unreachable(text)
+
+
+def test_unknown_model_does_not_take_endpoints_out(not_found_url, closed_url):
+    router = ModelRouter({"response": {"pool": "default"}}, {"default": [closed_url, not_found_url]})
+    down, up = router.pools["default"].endpoints
+    down._client = _endpoint(closed_url).client
+    up._client = _endpoint(not_found_url).client
+
+    for _ in range(3):
+        text = router.generate("response", "hi", model="typo")
+        assert text.startswith("[Ollama Error:") and not is_unreachable(text)
+
+    assert not down.healthy  # refused the connection: out of rotation
+    assert up.healthy  # answered (with a 404): stays in
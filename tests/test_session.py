@@ -0,0 +1,26 @@
+# tests/test_session.py
+from core.session import Conversation
+
+
+def _state(entities, action_results):
+    return {
+        "user_input": "where is my order?", "response_text": "...", "intents": ["order_status"],
+        "metadata": {"entities": entities}, "action_results": action_results,
+    }
+
+
+def test_placeholder_order_id_from_tool_is_not_carried():
+    conversation = Conversation()
+    conversation.record(_state({}, [{"tool": "check_order_status", "order_id": "ORD4821", "status": "shipped"}]))
+
+    assert "order_id" not in conversation.entities
+
+
+def test_user_entities_and_tool_created_ids_are_carried():
+    conversation = Conversation()
+    conversation.record(_state(
+        {"order_id": "ORD1234", "email": "jane@example.com"},
+        [{"tool": "initiate_refund", "order_id": "ORD1234", "refund_id": "RFD55512"}],
+    ))
+
+    assert conversation.entities == {"order_id": "ORD1234", "email": "jane@example.com", "refund_id": "RFD55512"}
@@ -0,0 +1,104 @@
+# tests/test_single_flight.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.ollama_client import OllamaClient, SingleFlight
+
+
+def _gated(calls):
+    """
+    A call that counts its invocations and returns once `release` is set.
+    """
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    return fn, release
+
+
+def _run_concurrently(n, target, release):
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(target) for _ in range(n)]
+        time.sleep(0.2)  # let every caller join the flight
+        release.set()
+    return [f.result() for f in futures]
+
+
+def test_concurrent_calls_share_one_run():
+    flights, calls = SingleFlight(), []
+    fn, release = _gated(calls)
+    results = _run_concurrently(5, lambda: flights.do("k", fn), release)
+
+    assert calls == [1]
+    assert {text for text, _ in results} == {"result"}
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.in_flight() == 0
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights, calls = SingleFlight(), []
+    assert flights.do("a", lambda: calls.append("a") or "a") == ("a", False)
+    assert flights.do("b", lambda: calls.append("b") or "b") == ("b", False)
+    assert flights.do("a", lambda: calls.append("a") or "a") == ("a", False)
+    assert calls == ["a", "b", "a"]
+
+
+def test_leader_failure_reaches_followers_as_error():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "k", fail)
+        time.sleep(0.1)
+        follower = pool.submit(flights.do, "k", fail)
+        time.sleep(0.1)
+        release.set()
+        with pytest.raises(RuntimeError):
+            leader.result(5)
+        assert follower.result(5) == ("[Ollama Error: boom]", True)
+
+
+def test_async_flight_survives_leader_cancellation():
+    async def main():
+        flights, calls = SingleFlight(), []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(flights.ado("k", call))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flights.ado("k", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return calls, results, flights.in_flight()
+
+    calls, results, in_flight = asyncio.run(main())
+    assert calls == [1]
+    assert results == [("result", True)] * 3
+    assert in_flight == 0
+
+
+@pytest.mark.parametrize("temperature, upstream_calls", [(0.0, 1), (0.7, 4)])
+def test_client_coalesces_deterministic_generations(monkeypatch, temperature, upstream_calls):
+    client = OllamaClient(cache=None, coalesce=True, max_in_flight=0)
+    calls = []
+    fn, release = _gated(calls)
+    monkeypatch.setattr(client, "_generate", lambda *args: fn())
+    results = _run_concurrently(4, lambda: client.generate("same prompt", model="m", temperature=temperature), release)
+
+    assert results == ["result"] * 4
+    assert len(calls) == upstream_calls
@@ -0,0 +1,20 @@
+# tests/test_startup.py
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _loaded_after(statement: str, modules) -> list:
+    code = f"import sys; {statement}; print(' '.join(m for m in {list(modules)!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+@pytest.mark.parametrize("statement", ["import core.workflow", "import api"])
+def test_import_stays_light(statement):
+    # numpy and yaml load with the fast-intent model / intent registry on first use
+    assert _loaded_after(statement, ["numpy", "yaml", "langchain", "langchain_core"]) == []
@@ -0,0 +1,129 @@
+# tests/test_tools.py
+import itertools
+import threading
+
+import pytest
+
+from services import tools
+from services.llm_cache import MemoryCache, TieredCache
+
+
+@pytest.fixture
+def refund_tool(monkeypatch):
+    """
+    A mutating tool keyed on order_id + amount that returns a new refund id per call, with
+    a fresh idempotency store.
+    """
+    monkeypatch.setattr(tools, "_idempotency", TieredCache(MemoryCache(max_entries=100, ttl=300)))
+    ids = itertools.count(1)
+    tools.register_tool(
+        "test_refund", lambda text, entities: {"tool": "test_refund", "refund_id": f"RFD{next(ids)}"},
+        timeout=5.0, key_entities=("order_id", "amount"),
+    )
+    yield lambda text, entities=None, session_id=None: tools.run_tools(
+        [("test_refund", {"intent": "refund"})], text, entities=entities, session_id=session_id
+    )[0]
+    tools.unregister_tool("test_refund")
+
+
+def test_rephrased_retry_is_replayed(refund_tool):
+    first = refund_tool("refund ORD1234 please", {"order_id": "ORD1234"}, session_id="s1")
+    retry = refund_tool("I asked for a refund on ord1234!", {"order_id": "ord1234"}, session_id="s1")
+
+    assert retry["refund_id"] == first["refund_id"]
+    assert retry["replayed"]
+
+
+def test_retry_without_session_is_replayed_by_entities(refund_tool):
+    first = refund_tool("refund ORD1234", {"order_id": "ORD1234"})
+    retry = refund_tool("refund order ORD1234 again", {"order_id": "ORD1234"})
+
+    assert retry["refund_id"] == first["refund_id"]
+
+
+def test_different_entities_are_new_requests(refund_tool):
+    first = refund_tool("refund $20 of ORD1234", {"order_id": "ORD1234", "amount": "$20"}, session_id="s1")
+    second = refund_tool("refund $5 of ORD1234", {"order_id": "ORD1234", "amount": "$5"}, session_id="s1")
+    other = refund_tool("refund ORD9999", {"order_id": "ORD9999"}, session_id="s1")
+
+    assert len({first["refund_id"], second["refund_id"], other["refund_id"]}) == 3
+
+
+def test_without_entities_only_the_same_message_is_replayed(refund_tool):
+    first = refund_tool("I want my money back", {}, session_id="s1")
+    resubmitted = refund_tool("I want my  money back", {}, session_id="s1")
+    different = refund_tool("refund the other thing too", {}, session_id="s1")
+
+    assert resubmitted["refund_id"] == first["refund_id"]
+    assert different["refund_id"] != first["refund_id"]
+
+
+def test_without_entities_or_session_is_never_replayed(refund_tool):
+    first = refund_tool("I want my money back")
+    second = refund_tool("I want my money back")
+
+    assert second["refund_id"] != first["refund_id"]
+    assert "replayed" not in second
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = tools.CircuitBreaker(failures=3, reset=60)
+    breaker.record(False)
+    breaker.record(True)  # a success resets the count
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+@pytest.mark.parametrize("probe_ok, state", [(True, "closed"), (False, "open")])
+def test_half_open_breaker_lets_one_probe_through(monkeypatch, probe_ok, state):
+    now = [1000.0]
+    monkeypatch.setattr(tools.time, "monotonic", lambda: now[0])
+    breaker = tools.CircuitBreaker(failures=1, reset=30)
+    breaker.record(False)
+
+    now[0] += 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record(probe_ok)
+    assert breaker.state == state
+
+
+@pytest.fixture
+def failing_tools():
+    """
+    One tool that always raises and one that outlives its timeout.
+    """
+    release = threading.Event()
+
+    def fail(text, entities):
+        raise ConnectionError("backend down")
+
+    tools.register_tool("test_fail", fail, timeout=1.0)
+    tools.register_tool("test_slow", lambda text, entities: release.wait(5) and {"tool": "test_slow"}, timeout=0.05)
+    tools._breakers["test_fail"] = tools.CircuitBreaker(failures=2, reset=60)
+    yield
+    release.set()
+    tools.unregister_tool("test_fail")
+    tools.unregister_tool("test_slow")
+
+
+def test_failures_open_the_circuit(failing_tools):
+    calls = [("test_fail", {"intent": "refund"})]
+    statuses = [tools.run_tools(calls, "text")[0]["status"] for _ in range(3)]
+
+    assert statuses == ["error", "error", "unavailable"]
+    assert tools.breaker_states()["test_fail"] == "open"
+
+
+def test_timeouts_are_reported_in_call_order(failing_tools):
+    results = tools.run_tools([("test_slow", {}), ("missing", {}), ("test_fail", {})], "text")
+
+    assert [r["status"] for r in results] == ["timeout", "unhandled", "error"]
+    assert results[0]["tool"] == "test_slow"
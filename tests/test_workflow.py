@@ -0,0 +1,73 @@
+# tests/test_workflow.py
+import pytest
+
+from config import settings
+from core import workflow
+from core.nodes import fast_intent, response as response_node, responses, sentiment as sentiment_node
+
+
+@pytest.fixture
+def llm_rejected(monkeypatch):
+    """
+    A message that needs an LLM reply (billing has no tool or canned reply) while the
+    scheduler turns the reply generation away.
+    """
+    monkeypatch.setattr(fast_intent, "classify_fast", lambda text: (["billing"], 0.95))
+    monkeypatch.setattr(sentiment_node, "analyze_sentiment_with_ollama", lambda text, model=None: ("neutral", "low"))
+    monkeypatch.setattr(workflow, "_busy", lambda state: False)
+    monkeypatch.setattr(
+        response_node, "ollama_generate_response", lambda *args, **kwargs: responses.BUSY_RESPONSE
+    )
+    monkeypatch.setattr(
+        response_node, "ollama_stream_response", lambda *args, **kwargs: iter([responses.BUSY_RESPONSE])
+    )
+
+
+def test_rejected_reply_is_busy(llm_rejected):
+    state = workflow.support_agent_workflow("Why was I charged twice?", concurrent=False, fused=False)
+
+    assert state["metadata"]["response_mode"] == "busy"
+    assert state["response_text"] == responses.BUSY_RESPONSE
+    assert not state["escalation_flag"]
+
+
+def test_rejected_stream_is_busy(llm_rejected):
+    stream = workflow.support_agent_workflow_stream("Why was I charged twice?", concurrent=False, fused=False)
+    state = stream.result()
+
+    assert state["metadata"]["response_mode"] == "busy"
+    assert state["response_text"] == responses.BUSY_RESPONSE
+    assert not state["escalation_flag"]
+
+
+@pytest.fixture
+def classifier_saturated(monkeypatch):
+    """
+    The local model is not confident and the LLM queue is saturated: intents come from the
+    degraded path (fast_intent.guess).
+    """
+    monkeypatch.setattr(fast_intent, "classify_fast", lambda text: None)
+    monkeypatch.setattr(workflow, "_saturated", lambda node, task, priority: True)
+
+
+@pytest.mark.parametrize("guess, intents, confidence", [
+    ((["billing"], 0.7), ["billing"], 0.7),
+    ((["billing"], 0.3), ["unknown"], 0.0),
+    (None, ["unknown"], 0.0),
+])
+def test_degraded_intents(classifier_saturated, monkeypatch, guess, intents, confidence):
+    monkeypatch.setattr(fast_intent, "guess", lambda text: guess)
+    state = {"normalized_input": "Why was I charged twice?"}
+    update = workflow._node_classify(state, {"conversation": None, "model": None})
+
+    assert update["intents"] == intents
+    assert update["confidence_score"] == confidence
+    assert update["metadata"]["intent_source"] == "degraded"
+
+
+def test_zero_threshold_is_kept():
+    _, opts, _ = workflow._resolve(None, 0.0, True, False, False)
+    assert opts["threshold"] == 0.0
+
+    _, opts, _ = workflow._resolve(None, None, True, False, False)
+    assert opts["threshold"] == settings.CONFIDENCE_THRESHOLD